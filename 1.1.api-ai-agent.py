@@ -1,23 +1,37 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from llm_clients import get_openai_client, apply_mock_server_env
+from response_cache import get_response_cache
 
 load_dotenv()
+apply_mock_server_env()
 
 api_key = os.environ.get('OPEN_API_KEY')
 
-client = OpenAI(api_key=api_key)
+client = get_openai_client(api_key=api_key)
+response_cache = get_response_cache()
 
-def get_chat_completion(prompt, model = "gpt-5-mini"):
-    response = client.chat.completions.create(
+def get_chat_completion(prompt, model = "gpt-5-mini", use_cache=True):
+    request = dict(
         model=model,
         messages=[
             {"role": "system", "content": "당신은 친절하고 도움이 되는 AI 비서입니다."},
             {"role": "user", "content": prompt}
         ]
     )
-    return response.choices[0].message.content
+
+    def fetch():
+        response = client.chat.completions.create(**request)
+        return response.choices[0].message.content
+
+    # 같은 (모델, 시스템 프롬프트, 사용자 프롬프트) 요청은 캐시된 응답을 재사용
+    # gpt-5-mini는 temperature를 받지 않아 항상 샘플링하므로, use_cache=True는 "처음 받은 답을 재사용해도 된다"는 선택
+    return response_cache.call(request, fetch, use_cache=use_cache, endpoint=str(client.base_url))
 
 if __name__ == "__main__":
     user_prompt = input("AI에게 물어볼 질문을 입력하세요: ")
-    response = get_chat_completion(user_prompt)
\ No newline at end of file
+    response = get_chat_completion(user_prompt)
+    print(response)
+    # 같은 질문을 한 번 더 보내면 API를 호출하지 않고 캐시에서 바로 돌려준다
+    get_chat_completion(user_prompt)
+    print(f"캐시 통계: {response_cache.stats()}")
@@ -1,31 +1,38 @@
-from openai import OpenAI
-import rich
-import os
+import asyncio
+import io
 from dotenv import load_dotenv
+from llm_clients import get_async_openai_client, apply_mock_server_env
+from single_flight import get_single_flight
+from streaming import StreamStats, shared_chat_deltas, response_deltas, coalesce, render, PlainRenderer, RichRenderer
 
 load_dotenv()
+apply_mock_server_env()
 
-client = OpenAI()
+client = get_async_openai_client()
 default_model = "gpt-5-mini"
 
-def stream_chat_completion(prompt, model):
-    stream = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content":prompt}],
-        stream=True
-    )
-    for chunk in stream:
-        content = chunk.choices[0].delta.content
-        if content is not None:
-            print(content, end="")
+async def stream_chat_completion(prompt, model, renderer=None):
+    # 작은 delta들을 프레임으로 묶어서 출력 (print 호출 횟수 감소)
+    # 같은 프롬프트가 동시에 들어오면 upstream 스트림 1개를 함께 받는다
+    stats = StreamStats()
+    deltas = shared_chat_deltas(client, stats, model=model, messages=[{"role": "user", "content":prompt}])
+    await render(coalesce(deltas, stats=stats), renderer or PlainRenderer(), stats)
+    return stats
 
-def stream_response(prompt,model):
-    with client.responses.stream(model=model, input=prompt) as stream:
-        for event in stream:
-            if "output_text" in event.type:
-                rich.print(event)
-    rich.print(stream.get_final_response())
+async def stream_response(prompt, model, renderer=None):
+    # 이벤트마다 rich.print 하지 않고, 텍스트 delta만 rich Live로 일정 주기마다 갱신
+    stats = StreamStats()
+    deltas = response_deltas(client, stats, model=model, input=prompt)
+    await render(coalesce(deltas, stats=stats), renderer or RichRenderer(), stats)
+    return stats
+
+async def main():
+    stats = await stream_chat_completion("스트리밍이 뭐야?", default_model)
+    print(stats.as_dict())
+    # 같은 질문 3개를 동시에 보내도 upstream 호출은 1번 (앞의 호출까지 합쳐 stream_calls 2, stream_collapsed 2)
+    await asyncio.gather(*(stream_chat_completion("스트리밍이 뭐야?", default_model, PlainRenderer(io.StringIO())) for _ in range(3)))
+    print(get_single_flight().stats())
+    await stream_response("점심 메뉴 추천 해줘.", default_model)
 
 if __name__=="__main__":
-    stream_chat_completion("스트리밍이 뭐야?", default_model)
-    stream_response("점심 메뉴 추천 해줘.", default_model)
\ No newline at end of file
+    asyncio.run(main())
@@ -1,19 +1,43 @@
 import asyncio
 import os
 
-from openai import AsyncOpenAI
+from llm_clients import get_async_openai_client, get_async_anthropic_client
+from response_cache import get_response_cache, make_cache_key
+from single_flight import get_single_flight
+from rate_limiter import get_governor, estimate_tokens
+from provider_race import race, get_race_stats
 
-openai_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+openai_client = get_async_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
+claude_client = get_async_anthropic_client(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+response_cache = get_response_cache()
+single_flight = get_single_flight() # 동시에 들어온 같은 요청은 upstream 호출 1번으로 합침
+governor = get_governor() # provider/model별 RPM, TPM, 동시 요청 수 제한
 
-async def call_async_openai(prompt:str, model:str = "gpt-5-mini") -> str:
-    response = await openai_client.chat.completions.create(
-        model=model,
-        messages=[{"role":"user", "content":prompt}]
+async def call_async_openai(prompt:str, model:str = "gpt-5-mini", use_cache: bool = True) -> str:
+    # use_cache=True면 temperature가 없는(샘플링하는) 요청도 캐시 -> 같은 프롬프트에는 처음 받은 답을 재사용
+    request = dict(model=model, messages=[{"role":"user", "content":prompt}])
+
+    async def fetch():
+        async with governor.slot("openai", model, tokens=estimate_tokens(prompt)) as slot:
+            response = await openai_client.chat.completions.create(**request)
+            slot.record_usage(response.usage.total_tokens if response.usage else 0)
+        return response.choices[0].message.content
+
+    endpoint = str(openai_client.base_url)
+    if not use_cache:
+        # 캐시를 끈 호출은 새 응답을 원하는 것이므로 다른 호출의 결과(캐시된 것일 수 있음)와 합치지 않는다
+        return await fetch()
+    return await single_flight.do(
+        make_cache_key(request, endpoint),
+        lambda: response_cache.acall(request, fetch, use_cache=True, endpoint=endpoint)
     )
-    return response.choices[0].message.content
 
 async def call_async_claude(prompt: str, model: str = "claude-3-5-haiku-latest") -> str:
-    """claude api key 없는 관계로 중간 코드는 생략"""
+    async with governor.slot("anthropic", model, tokens=estimate_tokens(prompt) + 1000) as slot:
+        response = await claude_client.messages.create(
+            model=model, max_tokens=1000, messages=[{"role": "user", "content": prompt}]
+        )
+        slot.record_usage(response.usage.input_tokens + response.usage.output_tokens)
     return response.content[0].text
 
 async def main():
@@ -25,6 +49,21 @@ async def main():
     openai_response, claude_response = await asyncio.gather(openai_task, claude_task)
     print(f"OpenAI 응답: {openai_response}")
     print(f"Claude 응답: {claude_response}")
+    # 같은 프롬프트를 다시 보내면 캐시 hit (use_cache=True: 처음 받은 답을 재사용)
+    await call_async_openai(prompt)
+    print(f"캐시 통계: {response_cache.stats()}")
+    print(f"single-flight 통계: {single_flight.stats()}")
+    print(f"레이트 리미터 통계: {governor.stats()}")
+
+    # 지연 시간이 중요한 요청: 가장 먼저 도착한 응답만 쓰고 나머지 호출은 취소
+    # 캐시/single-flight를 거치면 바로 위에서 받은 응답이 0초에 이겨 레이스 통계가 왜곡되므로 끈다
+    fastest = await race(
+        {"openai": lambda: call_async_openai(prompt, use_cache=False), "claude": lambda: call_async_claude(prompt)},
+        predicate=lambda text: bool(text and text.strip()),
+        deadlines={"openai": 30, "claude": 30},
+    )
+    print(f"가장 빠른 응답({fastest.provider}, {fastest.latency:.2f}초): {fastest.value}")
+    print(f"레이스 통계: {get_race_stats().snapshot()}")
 
 if __name__=="__main__":
     # await main() 안쓰는 이유:
@@ -1,16 +1,20 @@
 import asyncio
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
 import os
 import logging
 import random
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from llm_clients import get_async_openai_client, get_async_anthropic_client
+from rate_limiter import get_governor, estimate_tokens
+from retry_policy import RetryPolicy
+from provider_race import race, get_race_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-openai_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-claude_client = AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+openai_client = get_async_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
+claude_client = get_async_anthropic_client(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+governor = get_governor() # provider/model별 RPM, TPM, 동시 요청 수 제한
+# 재시도 가능한 오류만 재시도, Retry-After 준수, endpoint별 서킷 브레이커, p95 기준 헤지 요청
+retry_policy = RetryPolicy(max_attempts=3, hedge=True)
 
 async def simulate_random_failure():
     if random.random() < 0.5:
@@ -18,29 +22,26 @@ async def simulate_random_failure():
         raise ConnectionError("인위적으로 발생시킨 연결 오류(테스트용)")
     await asyncio.sleep(random.uniform(0.1, 0.5))
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(),
-    before_sleep=lambda retry_state: logger.warning(
-        f"API 호출 실패: {retry_state.outcome.exception()}, {retry_state.attempt_number}번째 재시도 중..."
-    )
-)
+@retry_policy.wrap("openai.chat.completions")
 async def call_async_openai(prompt: str, model: str= "gpt-5-mini") ->str: 
     logger.info(f"OpenAI API 호출 시작: {model}")
-    await simulate_random_failure()
-    response = await openai_client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}]
-    )
+    async with governor.slot("openai", model, tokens=estimate_tokens(prompt)) as slot:
+        await simulate_random_failure()
+        response = await openai_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        slot.record_usage(response.usage.total_tokens if response.usage else 0)
     logger.info("OpenAI API 호출 성공")
     return response.choices[0].message.content
 
 async def call_async_claude(prompt: str, model: str = "claude-3-5-haiku-latest") -> str:
     logger.info(f"Claude API 호출 시작: {model}")
-    response = await claude_client.messages.create(
-        model=model, max_tokens=1000, messages=[{"role": "user", "content": prompt}]
-    )
+    async with governor.slot("anthropic", model, tokens=estimate_tokens(prompt) + 1000) as slot:
+        response = await claude_client.messages.create(
+            model=model, max_tokens=1000, messages=[{"role": "user", "content": prompt}]
+        )
+        slot.record_usage(response.usage.input_tokens + response.usage.output_tokens)
     logger.info("Claude API 호출 성공")
     return response.content[0].text
 
@@ -56,6 +57,16 @@ async def main():
         )
         print(f"OpenAI 응답: {openai_response}")
         print(f"Claude 응답: {claude_response}")
+        print(f"재시도 정책 지표: {retry_policy.metrics()}")
+
+        # 지연 시간이 중요한 요청: 가장 먼저 도착한 응답만 쓰고 나머지 호출은 취소
+        fastest = await race(
+            {"openai": lambda: call_async_openai(prompt), "claude": lambda: call_async_claude(prompt)},
+            predicate=lambda text: bool(text and text.strip()),
+            deadlines={"openai": 30, "claude": 30},
+        )
+        print(f"가장 빠른 응답({fastest.provider}, {fastest.latency:.2f}초): {fastest.value}")
+        print(f"레이스 통계: {get_race_stats().snapshot()}")
     except Exception as e:
         logger.error(f"API 호출 중 처리되지 않은 오류 발생: {e}")
 
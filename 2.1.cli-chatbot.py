@@ -1,21 +1,65 @@
-from openai import OpenAI
+import asyncio
 import os
 from dotenv import load_dotenv
+from llm_clients import get_openai_client, get_async_openai_client, apply_mock_server_env
+from conversation_context import ConversationContext
+from streaming import ResponseStream, StreamStats, interruptible_chat
 
 load_dotenv()
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+apply_mock_server_env()
+client = get_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
+async_client = get_async_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
 
-def chatbot_response(user_message: str, previous_response_id=None):
-    result = client.responses.create(model="gpt-5-mini", input=user_message, previous_response_id=previous_response_id)
-    return result
+def prepare_turn(user_message: str, previous_response_id=None, context=None):
+    # 동기/비동기/스트리밍 호출이 같이 쓰는 부분: 요청 인자와, 응답을 받았을 때 기록하는 함수를 만든다
+    # context(ConversationContext)를 주면 서버 체인 대신 클라이언트가 관리하는 이력(요약 + 최근 턴)을 보낸다
+    if context is not None:
+        user_message, previous_response_id = context.build_input(user_message), None
+    request = dict(model="gpt-5-mini", input=user_message, previous_response_id=previous_response_id)
+
+    def record(result):
+        if context is not None:
+            context.add_response(result)
+        return result
+
+    return request, record
+
+def chatbot_response(user_message: str, previous_response_id=None, context=None):
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    return record(client.responses.create(**request))
+
+async def achatbot_response(user_message: str, previous_response_id=None, context=None):
+    # 여러 세션을 한 프로세스에서 처리하는 chat_server.py용 비동기 버전
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    return record(await async_client.responses.create(**request))
+
+def chatbot_stream(user_message: str, previous_response_id=None, context=None):
+    # 스트리밍 버전. 토큰이 오는 대로 출력하고, 중간에 취소되어도 response.created에서 받은 id로 체인을 잇는다
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    return ResponseStream(async_client, StreamStats(), on_complete=record,
+                          on_interrupt=context.add_interrupted if context else None, **request)
 
 if __name__=="__main__":
-    while True:
-        user_message = input("메시지: ")
-        if user_message.lower() == "exit":
-            print("대화를 종료합니다.")
-            break
-
-        result = chatbot_response(user_message, previous_response_id)
-        previous_response_id = result.id
-        print("챗봇: " + result.output_text)
\ No newline at end of file
+    previous_response_id = None
+    # CHAT_CONTEXT_BUDGET(토큰 수)을 설정하면 클라이언트 관리 맥락 모드로 동작
+    budget = os.environ.get("CHAT_CONTEXT_BUDGET")
+    context = ConversationContext(budget_tokens=int(budget)) if budget else None
+    # CHAT_STREAM=1 이면 답변을 스트리밍으로 출력하고, 답변 도중 새 메시지를 입력하면 생성을 중단한다
+    if os.environ.get("CHAT_STREAM") == "1":
+        asyncio.run(interruptible_chat(lambda message, previous_id: chatbot_stream(message, previous_id, context), "챗봇"))
+        if context is not None:
+            print(context.report())
+            context.close()
+    else:
+        while True:
+            user_message = input("메시지: ")
+            if user_message.lower() == "exit":
+                if context is not None:
+                    print(context.report())
+                    context.close()
+                print("대화를 종료합니다.")
+                break
+
+            result = chatbot_response(user_message, previous_response_id, context)
+            previous_response_id = result.id
+            print("챗봇: " + result.output_text)
\ No newline at end of file
@@ -1,9 +1,16 @@
-from openai import OpenAI
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from llm_clients import get_openai_client, get_async_openai_client, apply_mock_server_env
+from conversation_context import ConversationContext
+from prompt_layout import PromptLayout, get_cache_usage
+from streaming import ResponseStream, StreamStats, interruptible_chat
 
 load_dotenv()
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+apply_mock_server_env()
+client = get_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
+async_client = get_async_openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
 
 # 어린왕자 페르소나
 LITTLE_PRINCE_PERSONA = """
@@ -21,24 +28,73 @@ LITTLE_PRINCE_PERSONA = """
 항상 간결하게 답변하세요. 길어야 2-3문장으로 응답하고, 어린 왕자의 순수함과 지혜를 담아내세요. 
 복잡한 주제도 본질적으로 단순화하여 설명하세요.
 """
+# 페르소나는 매 턴 같은 바이트열로 맨 앞에 보내 provider의 prompt caching이 맞도록 한다
+PERSONA_LAYOUT = PromptLayout(LITTLE_PRINCE_PERSONA, name="little-prince")
 
-def chatbot_response(user_message: str, previous_response_id=None):
-    result = client.responses.create(
+def prepare_turn(user_message: str, previous_response_id=None, context=None):
+    # 동기/비동기/스트리밍 호출이 같이 쓰는 부분: 요청 인자와, 응답을 받았을 때 기록하는 함수를 만든다
+    # context(ConversationContext)를 주면 서버 체인 대신 클라이언트가 관리하는 이력(요약 + 최근 턴)을 보낸다
+    if context is not None:
+        user_message, previous_response_id = context.build_input(user_message), None
+    request = dict(
         model="gpt-5-mini",
         reasoning={"effort": "low"}, # low, medium, high
-        instructions=LITTLE_PRINCE_PERSONA,
-        input=user_message, 
+        instructions=PERSONA_LAYOUT.instructions,
+        prompt_cache_key=PERSONA_LAYOUT.cache_key,
+        input=user_message,
         previous_response_id=previous_response_id)
-    return result
+
+    def record(result, latency):
+        get_cache_usage().record(result, latency)
+        if context is not None:
+            context.add_response(result)
+        return result
+
+    return request, record
+
+def chatbot_response(user_message: str, previous_response_id=None, context=None):
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    started = time.perf_counter()
+    result = client.responses.create(**request)
+    return record(result, time.perf_counter() - started)
+
+async def achatbot_response(user_message: str, previous_response_id=None, context=None):
+    # 여러 세션을 한 프로세스에서 처리하는 chat_server.py용 비동기 버전
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    started = time.perf_counter()
+    result = await async_client.responses.create(**request)
+    return record(result, time.perf_counter() - started)
+
+def chatbot_stream(user_message: str, previous_response_id=None, context=None):
+    # 스트리밍 버전. 토큰이 오는 대로 출력하고, 중간에 취소되어도 response.created에서 받은 id로 체인을 잇는다
+    request, record = prepare_turn(user_message, previous_response_id, context)
+    stats = StreamStats()
+    return ResponseStream(async_client, stats, on_complete=lambda response: record(response, stats.ttft),
+                          on_interrupt=context.add_interrupted if context else None, **request)
 
 if __name__=="__main__":
     previous_response_id = None
-    while True:
-        user_message = input("메시지: ")
-        if user_message.lower() == "exit":
-            print("대화를 종료합니다.")
-            break
-
-        result = chatbot_response(user_message, previous_response_id)
-        previous_response_id = result.id
-        print("어린왕자: " + result.output_text)
\ No newline at end of file
+    # CHAT_CONTEXT_BUDGET(토큰 수)을 설정하면 클라이언트 관리 맥락 모드로 동작
+    budget = os.environ.get("CHAT_CONTEXT_BUDGET")
+    context = ConversationContext(budget_tokens=int(budget)) if budget else None
+    # CHAT_STREAM=1 이면 답변을 스트리밍으로 출력하고, 답변 도중 새 메시지를 입력하면 생성을 중단한다
+    if os.environ.get("CHAT_STREAM") == "1":
+        asyncio.run(interruptible_chat(lambda message, previous_id: chatbot_stream(message, previous_id, context), "어린왕자"))
+        if context is not None:
+            print(context.report())
+            context.close()
+        print(f"프롬프트 캐시: {get_cache_usage().stats()}")
+    else:
+        while True:
+            user_message = input("메시지: ")
+            if user_message.lower() == "exit":
+                if context is not None:
+                    print(context.report())
+                    context.close()
+                print(f"프롬프트 캐시: {get_cache_usage().stats()}")
+                print("대화를 종료합니다.")
+                break
+
+            result = chatbot_response(user_message, previous_response_id, context)
+            previous_response_id = result.id
+            print("어린왕자: " + result.output_text)
\ No newline at end of file
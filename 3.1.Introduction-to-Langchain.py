@@ -1,7 +1,9 @@
 from langchain.chat_models import init_chat_model
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 model = init_chat_model("gpt-5-mini", model_provider= "openai")
 result = model.invoke("랭체인이 뭔가요?")
@@ -1,8 +1,10 @@
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 chat_model = ChatOpenAI(model= "gpt-5-mini")
 messages = [
@@ -1,5 +1,7 @@
-from langchain.prompts import PromptTemplate, load_prompt
+from langchain.prompts import PromptTemplate
 import os
+from prompt_registry import PromptRegistry
+from compiled_prompt import CompiledPrompt
 
 # from_template 사용 예제
 
@@ -16,10 +18,12 @@ template = PromptTemplate(
 
 print(template.format(article="OpenAI가 GPT-5를 공개했다.....", style="뉴스"))
 
-# load_prompt()함수 사용 - windows 내 encoding 문제 有
-# current_dir_path = os.path.dirname(os.path.abspath(__file__))
-# file_prompt = load_prompt(f"{current_dir_path}/template_example.yaml")
-# print(file_prompt.format(context="서울은 한국의 수도이다.", question="수도는?"))
+# 파일에서 프롬프트 읽기 - load_prompt() 대신 PromptRegistry 사용
+# (windows에서도 UTF-8로 읽고, 폴더의 yaml을 한 번만 읽어 메모리에 둠)
+current_dir_path = os.path.dirname(os.path.abspath(__file__))
+registry = PromptRegistry(current_dir_path)
+file_prompt = registry.get("template_example")
+print(file_prompt.format(context="서울은 한국의 수도이다.", question="수도는?"))
 
 # partial 변수 사용
 base_prompt = PromptTemplate.from_template("'{text}' 문장을 {lang}로 번역")
@@ -27,4 +31,8 @@ ko_prompt = base_prompt.partial(lang="Korean")
 en_prompt = base_prompt.partial(lang="English")
 
 print(ko_prompt.format(text="Hello"))
-print(en_prompt.format(text="안녕하세요"))
\ No newline at end of file
+print(en_prompt.format(text="안녕하세요"))
+
+# 컴파일된 템플릿 - 같은 템플릿을 대량으로 포맷할 때 (파싱은 한 번만)
+compiled_prompt = CompiledPrompt.from_langchain(base_prompt).partial(lang="Korean")
+print(compiled_prompt.format_many([{"text": "Hello"}, {"text": "Good morning"}]))
@@ -6,8 +6,12 @@ from langchain.chat_models import init_chat_model
 from pydantic import BaseModel, Field
 import os
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from chain_profiler import ChainProfiler
+from structured_stream import stream_structured
 
 load_dotenv()
+apply_mock_server_env()
 
 chat_model = ChatOpenAI(model="gpt-4.1-mini")
 chat_prompt_template = ChatPromptTemplate.from_messages(
@@ -29,9 +33,11 @@ print("-------------------------------------------------------------")
 chain = chat_prompt_template | chat_model | string_output_parser
 print(type(chain))
 
-result = chain.invoke({"question": "파이썬에서 딕셔너리를 정렬하는 방법은?"})
+profiler = ChainProfiler()  # CHAIN_PROFILE=1 일 때만 단계별 시간 기록
+result = chain.invoke({"question": "파이썬에서 딕셔너리를 정렬하는 방법은?"}, config=profiler.config())
 print(type(result))
 print(result)
+profiler.print_report()
 
 print("-------------------------------------------------------------")
 
@@ -48,4 +54,13 @@ result: MovieReview = structured_llm.invoke(
 )
 print(result.title)
 print(result.rating)
-print(result.review)
\ No newline at end of file
+print(result.review)
+print("-------------------------------------------------------------")
+# 3. 스트리밍 구조화 출력 - 필드가 완성되는 대로 바로 사용 (잘못된 출력이면 그 자리에서 생성 중단)
+for event in stream_structured(llm, MovieReview, "영화 '기생충'에 대한 리뷰를 작성해줘"):
+    if event.kind == "field" and event.field != "review":
+        print(event.value)
+    elif event.kind == "delta" and event.field == "review":
+        print(event.value, end="", flush=True)
+    elif event.kind == "done":
+        print()
@@ -1,11 +1,15 @@
 from typing import Any, List, AsyncIterator, Iterator
 from langchain_core.runnables import Runnable, RunnableLambda, RunnablePassthrough, RunnableParallel, RunnableBranch
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from llm_clients import get_chat_openai, apply_mock_server_env
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from chain_profiler import ChainProfiler
+from runnable_cache import cached
+from fast_chain import FastChain
 
 load_dotenv()
+apply_mock_server_env()
 
 # Runnable의 핵심 메스드들(개념적 표현)
 class RunnableInterface:
@@ -56,15 +60,17 @@ print(results)
 prompt = ChatPromptTemplate.from_template(
     "주어지는 문구에 대하여 50자 이내의 짧은 시를 작성: {word}"
 )
-model = ChatOpenAI(model="gpt-5-mini")
+model = get_chat_openai("gpt-5-mini") # 공유 커넥션 풀을 쓰는 같은 인스턴스를 재사용
 parser = StrOutputParser()
 
 # 1. LCEL로 체인 구성
 chain = prompt | model | parser
 
-# 2. 실행
-result = chain.invoke({"word": "평범한 일상"})
+# 2. 실행 (CHAIN_PROFILE=1 이면 프롬프트/모델/파서 단계별 시간 출력)
+profiler = ChainProfiler()
+result = chain.invoke({"word": "평범한 일상"}, config=profiler.config())
 print(result)
+profiler.print_report()
 
 
 ########################################################################
@@ -74,7 +80,7 @@ print(result)
 prompt = ChatPromptTemplate.from_template(
     "주어진 '{word}'와 유사한 단어 3가지를 나열해주세요. 단어만 나열합니다."
 )
-model = ChatOpenAI(model="gpt-5-mini")
+model = get_chat_openai("gpt-5-mini")
 parser = StrOutputParser()
 
 # 1. 병렬 처리 체인 구성
@@ -95,7 +101,7 @@ print(result)
 prompt = ChatPromptTemplate.from_template(
     "주어진 '{word}'와 유사한 단어 3가지를 나열해주세요. 단어만 나열합니다."
 )
-model = ChatOpenAI(model="gpt-5-mini")
+model = get_chat_openai("gpt-5-mini")
 parser = StrOutputParser()
 
 # 1. 여러 분석을 동시에 수행
@@ -112,7 +118,7 @@ print(result)
 ####################### RunnableBranch 사용 예제 #######################
 ########################################################################
 
-model = ChatOpenAI(model="gpt-5-mini")
+model = get_chat_openai("gpt-5-mini")
 parser = StrOutputParser()
 
 # 1. 입력된 텍스트가 영어인지 확인하는 함수
@@ -148,4 +154,21 @@ print(f"Synonyms for '{english_word['word']}': \n{english_result}\n")
 # 한국어 단어 예시
 korean_word = {"word": "행복"}
 korean_result = language_aware_chain.invoke(korean_word)
-print(f"Synonyms for '{korean_word['word']}': \n{korean_result}\n")
\ No newline at end of file
+print(f"Synonyms for '{korean_word['word']}': \n{korean_result}\n")
+
+# 5. 결과 캐시 - 같은 입력이 다시 오면 분기 판단과 모델 호출 없이 바로 반환
+cached_language_chain = cached(language_aware_chain, name="language-aware-synonyms", ttl=3600)
+for word in ["행복", "happy", "행복"]:
+    print(cached_language_chain.invoke({"word": word}))
+print(cached_language_chain.stats())
+
+########################################################################
+################# FastChain (스레드 풀 없이 빠르게 실행) ################
+########################################################################
+
+# 1. 함수만 있는 체인은 스레드 풀 없이 반복문으로 바로 실행
+print(FastChain(exclamation_runnable).batch(["안녕", "반가워", "좋은 아침"]))
+
+# 2. 람다는 그 자리에서, 모델 호출만 이벤트 루프에서 최대 8개씩 동시에 (같은 입력은 upstream 호출 1번으로 합침)
+fast_analysis_chain = FastChain(analysis_chain, max_concurrency=8)
+print(fast_analysis_chain.batch([{"word": "peaceful"}, {"word": "happy"}, {"word": "peaceful"}]))
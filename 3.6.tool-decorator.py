@@ -1,9 +1,15 @@
+import asyncio
+import os
 import random
+import time
 from langchain.tools import tool
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from streaming import start_input_thread
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 가위바위보 게임을 위한 Tool 정의
 @tool
@@ -32,29 +38,123 @@ def judge(user_choice, computer_choice):
     else:
         return "패배"
     
-# 4. 게임 루프
-print("가위바위보! (종료: q)")
-while (user_input := input("\n가위/바위/보: ")) != "q": # := 바다코끼리 연산자 -> 변수를 할당하는 동시에, 그 값이 q와 다른지 비교하는 조건식에 사용
-    # 5. LLM에게 tool 호출 요청
-    ai_msg = llm.invoke(
-        f"가위바위보 게임: 사용자가 {user_input}를 냈습니다. rps tool을 사용하세요."
+# 4. 결정용 LLM 호출 생략 조건
+def can_skip_tool_decision(tool, tool_choice=None) -> bool:
+    """tool 호출이 강제되었거나(tool_choice) 인자가 없는 tool이면 결정용 LLM 호출의 결과가 항상 같으므로 건너뛴다."""
+    return tool_choice == tool.name or not tool.args
+
+def commentary_prompt(user_choice, computer_choice, result):
+    return (
+        f"가위바위보 게임 결과를 재미있게 해설해주세요. "
+        f"사용자: {user_choice}, AI: {computer_choice}, 결과: 사용자의 {result}"
     )
-    
-    # 6. Tool 호출 확인 및 실행
-    if ai_msg.tool_calls:
-        print(type(rps)) # <class 'langchain_core.tools.structured.StructuredTool'>
-        llm_choice=rps.invoke("") # 7. Tool 호출 실행
-        print(f" LLM이 선택한 도구: {llm_choice}")
-        result = judge(user_input, llm_choice)
-        print(f"승부: {result}")
 
-        # 8. 결과 응답 생성
-        final = llm_for_chat.invoke(
-            f"가위바위보 게임 결과를 재미있게 해설해주세요. "
-            f"사용자: {user_input}, AI: {llm_choice}, 결과: 사용자의 {result}"
+def print_latency_report(mode, rounds):
+    """라운드별 지연 시간 요약 (입력 -> 승부 출력, 입력 -> 해설 완료)"""
+    if not rounds:
+        return
+    def mean(key):
+        values = [r[key] for r in rounds if r.get(key) is not None]
+        return f"{sum(values) / len(values):.0f}ms" if values else "-"
+    print(f"\n[{mode}] {len(rounds)}라운드 평균: 승부까지 {mean('result_ms')}, "
+          f"해설 첫 토큰까지 {mean('first_token_ms')}, 해설 완료까지 {mean('total_ms')}")
+
+def elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+# 5. 게임 루프 - 기존 방식: 결정용 LLM 호출 -> tool 실행 -> 해설용 LLM 호출 (LLM 왕복 2번)
+def play_basic():
+    rounds = []
+    print("가위바위보! (종료: q)")
+    while (user_input := input("\n가위/바위/보: ")) != "q": # := 바다코끼리 연산자 -> 변수를 할당하는 동시에, 그 값이 q와 다른지 비교하는 조건식에 사용
+        started = time.perf_counter()
+        # 5-1. LLM에게 tool 호출 요청
+        ai_msg = llm.invoke(
+            f"가위바위보 게임: 사용자가 {user_input}를 냈습니다. rps tool을 사용하세요."
         )
-        print(final)
+
+        # 5-2. Tool 호출 확인 및 실행
+        if ai_msg.tool_calls:
+            print(type(rps)) # <class 'langchain_core.tools.structured.StructuredTool'>
+            llm_choice=rps.invoke("") # 5-3. Tool 호출 실행
+            print(f" LLM이 선택한 도구: {llm_choice}")
+            result = judge(user_input, llm_choice)
+            print(f"승부: {result}")
+            round_latency = {"result_ms": elapsed_ms(started)}
+
+            # 5-4. 결과 응답 생성
+            final = llm_for_chat.invoke(commentary_prompt(user_input, llm_choice, result))
+            round_latency["total_ms"] = elapsed_ms(started)
+            rounds.append(round_latency)
+            print(final)
+            print(f"LLM 해설: {final.content}")
+            print(f"게임 요약: 당신({user_input}) vs AI({llm_choice}) => {result}")
+            print(f"(라운드 지연: 승부 {round_latency['result_ms']:.0f}ms, 해설 {round_latency['total_ms']:.0f}ms)")
+        else:
+            print("Tool 호출 실패")
+    print_latency_report("basic", rounds)
+
+# 6. 빠른 방식: rps는 인자가 없어 결정용 호출을 건너뛰고 바로 로컬에서 실행 (LLM 왕복 1번)
+def play_fast():
+    rounds = []
+    print("가위바위보! (종료: q)")
+    while (user_input := input("\n가위/바위/보: ")) != "q":
+        started = time.perf_counter()
+        llm_choice = rps.invoke({})
+        result = judge(user_input, llm_choice)
+        print(f"AI: {llm_choice} -> 승부: {result}")
+        round_latency = {"result_ms": elapsed_ms(started)}
+        final = llm_for_chat.invoke(commentary_prompt(user_input, llm_choice, result))
+        round_latency["total_ms"] = elapsed_ms(started)
+        rounds.append(round_latency)
         print(f"LLM 해설: {final.content}")
-        print(f"게임 요약: 당신({user_input}) vs AI({llm_choice}) => {result}")
-    else:
-        print("Tool 호출 실패")
\ No newline at end of file
+        print(f"(라운드 지연: 승부 {round_latency['result_ms']:.1f}ms, 해설 {round_latency['total_ms']:.0f}ms)")
+    print_latency_report("fast", rounds)
+
+# 7. 파이프라인 방식: 승부는 바로 출력하고, 해설은 스트리밍으로 출력하는 동안 다음 입력을 받는다
+async def play_pipelined():
+    rounds = []
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    start_input_thread(loop, lines, stop_words=("q",))
+
+    async def stream_commentary(user_input, llm_choice, result, started, round_latency):
+        print("LLM 해설: ", end="", flush=True)
+        async for chunk in llm_for_chat.astream(commentary_prompt(user_input, llm_choice, result)):
+            if "first_token_ms" not in round_latency:
+                round_latency["first_token_ms"] = elapsed_ms(started)
+            print(chunk.content, end="", flush=True)
+        round_latency["total_ms"] = elapsed_ms(started)
+        print(f"\n(라운드 지연: 승부 {round_latency['result_ms']:.1f}ms, "
+              f"해설 첫 토큰 {round_latency.get('first_token_ms', 0):.0f}ms, 완료 {round_latency['total_ms']:.0f}ms)")
+        print("\n가위/바위/보: ", end="", flush=True)
+
+    print("가위바위보! (종료: q)")
+    print("\n가위/바위/보: ", end="", flush=True)
+    commentary = None
+    # 입력 스레드와 같은 기준(strip().lower())으로 종료를 판단해야 " Q" 입력 뒤에 큐를 영원히 기다리지 않는다
+    while (user_input := await lines.get()) is not None and user_input.strip().lower() != "q":
+        started = time.perf_counter()
+        # 앞 라운드 해설이 아직 출력 중이면 끝날 때까지 기다린다 (생성은 입력을 받는 동안 이미 진행됨)
+        if commentary is not None:
+            await commentary
+        llm_choice = rps.invoke({})
+        result = judge(user_input, llm_choice)
+        print(f"AI: {llm_choice} -> 승부: {result}")
+        round_latency = {"result_ms": elapsed_ms(started)}
+        rounds.append(round_latency)
+        commentary = asyncio.ensure_future(stream_commentary(user_input, llm_choice, result, started, round_latency))
+    if commentary is not None:
+        await commentary
+    print_latency_report("pipelined", rounds)
+
+# RPS_MODE=basic|fast|pipelined (기본 pipelined)
+mode = os.environ.get("RPS_MODE", "pipelined")
+if mode not in ("basic", "fast", "pipelined"):
+    raise ValueError(f"RPS_MODE는 basic, fast, pipelined 중 하나여야 합니다: {mode!r}")
+if mode == "basic" or not can_skip_tool_decision(rps):
+    play_basic()
+elif mode == "fast":
+    play_fast()
+else:
+    asyncio.run(play_pipelined())
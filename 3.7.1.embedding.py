@@ -1,13 +1,18 @@
 from langchain_openai import OpenAIEmbeddings
-import numpy as np
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from embedding_cache import CachedEmbeddings
+from similarity_engine import SimilarityEngine
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 임베딩 모델 초기화
 # 60억 토큰을 학습했고, 3072차원 벡터를 반환하므로 다국어(한국어 포함) 의미 파악 성능이 높음
 # 더 작은 모델인 text-embedding-3-small로는 결과가 좋지 않았음.
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+# 메모리가 부담되면 앞쪽 256/512차원만 메모리에 두고 후보만 전체 차원으로 다시 점수 매기는 matryoshka_index.py 참고
+# 같은 단어는 .cache/embeddings에 저장된 벡터를 다시 씀 (두 번째 실행부터 API 호출 없음)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large"))
 
 # 2. 단어들을 임베딩으로 변환
 words = ["강아지", "고양이", "자동차", "비행기"]
@@ -17,16 +22,16 @@ word_embeddings = embeddings.embed_documents(words)
 query = "동물"
 query_embedding = embeddings.embed_query(query)
 
-# 4. 코사인 유사도 계산 함수
-def cosine_similarity(vec1, vec2): 
-    """두 벡터 간의 코사인 유사도를 계산합니다."""
-    dot_product = np.dot(vec1, vec2)
-    norm_vec1 = np.linalg.norm(vec1)
-    norm_vec2 = np.linalg.norm(vec2)
-    return dot_product / (norm_vec1 * norm_vec2 + 1e-9)
+# 4. 코사인 유사도 계산
+# 단어 벡터를 한 번 정규화해 두고 행렬 곱 한 번으로 모든 단어와의 유사도를 계산 (similarity_engine.py 참고)
+engine = SimilarityEngine(word_embeddings)
+similarities = engine.similarities(query_embedding)[0]
 
 # 5. 각 단어와 쿼리의 유사도 계산
 print(f"'{query}'에 대한 유사도: ")
-for word, embedding in zip(words, word_embeddings):
-    similarity = cosine_similarity(query_embedding, embedding)
-    print(f"  {word}: {similarity:.3f}")
\ No newline at end of file
+for word, similarity in zip(words, similarities):
+    print(f"  {word}: {similarity:.3f}")
+
+# 6. 가장 가까운 단어 top-k (전체 정렬 대신 argpartition)
+scores, indices = engine.search(query_embedding, k=2)
+print(f"가장 가까운 단어: {[words[i] for i in indices]}")
@@ -3,11 +3,14 @@ from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 from langchain.text_splitter import CharacterTextSplitter
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
+apply_mock_server_env()
 
 # 임베딩 모델 초기화
-embeddings = OpenAIEmbeddings(model = "text-embedding-3-large")
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model = "text-embedding-3-large"))
 
 # 1. 샘플 텍스트 데이터
 texts = [
@@ -38,7 +41,7 @@ for i , doc in enumerate(docs):
 ######################## Document 객체 사용하여 Metadata 활용 ########################
 #####################################################################################
 
-embeddings = OpenAIEmbeddings()
+embeddings = CachedEmbeddings(OpenAIEmbeddings())
 text_splitter = CharacterTextSplitter(separator=".", chunk_size=50, chunk_overlap=20)
 
 documents = [
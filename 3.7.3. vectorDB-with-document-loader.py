@@ -1,17 +1,21 @@
 from pathlib import Path
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import DirectoryLoader
 from langchain.text_splitter import CharacterTextSplitter
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from embedding_cache import CachedEmbeddings
+from embedding_ingest import ingest_documents
 
 load_dotenv()
+apply_mock_server_env()
 
 # 의존성 패키지 설치 필요
 # pip install unstructured 
 
 # 임베딩 모델과 텍스트 분할기 준비
-embeddings = OpenAIEmbeddings()
+# 바뀌지 않은 문서 조각은 캐시된 벡터를 재사용
+embeddings = CachedEmbeddings(OpenAIEmbeddings())
 text_splitter = CharacterTextSplitter(chunk_size=200, chunk_overlap=20)
 
 # 샘플 문서들 준비
@@ -30,7 +34,8 @@ documents = loader.load()
 split_docs = text_splitter.split_documents(documents)
 
 # FAISS 벡터 스토어 생성
-vectorstore = FAISS.from_documents(split_docs, embeddings)
+# 토큰 한도에 맞춰 묶은 배치를 동시에 임베딩하고, 끝난 배치부터 바로 색인에 추가 (embedding_ingest.py 참고)
+vectorstore = ingest_documents(split_docs, embeddings)
 
 # 유사도 검색 수행
 query = "초보자가 배우기 좋은 프로그래밍 언어는?"
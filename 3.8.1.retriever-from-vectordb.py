@@ -5,12 +5,16 @@ from langchain.text_splitter import CharacterTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from chain_profiler import ChainProfiler
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
+apply_mock_server_env()
 
 
 # 임베딩 모델과 텍스트 분할기 준비
-embeddings = OpenAIEmbeddings()
+embeddings = CachedEmbeddings(OpenAIEmbeddings())
 text_splitter = CharacterTextSplitter(separator=".", chunk_size=50, chunk_overlap=20)
 
 # 샘플 문서들 준비
@@ -61,6 +65,10 @@ message = """
 prompt = ChatPromptTemplate.from_messages([("human", message)])
 chain = {"context": retriever, "question": RunnablePassthrough()} | prompt | llm
 
-response = chain.invoke("초보자가 배우기 좋은 프로그래밍 언어는?")
+profiler = ChainProfiler()  # CHAIN_PROFILE=1 일 때만 검색/프롬프트/모델 단계별 시간 기록
+response = chain.invoke("초보자가 배우기 좋은 프로그래밍 언어는?", config=profiler.config())
 print("\nLLM 응답: ")
-print(response.content)
\ No newline at end of file
+print(response.content)
+profiler.print_report()
+if profiler.enabled:
+    profiler.write_flamegraph("retriever-chain.folded")  # flamegraph.pl / speedscope로 시각화
\ No newline at end of file
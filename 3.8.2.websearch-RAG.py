@@ -1,16 +1,30 @@
 from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+import os
 import time
+import httpx
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
+
+# MOCK_LLM_SERVER가 설정되어 있으면 DuckDuckGo 대신 로컬 모의 서버(mock_llm_server.py)를 검색
+MOCK_LLM_SERVER = os.environ.get("MOCK_LLM_SERVER")
+
+class MockWebSearch:
+    """DuckDuckGoSearchResults와 같은 run() 인터페이스로 모의 서버를 검색"""
+    def run(self, query):
+        response = httpx.get(f"{MOCK_LLM_SERVER.rstrip('/')}/duckduckgo/search", params={"q": query})
+        response.raise_for_status()
+        return str(response.json())
 
 # 1. RealtimeWebRAG: 실시간 웹 검색을 활용한 RAG
 class RealtimeWebRAG:
     """실시간 웹 검색을 활용하는 RAG"""
     def __init__(self):
-        self.search = DuckDuckGoSearchResults()
+        self.search = MockWebSearch() if MOCK_LLM_SERVER else DuckDuckGoSearchResults()
         self.llm = ChatOpenAI(temperature=0)
         message = """웹에서 검색한 최신 정보를 바탕으로 답변하세요.
         검색결과: 
@@ -1,7 +1,9 @@
 from agents import Agent, Runner
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 에이전트 생성
 ## name, instructions 외에도, tools, handoffs, model, guardrails, mcp_servers등의 설정항목 존재
@@ -2,8 +2,10 @@ from agents import Agent, Runner, function_tool
 from duckduckgo_search import DDGS
 from gnews import GNews
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 도구 정의
 @function_tool()
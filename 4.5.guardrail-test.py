@@ -5,8 +5,11 @@ from agents import (Agent, InputGuardrailTripwireTriggered, OutputGuardrailTripw
 from pydantic import BaseModel, field_validator
 from typing import Optional
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from prompt_layout import PromptLayout, get_cache_usage
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 입력 검증용 데이터 모델
 class ContentSafetyCheck(BaseModel):
@@ -29,13 +32,14 @@ class ResponseFormat(BaseModel):
 safety_agent = Agent(
     name="안전성 검사관",
     model = "gpt-5-mini",
-    instructions="""
+    # 고정 지시문은 정규화해서 매 호출 같은 바이트열로 맨 앞에 보낸다 (prompt caching)
+    instructions=PromptLayout("""
     사용자 입력의 안전성을 검사합니다.
     다음 항목을 확인하세요:
     - 개인 정보 포함 여부
     - 유해 콘텐츠
     - 악의적인 요청
-    """,
+    """, name="safety-check").instructions,
     output_type=ContentSafetyCheck
 )
 
@@ -45,6 +49,7 @@ async def content_safety_guardrail(ctx, agent, input_data):
     """콘텐츠 안전성을 검사하는 가드레일"""
 
     result = await Runner.run(safety_agent, input_data, context = ctx.context)
+    get_cache_usage().record(result.context_wrapper.usage)
     safety_check = result.final_output_as(ContentSafetyCheck)
     print(f"안전성 검사 결과: {safety_check}")
     return GuardrailFunctionOutput(
@@ -75,12 +80,12 @@ async def json_format_guardrail(ctx, agent, output_data):
 main_agent = Agent(
     name="메인 어시스턴트",
     model="gpt-5-mini",
-    instructions="""사용자의 요청을 도와드립니다.
+    instructions=PromptLayout("""사용자의 요청을 도와드립니다.
     중요: 반드시 다음 JSON 형식으로만 응답하세요:
     {"status": "success", "result": "결과 내용"}
     또는
     {"status": "fail", "result": "실패 이유"}
-    """,
+    """, name="main-assistant").instructions,
     input_guardrails=[content_safety_guardrail],
     output_guardrails=[json_format_guardrail]
 )
@@ -89,8 +94,8 @@ main_agent = Agent(
 bad_format_agent = Agent(
     name="잘못된 형식 에이전트",
     model="gpt-5-mini",
-    instructions="""사용자의 요청에 일반적인 텍스트로 응답하세요.
-    JSON 형식을 사용하지 마세요. 그냥 평범한 문장으로 답변하세요.""",
+    instructions=PromptLayout("""사용자의 요청에 일반적인 텍스트로 응답하세요.
+    JSON 형식을 사용하지 마세요. 그냥 평범한 문장으로 답변하세요.""", name="bad-format").instructions,
     input_guardrails=[content_safety_guardrail],
     output_guardrails=[json_format_guardrail],
 )
@@ -107,6 +112,7 @@ async def guardrail_example():
         print(f"\n사용자: {user_input}")
         try:
             result = await Runner.run(main_agent, user_input)
+            get_cache_usage().record(result.context_wrapper.usage)
             print(f"시스템: {result.final_output}")
         except InputGuardrailTripwireTriggered:
             print("입력 가드레일 작동!")
@@ -136,3 +142,4 @@ async def bad_guardrail_example():
 
 asyncio.run(guardrail_example())
 asyncio.run(bad_guardrail_example())
+print(f"\n프롬프트 캐시: {get_cache_usage().stats()}")
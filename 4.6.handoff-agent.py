@@ -1,8 +1,10 @@
 import asyncio
 from agents import Agent, Runner
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 async def simple_handoff_example():
     print("Agent 병원 안내 시스템\n")
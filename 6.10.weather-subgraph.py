@@ -1,3 +1,5 @@
+import os
+from urllib.parse import urlparse
 import httpx
 from geopy.geocoders import Nominatim
 from langchain_core.messages import HumanMessage
@@ -7,12 +9,22 @@ from langchain.chat_models import init_chat_model
 from typing import Literal
 import json
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
+
+# MOCK_LLM_SERVER가 설정되어 있으면 Nominatim/open-meteo 대신 로컬 모의 서버(mock_llm_server.py)를 사용
+MOCK_LLM_SERVER = os.environ.get("MOCK_LLM_SERVER")
+WEATHER_API_BASE = MOCK_LLM_SERVER.rstrip("/") if MOCK_LLM_SERVER else "https://api.open-meteo.com"
 
 def get_coordinates(city_name: str) -> tuple[float, float]:
     """도시 이름을 받아 위도와 경도를 반환합니다."""
-    geolocator = Nominatim(user_agent="weather_app_langgraph")
+    if MOCK_LLM_SERVER:
+        mock_url = urlparse(MOCK_LLM_SERVER)
+        geolocator = Nominatim(user_agent="weather_app_langgraph", domain=mock_url.netloc, scheme=mock_url.scheme)
+    else:
+        geolocator = Nominatim(user_agent="weather_app_langgraph")
     location = geolocator.geocode(city_name)
     if location:
         return location.latitude, location.longitude
@@ -23,7 +35,7 @@ def get_weather(city_name: str) -> str:
     """도시 이름을 받아 해당 도시의 현재 날씨 정보를 반환합니다."""
     print(f"날씨 조회: {city_name}")
     latitude, longitude = get_coordinates(city_name)
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
+    url = f"{WEATHER_API_BASE}/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
     response = httpx.get(url)
     response.raise_for_status()
     return json.dumps(response.json())
@@ -5,8 +5,10 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 import random
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 그래프 상태 정의 - 워크플로 전체에서 공유되는 데이터 구조
 class EmotionBotState(BaseModel):
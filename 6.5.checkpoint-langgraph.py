@@ -3,11 +3,13 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import InMemorySaver
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
 import json
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
+from prompt_layout import PromptLayout, get_cache_usage
 
 load_dotenv()
+apply_mock_server_env()
 
 # 1. 그래프 상태 정의
 class MemoryBotState(BaseModel):
@@ -19,32 +21,34 @@ class MemoryBotState(BaseModel):
 
 llm = ChatOpenAI(model="gpt-5-mini")
 
+# 고정된 지시문/출력 형식은 앞에, 매번 바뀌는 기억 정보는 뒤에 두어 prompt caching이 맞도록 한다
+MEMORY_BOT_LAYOUT = PromptLayout("""
+당신은 사용자의 정보를 기억하는 메모리 봇입니다.
+
+사용자 메시지를 분석하여 다음 JSON 형태로 응답하세요:
+{
+  "response": "사용자에게 줄 응답 메시지",
+  "new_name": "새로 알게 된 이름 (없으면 null)",
+  "new_likes": ["새로 알게 된 좋아하는 것들"],
+  "new_dislikes": ["새로 알게 된 싫어하는 것들"]
+}
+""", name="memory-bot")
+
 # 2. 메시지 처리 노드 - 메모리 로드/저장 로직 제거
 def process_message(state: MemoryBotState) -> Dict[str, Any]:
     message = state.user_message
     user_name = state.user_name
     preferences = state.user_preferences.copy()
     
-    # 시스템 프롬프트
-    system_prompt = f"""
-당신은 사용자의 정보를 기억하는 메모리 봇입니다.
-현재 기억하고 있는 정보:
+    # 매 턴 바뀌는 기억 정보 (고정 시스템 프롬프트 뒤에 붙는다)
+    memory = f"""현재 기억하고 있는 정보:
 - 사용자 이름: {user_name if user_name else "모름"}
 - 좋아하는 것: {preferences.get("likes", [])}
-- 싫어하는 것: {preferences.get("dislikes", [])}
-
-사용자 메시지를 분석하여 다음 JSON 형태로 응답하세요:
-{{
-  "response": "사용자에게 줄 응답 메시지",
-  "new_name": "새로 알게 된 이름 (없으면 null)",
-  "new_likes": ["새로 알게 된 좋아하는 것들"],
-  "new_dislikes": ["새로 알게 된 싫어하는 것들"]
-}}
-"""
+- 싫어하는 것: {preferences.get("dislikes", [])}"""
     
-    messages = [SystemMessage(content=system_prompt),
-                HumanMessage(content=message)]
+    messages = MEMORY_BOT_LAYOUT.langchain_messages(user=message, dynamic=memory)
     response = llm.invoke(messages)
+    get_cache_usage().record(response)
     result = json.loads(response.content)
 
     # 새로운 정보 업데이트
@@ -108,6 +112,7 @@ def main():
             f"메모리: 이름={result.get('user_name', '없음')}"
             f"좋아하는 것={result.get('user_preferences',{})}\n"
         )
+    print(f"프롬프트 캐시: {get_cache_usage().stats()}")
 
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -6,8 +6,10 @@ from langchain.chat_models import init_chat_model
 import math
 from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
+from llm_clients import apply_mock_server_env
 
 load_dotenv()
+apply_mock_server_env()
 
 def calculator(expression: str) -> str:
     """수학 계산을 수행"""
@@ -1,4 +1,6 @@
-from langchain_openai import ChatOpenAI
+from llm_clients import get_chat_openai, apply_mock_server_env
+from single_flight import get_single_flight
+from prompt_layout import PromptLayout, get_cache_usage
 from langchain.prompts import ChatPromptTemplate
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -8,23 +10,25 @@ from a2a.utils import new_agent_text_message
 from dotenv import load_dotenv
 
 load_dotenv()
+apply_mock_server_env()
+
+# 시스템 프롬프트는 정규화된 같은 문자열로 항상 맨 앞에 둔다 (prompt caching)
+HELLO_AGENT_LAYOUT = PromptLayout(
+    """당신은 친절한 Hello World 에이전트입니다.
+            사용자와 간단한 대화를 나누고, 인사와 기본적인 질문에 답변합니다. 
+            당신의 목표는 사용자에게 친근하고 도움이 되는 경험을 제공하는 것입니다.""",
+    name="hello-agent",
+)
 
 class HelloAgent:
     """1. 랭체인과 OpenAI를 사용한 간단한 Hello World 에이전트."""
 
     def __init__(self):
-        self.chat = ChatOpenAI(
-            model="gpt-5-mini",
-        )
+        self.chat = get_chat_openai("gpt-5-mini")
 
         self.prompt = ChatPromptTemplate.from_messages(
             [
-                (
-                    "system",
-                    """당신은 친절한 Hello World 에이전트입니다.
-            사용자와 간단한 대화를 나누고, 인사와 기본적인 질문에 답변합니다. 
-            당신의 목표는 사용자에게 친근하고 도움이 되는 경험을 제공하는 것입니다.""",
-                ),
+                ("system", HELLO_AGENT_LAYOUT.instructions),
                 ("user", "{message}"),
             ]
         )
@@ -32,7 +36,15 @@ class HelloAgent:
     async def invoke(self, user_message: str) -> str:
         """2. 유저 메시지를 처리하고 응답을 생성합니다."""
         chain = self.prompt | self.chat
-        response = await chain.ainvoke({"message": user_message})
+
+        async def call():
+            response = await chain.ainvoke({"message": user_message})
+            # 실제로 호출한 쪽에서만 기록 (결과를 나눠 받는 대기자들이 같은 사용량을 또 세지 않도록)
+            get_cache_usage().record(response)
+            return response
+
+        # 같은 메시지가 동시에 여러 번 들어오면 LLM 호출은 한 번만 하고 결과를 공유
+        response = await get_single_flight().do(("HelloAgent.invoke", user_message), call)
         return response.content
 
 
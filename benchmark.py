@@ -0,0 +1,429 @@
+"""챕터별 핵심 경로(hot path) 종단간 벤치마크.
+
+로컬 모의 서버(mock_llm_server.py)를 별도 프로세스로 띄우고 각 시나리오를 지정한 동시성으로 실행해
+p50/p95/p99 지연 시간, 처리량, 첫 토큰까지의 시간(TTFT), 최대 RSS, CPU 시간을 보고한다.
+(모의 서버가 다른 프로세스라 CPU 시간/RSS에는 시나리오 쪽 비용만 잡힌다)
+결과는 JSON 기준선(baseline)으로 저장해 두었다가 다음 실행과 비교해 성능 저하를 잡아낼 수 있다.
+
+시나리오 - 가능한 한 예제 파일을 그대로 불러와 그 함수/체인/그래프를 실행한다
+- streaming : 1.3의 stream_chat_completion (TTFT 측정)
+- lcel      : 3.5의 analysis_chain (불러올 때 3.5의 예제 코드가 한 번 실행됨)
+- faiss     : 3.7.3과 같은 경로 (CachedEmbeddings + embedding_ingest로 documents/ 적재 후 유사도 검색)
+              3.7.3은 unstructured 패키지가 필요한 로더를 써서 파일을 직접 불러오지 않는다
+- graph     : 6.4의 감정 분석 그래프 (LLM 노드 + 조건부 라우팅)
+- mcp       : 7.5 서버의 MCP 도구 호출 왕복 (인메모리 전송)
+- a2a       : 8.4.1 에이전트 카드 + agent_executor로 띄운 A2A 서버와 메시지 왕복
+
+실행 예:
+    python benchmark.py --concurrency 16 --iterations 200 --save baseline.json
+    python benchmark.py --scenarios streaming,lcel --compare baseline.json --threshold 0.1
+    python benchmark.py --server http://127.0.0.1:8080   # 이미 띄워 둔 모의 서버 사용
+"""
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, redirect_stdout
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+
+def load_script(filename: str, module_name: str):
+    """'7.5.hello-mcp-server.py'처럼 점이 들어간 예제 파일을 모듈로 불러온다."""
+    spec = importlib.util.spec_from_file_location(module_name, BASE_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def load_script_async(filename: str, module_name: str):
+    """예제 파일을 스레드에서 불러온다 (최상위 코드에서 asyncio.run을 부르는 예제도 있으므로)."""
+    return await asyncio.to_thread(load_script, filename, module_name)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def mock_server_process(ttft: float, tokens_per_second: float):
+    """모의 서버를 별도 프로세스로 띄우고 주소를 돌려준다 (측정하는 프로세스의 CPU/메모리/GIL을 쓰지 않도록)."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / "mock_llm_server.py"), "--port", str(port),
+         "--ttft", str(ttft), "--tokens-per-second", str(tokens_per_second)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"모의 서버가 종료되었습니다 (exit code {process.returncode})")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("모의 서버가 30초 안에 시작되지 않았습니다")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+# ----------------------------------------------------------------------------- 자원 측정
+class ResourceMonitor:
+    """시나리오 실행 중 CPU 시간과 최대 RSS를 측정."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    @contextmanager
+    def measure(self):
+        cpu_started = time.process_time()
+        thread = None
+        if self._process is not None:
+            self.peak_rss = self._process.memory_info().rss
+            thread = threading.Thread(target=self._sample, daemon=True)
+            thread.start()
+        try:
+            yield self
+        finally:
+            self.cpu_seconds = time.process_time() - cpu_started
+            if thread is not None:
+                self._stop.set()
+                thread.join()
+            else:
+                # psutil이 없으면 프로세스 전체의 최대 RSS (리눅스: KB 단위)
+                try:
+                    import resource
+                    self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                except ImportError:
+                    self.peak_rss = 0
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ----------------------------------------------------------------------------- 시나리오
+# 각 시나리오는 "한 번 실행" 코루틴 함수를 yield하는 async context manager.
+# 실행 함수가 숫자를 돌려주면 그 값을 TTFT(초)로 기록한다.
+
+class _NullRenderer:
+    """출력하지 않는 렌더러 (스트리밍 시나리오의 화면 출력 비용 제외)."""
+
+    def write(self, frame: str):
+        pass
+
+    def close(self, stats=None):
+        pass
+
+
+@asynccontextmanager
+async def streaming_scenario():
+    script = await load_script_async("1.3.stream-api.py", "stream_api")
+    # 같은 프롬프트는 스트림 하나로 합쳐지므로 요청마다 프롬프트를 다르게 한다
+    counter = itertools.count()
+
+    async def once():
+        stats = await script.stream_chat_completion(f"스트리밍이 뭐야? ({next(counter)})", script.default_model, _NullRenderer())
+        return stats.ttft
+
+    yield once
+
+
+@asynccontextmanager
+async def lcel_scenario():
+    script = await load_script_async("3.5.RunnableLCEL.py", "runnable_lcel")
+    words = itertools.cycle(["평범한 일상", "peaceful", "행복", "happy"])
+
+    async def once():
+        await script.analysis_chain.ainvoke({"word": next(words)})
+
+    yield once
+
+
+@asynccontextmanager
+async def faiss_scenario():
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    from langchain_openai import OpenAIEmbeddings
+    from langchain.text_splitter import CharacterTextSplitter
+    from embedding_cache import CachedEmbeddings
+    from embedding_ingest import EmbeddingIngestor
+
+    # 오프라인 환경에서는 tiktoken 파일을 받을 수 없으므로 토큰 길이 검사를 끈다
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(check_embedding_ctx_length=False))
+    loader = DirectoryLoader(str(BASE_DIR / "documents"), glob="**/*.txt", loader_cls=TextLoader,
+                             loader_kwargs={"encoding": "utf-8"})
+    split_docs = CharacterTextSplitter(chunk_size=200, chunk_overlap=20).split_documents(loader.load())
+    vectorstore = await EmbeddingIngestor(embeddings).aingest_documents(split_docs)
+
+    async def once():
+        await vectorstore.asimilarity_search("초보자가 배우기 좋은 프로그래밍 언어는?", k=2)
+
+    yield once
+
+
+@asynccontextmanager
+async def graph_scenario():
+    script = await load_script_async("6.4.sentiment-analysis-chatbot.py", "sentiment_chatbot")
+    app = script.create_emotion_bot_graph()
+    messages = itertools.cycle(["오늘 정말 기분이 좋아요!", "너무 슬프고 힘들어요...", "날씨가 어떤가요?"])
+
+    async def once():
+        await app.ainvoke(script.EmotionBotState(user_message=next(messages)))
+
+    yield once
+
+
+@asynccontextmanager
+async def mcp_scenario():
+    from fastmcp import Client
+
+    server = load_script("7.5.hello-mcp-server.py", "hello_mcp_server")
+    async with Client(server.mcp) as client:
+        async def once():
+            await client.call_tool("hello", {"name": "연규"})
+
+        yield once
+
+
+@asynccontextmanager
+async def a2a_scenario():
+    import httpx
+    import uvicorn
+    from uuid import uuid4
+    from a2a.client import A2ACardResolver
+    from a2a.client.client import ClientConfig
+    from a2a.client.client_factory import ClientFactory
+    from a2a.server.apps import A2AFastAPIApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore
+    from a2a.types import Message
+    from agent_executor import HelloAgentExecutor
+
+    server_module = load_script("8.4.1.a2a-server.py", "a2a_server")
+    port = _free_port()
+    agent_card = server_module.create_agent_card()
+    agent_card.url = f"http://127.0.0.1:{port}/"
+    handler = DefaultRequestHandler(agent_executor=HelloAgentExecutor(), task_store=InMemoryTaskStore())
+    app = A2AFastAPIApplication(agent_card=agent_card, http_handler=handler).build()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0)) as httpx_client:
+            card = await A2ACardResolver(httpx_client=httpx_client, base_url=f"http://127.0.0.1:{port}").get_agent_card()
+            client = ClientFactory(ClientConfig(httpx_client=httpx_client, streaming=False)).create(card)
+            # 같은 문장을 동시에 보내면 agent_executor의 single_flight가 한 번의 호출로 합쳐 버리므로 요청마다 다르게
+            counter = itertools.count()
+
+            async def once():
+                text = f"안녕하세요 ({next(counter)})"
+                message = Message(role="user", parts=[{"kind": "text", "text": text}], messageId=uuid4().hex)
+                async for event in client.send_message(message):
+                    if isinstance(event, Message):
+                        break
+
+            yield once
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+SCENARIOS = {
+    "streaming": streaming_scenario,
+    "lcel": lcel_scenario,
+    "faiss": faiss_scenario,
+    "graph": graph_scenario,
+    "mcp": mcp_scenario,
+    "a2a": a2a_scenario,
+}
+
+
+# ----------------------------------------------------------------------------- 실행/리포트
+async def run_scenario(name: str, iterations: int, concurrency: int, warmup: int) -> dict:
+    latencies, ttfts = [], []
+    errors = 0
+    monitor = ResourceMonitor()
+    # 예제 함수들이 찍는 진행 출력은 버린다 (오류는 stderr로)
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        async with SCENARIOS[name]() as once:
+            # 예제 모듈이 켜 둔 요청별 INFO 로그가 측정값에 섞이지 않도록 한다
+            for logger_name in ("httpx", "mcp", "uvicorn.access"):
+                logging.getLogger(logger_name).setLevel(logging.WARNING)
+            for _ in range(warmup):
+                await once()
+
+            remaining = iter(range(iterations))
+
+            async def worker():
+                nonlocal errors
+                for _ in remaining:
+                    started = time.perf_counter()
+                    try:
+                        ttft = await once()
+                    except Exception as e:
+                        errors += 1
+                        if errors == 1:
+                            print(f"  [{name}] 오류: {type(e).__name__}: {e}", file=sys.stderr)
+                        continue
+                    latencies.append(time.perf_counter() - started)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+
+            with monitor.measure():
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                wall = time.perf_counter() - started
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "ttft_p50_ms": ms(percentile(ttfts, 50)),
+        "ttft_p95_ms": ms(percentile(ttfts, 95)),
+        "peak_rss_mb": round(monitor.peak_rss / 2**20, 1),
+        "cpu_seconds": round(monitor.cpu_seconds, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """p95 지연/TTFT p95가 threshold 이상 늘었거나 처리량이 threshold 이상 줄면 회귀로 판단."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for key, label in (("p95_ms", "p95"), ("ttft_p95_ms", "TTFT p95")):
+            if previous.get(key) and current.get(key):
+                change = current[key] / previous[key] - 1
+                if change > threshold:
+                    regressions.append(f"{name}: {label} {previous[key]}ms -> {current[key]}ms (+{change:.0%})")
+        if previous.get("throughput_per_s") and current.get("throughput_per_s"):
+            change = 1 - current["throughput_per_s"] / previous["throughput_per_s"]
+            if change > threshold:
+                regressions.append(
+                    f"{name}: 처리량 {previous['throughput_per_s']}/s -> {current['throughput_per_s']}/s (-{change:.0%})"
+                )
+    return regressions
+
+
+def print_table(results: dict):
+    columns = ["p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "ttft_p50_ms", "peak_rss_mb", "cpu_seconds", "errors"]
+    print(f"{'scenario':<10} " + " ".join(f"{c:>16}" for c in columns))
+    for name, result in results.items():
+        print(f"{name:<10} " + " ".join(f"{str(result.get(c, '-')):>16}" for c in columns))
+
+
+async def run_all(names, iterations, concurrency, warmup):
+    results = {}
+    for name in names:
+        print(f"[{name}] 실행 중... (반복 {iterations}, 동시성 {concurrency})")
+        try:
+            results[name] = await run_scenario(name, iterations, concurrency, warmup)
+        except ImportError as e:
+            print(f"  [{name}] 의존성 패키지가 없어 건너뜀: {e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="챕터별 핵심 경로 벤치마크")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="쉼표로 구분한 시나리오 목록")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--server", help="이미 실행 중인 모의 서버 URL (없으면 별도 프로세스로 띄움)")
+    parser.add_argument("--ttft", type=float, default=0.05, help="띄울 모의 서버의 TTFT(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="띄울 모의 서버의 초당 토큰 수")
+    parser.add_argument("--save", help="결과를 기준선 JSON으로 저장")
+    parser.add_argument("--compare", help="비교할 기준선 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 판단할 변화율 (기본 10%%)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {unknown}")
+
+    def execute():
+        # llm_clients를 불러오기 전에 모의 서버 주소를 환경 변수에 넣어야 SDK들이 그쪽을 본다
+        import llm_clients
+        llm_clients.apply_mock_server_env()
+        return asyncio.run(run_all(names, args.iterations, args.concurrency, args.warmup))
+
+    if args.server:
+        os.environ["MOCK_LLM_SERVER"] = args.server
+        results = execute()
+    else:
+        with mock_server_process(args.ttft, args.tokens_per_second) as url:
+            os.environ["MOCK_LLM_SERVER"] = url
+            results = execute()
+
+    print()
+    print_table(results)
+
+    if args.save:
+        payload = {
+            "meta": {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                     "platform": platform.platform(), "iterations": args.iterations,
+                     "concurrency": args.concurrency, "server": args.server or "subprocess"},
+            "results": results,
+        }
+        Path(args.save).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n기준선 저장: {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n성능 회귀 발견:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\n기준선 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
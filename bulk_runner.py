@@ -0,0 +1,336 @@
+"""JSONL 프롬프트 파일을 대량으로 처리하는 오프라인 배치 실행기.
+
+입력 파일을 제너레이터로 한 줄씩 읽으면서(전체를 메모리에 올리지 않음) 레이트 리미터 한도 안에서
+동시에 요청을 보내고, 결과는 끝나는 대로 출력 JSONL에 한 줄씩 기록한다.
+진행 상황은 체크포인트 파일(<출력>.ckpt)에 저장되므로, 중간에 죽은 실행을 다시 돌리면 이어서 처리한다.
+
+출력 파일은 덧붙이기만 하는 로그다. 실패한 줄은 다시 실행할 때 재시도되므로 같은 줄(line)의 실패 행과
+나중의 성공 행이 함께 남을 수 있다. --final <파일>을 주면 실행 뒤 줄마다 마지막 행만 줄 번호 순으로 모은 결과를 쓴다
+(write_final_results). 입력 자체가 잘못된 줄은 재시도해도 같으므로 실패로 한 번 기록하고 완료 처리한다.
+
+요청은 get_chat_completion(1.1)과 같은 형태(시스템 프롬프트 + 사용자 프롬프트)로 만들고,
+call_async_openai(1.4.x)와 같은 경로(공유 커넥션 풀 -> 응답 캐시 -> 레이트 리미터 -> 재시도 정책)를 거친다.
+--batch-api를 주면 OpenAI Batch API로 제출해 더 저렴한 비동기 요금으로 처리한다.
+
+입력 한 줄 예: {"id": "q-1", "prompt": "랭체인이 뭐야?"}
+
+실행 예:
+    python bulk_runner.py prompts.jsonl results.jsonl --concurrency 32 --final final.jsonl
+    python bulk_runner.py prompts.jsonl results.jsonl --batch-api
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from llm_clients import apply_mock_server_env, get_async_openai_client, get_openai_client
+from rate_limiter import get_governor, estimate_tokens
+from response_cache import get_response_cache
+from retry_policy import RetryPolicy
+
+load_dotenv()
+apply_mock_server_env()
+
+DEFAULT_SYSTEM_PROMPT = "당신은 친절하고 도움이 되는 AI 비서입니다."
+# Batch API 파일 하나에 넣을 수 있는 최대 요청 수
+BATCH_API_MAX_REQUESTS = 50_000
+
+
+def iter_requests(path, prompt_field="prompt", id_field="id", start_line=0):
+    """입력 JSONL을 한 줄씩 읽어 (줄 번호, id, 프롬프트, 오류)를 돌려주는 제너레이터.
+
+    JSON이 깨졌거나 prompt_field가 없는 줄은 전체 실행을 멈추지 않도록 프롬프트 None과 오류 메시지로 돌려준다.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            if line_no < start_line or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, str(line_no), None, f"잘못된 JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, str(line_no), None, "JSON 객체가 아닙니다"
+                continue
+            request_id = str(record.get(id_field, line_no))
+            if not isinstance(record.get(prompt_field), str):
+                yield line_no, request_id, None, f"'{prompt_field}' 문자열 필드가 없습니다"
+                continue
+            yield line_no, request_id, record[prompt_field], None
+
+
+def build_request(prompt, model, system_prompt=DEFAULT_SYSTEM_PROMPT):
+    """get_chat_completion과 같은 형태의 chat.completions 요청."""
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ],
+    )
+
+
+def latest_rows(output_path) -> dict:
+    """출력 로그에서 줄 번호별 마지막 행 (JSON 문자열). 재실행으로 쌓인 이전 실패 행은 버린다."""
+    rows = {}
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 비정상 종료로 잘린 마지막 줄
+            rows[record["line"]] = line if line.endswith("\n") else line + "\n"
+    return rows
+
+
+def write_final_results(output_path, final_path):
+    """줄마다 마지막 행만 입력 순서대로 final_path에 쓴다. 돌려주는 값은 (성공 수, 실패 수)."""
+    rows = latest_rows(output_path)
+    ok = 0
+    tmp = Path(f"{final_path}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for line_no in sorted(rows):
+            f.write(rows[line_no])
+            ok += json.loads(rows[line_no]).get("error") is None
+    os.replace(tmp, final_path)
+    return ok, len(rows) - ok
+
+
+class Checkpoint:
+    """처리가 끝난 줄 번호를 추적. watermark 미만의 줄은 모두 완료된 것."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.watermark = 0
+        self.done = set()
+        self.batch_ids = []
+        if self.path.exists():
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+            self.watermark = state.get("watermark", 0)
+            self.batch_ids = state.get("batch_ids", [])
+
+    def load_done_from_output(self, output_path):
+        """watermark 이후에 이미 성공적으로 기록된 줄을 출력 파일에서 복원."""
+        if not Path(output_path).exists():
+            return
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 비정상 종료로 잘린 마지막 줄
+                if record.get("error") is None and record.get("line", -1) >= self.watermark:
+                    self.done.add(record["line"])
+
+    def mark_done(self, line_no):
+        self.done.add(line_no)
+        while self.watermark in self.done:
+            self.done.discard(self.watermark)
+            self.watermark += 1
+
+    def is_done(self, line_no):
+        return line_no < self.watermark or line_no in self.done
+
+    def save(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"watermark": self.watermark, "batch_ids": self.batch_ids}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class BulkRunner:
+    def __init__(self, input_path, output_path, model="gpt-5-mini", concurrency=32,
+                 system_prompt=DEFAULT_SYSTEM_PROMPT, prompt_field="prompt", id_field="id",
+                 checkpoint_every=100, use_cache=True):
+        """use_cache : 같은 프롬프트는 응답 캐시에서 재사용 (처음 받은 답을 그대로 씀). False면 모든 줄을 새로 호출"""
+        self.input_path = input_path
+        self.output_path = output_path
+        self.model = model
+        self.concurrency = concurrency
+        self.system_prompt = system_prompt
+        self.prompt_field = prompt_field
+        self.id_field = id_field
+        self.checkpoint_every = checkpoint_every
+        self.use_cache = use_cache
+        self.checkpoint = Checkpoint(f"{output_path}.ckpt")
+        self.checkpoint.load_done_from_output(output_path)
+        self.counters = {"ok": 0, "failed": 0, "skipped": 0}
+
+    def _pending(self, out):
+        """아직 처리하지 않은 (줄 번호, id, 프롬프트). 읽을 수 없는 줄은 바로 실패로 기록하고 넘어간다."""
+        for line_no, request_id, prompt, error in iter_requests(
+            self.input_path, self.prompt_field, self.id_field, start_line=self.checkpoint.watermark
+        ):
+            if self.checkpoint.is_done(line_no):
+                self.counters["skipped"] += 1
+                continue
+            if error is not None:
+                out.write(json.dumps({"line": line_no, "id": request_id, "prompt": None, "response": None,
+                                      "error": error}, ensure_ascii=False) + "\n")
+                self.counters["failed"] += 1
+                self.checkpoint.mark_done(line_no)
+                continue
+            yield line_no, request_id, prompt
+
+    # ------------------------------------------------------------ 실시간 API
+    async def run(self):
+        client = get_async_openai_client()
+        cache = get_response_cache()
+        governor = get_governor()
+        policy = RetryPolicy(max_attempts=5)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)  # 입력을 조금씩만 미리 읽어 메모리 사용량 제한
+        started = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            async def call(prompt):
+                request = build_request(prompt, self.model, self.system_prompt)
+
+                async def fetch():
+                    async with governor.slot("openai", self.model, tokens=estimate_tokens(prompt)) as slot:
+                        response = await client.chat.completions.create(**request)
+                        slot.record_usage(response.usage.total_tokens if response.usage else 0)
+                    return response.choices[0].message.content
+
+                return await cache.acall(request, lambda: policy.call("openai.chat.completions", fetch),
+                                         use_cache=self.use_cache, endpoint=str(client.base_url))
+
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    line_no, request_id, prompt = item
+                    call_started = time.perf_counter()
+                    record = {"line": line_no, "id": request_id, "prompt": prompt}
+                    try:
+                        record["response"] = await call(prompt)
+                        record["error"] = None
+                    except Exception as e:
+                        record["response"] = None
+                        record["error"] = f"{type(e).__name__}: {e}"
+                    record["latency"] = round(time.perf_counter() - call_started, 3)
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if record["error"] is None:
+                        self.counters["ok"] += 1
+                        self.checkpoint.mark_done(line_no)
+                        if self.counters["ok"] % self.checkpoint_every == 0:
+                            self.checkpoint.save()
+                    else:
+                        self.counters["failed"] += 1
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            for item in self._pending(out):
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            self.checkpoint.save()
+
+        elapsed = time.perf_counter() - started
+        return {**self.counters, "seconds": round(elapsed, 2),
+                "requests_per_second": round(self.counters["ok"] / elapsed, 2) if elapsed else 0.0}
+
+    # ------------------------------------------------------------ Batch API
+    def _batch_files(self, out):
+        """Batch API 입력 파일 내용을 최대 요청 수 단위로 잘라서 만든다."""
+        buffer, count = io.StringIO(), 0
+        for line_no, request_id, prompt in self._pending(out):
+            buffer.write(json.dumps({
+                "custom_id": f"{line_no}:{request_id}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": build_request(prompt, self.model, self.system_prompt),
+            }, ensure_ascii=False) + "\n")
+            count += 1
+            if count >= BATCH_API_MAX_REQUESTS:
+                yield buffer.getvalue()
+                buffer, count = io.StringIO(), 0
+        if count:
+            yield buffer.getvalue()
+
+    def run_batch_api(self, poll_interval=30.0):
+        """요청을 Batch API로 제출하고 완료될 때까지 기다린 뒤 결과를 출력 파일에 기록."""
+        client = get_openai_client()
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            if not self.checkpoint.batch_ids:
+                for content in self._batch_files(out):
+                    input_file = client.files.create(file=("batch.jsonl", content.encode("utf-8")), purpose="batch")
+                    batch = client.batches.create(
+                        input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+                    )
+                    print(f"배치 제출: {batch.id}")
+                    # 제출한 배치 id를 저장해 두면 재실행 시 다시 제출하지 않고 결과만 기다린다
+                    self.checkpoint.batch_ids.append(batch.id)
+                    self.checkpoint.save()
+                out.flush()
+
+            for batch_id in list(self.checkpoint.batch_ids):
+                batch = client.batches.retrieve(batch_id)
+                while batch.status in ("validating", "in_progress", "finalizing"):
+                    print(f"배치 {batch_id} 상태: {batch.status} ({batch.request_counts})")
+                    time.sleep(poll_interval)
+                    batch = client.batches.retrieve(batch_id)
+                for file_id in (batch.output_file_id, batch.error_file_id):
+                    if file_id:
+                        self._write_batch_results(client.files.content(file_id).text, out)
+                self.checkpoint.batch_ids.remove(batch_id)
+                self.checkpoint.save()
+        return self.counters
+
+    def _write_batch_results(self, content, out):
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            line_no, request_id = result["custom_id"].split(":", 1)
+            record = {"line": int(line_no), "id": request_id}
+            body = (result.get("response") or {}).get("body") or {}
+            if result.get("error") or "choices" not in body:
+                record["response"] = None
+                record["error"] = json.dumps(result.get("error") or body.get("error"), ensure_ascii=False)
+                self.counters["failed"] += 1
+            else:
+                record["response"] = body["choices"][0]["message"]["content"]
+                record["error"] = None
+                self.counters["ok"] += 1
+                self.checkpoint.mark_done(int(line_no))
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 프롬프트 대량 처리기")
+    parser.add_argument("input", help="입력 JSONL 파일")
+    parser.add_argument("output", help="결과를 기록할 JSONL 파일 (이어쓰기)")
+    parser.add_argument("--model", default="gpt-5-mini")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--system", default=DEFAULT_SYSTEM_PROMPT, help="시스템 프롬프트")
+    parser.add_argument("--prompt-field", default="prompt")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--no-cache", action="store_true", help="응답 캐시를 쓰지 않고 모든 줄을 새로 호출")
+    parser.add_argument("--final", help="실행 뒤 줄마다 마지막 결과만 모아 쓸 JSONL 파일")
+    parser.add_argument("--batch-api", action="store_true", help="OpenAI Batch API로 제출 (24시간 이내 처리, 할인 요금)")
+    args = parser.parse_args()
+
+    runner = BulkRunner(
+        args.input, args.output, model=args.model, concurrency=args.concurrency,
+        system_prompt=args.system, prompt_field=args.prompt_field, id_field=args.id_field,
+        use_cache=not args.no_cache,
+    )
+    if args.batch_api:
+        print(runner.run_batch_api())
+    else:
+        print(asyncio.run(runner.run()))
+    if args.final:
+        ok, failed = write_final_results(args.output, args.final)
+        print(f"최종 결과 {args.final}: 성공 {ok}줄, 실패 {failed}줄")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""LCEL 체인의 단계(Runnable)별 지연 시간 프로파일러.
+
+prompt | model | parser가 느릴 때 템플릿 포맷, 네트워크/모델 생성, 파싱 중 어디서 시간이 드는지 보기 위한 콜백 핸들러.
+단계마다
+- wall time / CPU time(process_time 기준, 같은 시간에 돈 다른 스레드 작업도 포함)
+- 할당된 메모리 (trace_memory=True일 때만, tracemalloc 사용)
+- 모델 단계의 입력/출력 토큰 수와 첫 토큰까지의 시간(스트리밍일 때)
+을 기록하고,
+
+1. flamegraph.pl / speedscope에 바로 넣을 수 있는 collapsed stack 파일 ("체인;프롬프트 자기시간(us)")
+2. chrome://tracing / Perfetto에서 볼 수 있는 trace 이벤트 JSON
+3. 단계 이름별 집계 (횟수, 평균, p50/p95, 최대)와 로그 구간 히스토그램
+으로 출력한다.
+
+꺼져 있으면(기본값, CHAIN_PROFILE=1로 켬) config()가 빈 설정을 돌려주고 profile()은 체인을 그대로 돌려주므로
+콜백이 아예 붙지 않아 추가 비용이 없다.
+
+사용 예:
+    profiler = ChainProfiler()            # 또는 ChainProfiler(enabled=True)
+    chain.invoke(input, config=profiler.config())
+    profiler.print_report()
+    profiler.write_flamegraph("chain.folded")   # flamegraph.pl chain.folded > chain.svg
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class _Step:
+    __slots__ = ("run_id", "parent", "name", "kind", "path", "started", "cpu_started", "mem_started",
+                 "wall", "cpu", "allocated", "input_tokens", "output_tokens", "first_token", "children_wall",
+                 "thread", "error")
+
+    def __init__(self, run_id, parent, name, kind, path, mem_started):
+        self.run_id = run_id
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.path = path
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.mem_started = mem_started
+        self.wall = self.cpu = 0.0
+        self.allocated = None
+        self.input_tokens = self.output_tokens = None
+        self.first_token = None
+        self.children_wall = 0.0
+        self.thread = threading.get_ident()
+        self.error = None
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, round(p * (len(ordered) - 1)))] if ordered else 0.0
+
+
+class ChainProfiler(BaseCallbackHandler):
+    """체인 실행의 단계별 시간/메모리/토큰을 기록하는 콜백 핸들러."""
+
+    # 비동기 실행에서도 스레드 풀로 넘기지 않고 그 자리에서 호출 (기록 자체가 가벼움)
+    run_inline = True
+
+    def __init__(self, enabled: bool = None, trace_memory: bool = False):
+        """
+        enabled      : None이면 CHAIN_PROFILE 환경 변수가 1일 때만 켠다
+        trace_memory : 단계별 메모리 할당량 기록 (tracemalloc 때문에 실행이 눈에 띄게 느려짐)
+        """
+        self.enabled = os.environ.get("CHAIN_PROFILE") == "1" if enabled is None else enabled
+        self.trace_memory = trace_memory
+        self._origin = time.perf_counter()
+        self._active = {}
+        self.steps = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ 붙이기
+    def config(self, **config) -> dict:
+        """invoke(..., config=profiler.config())용. 꺼져 있으면 콜백 없는 설정을 돌려준다."""
+        if not self.enabled:
+            return config
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return {**config, "callbacks": [*config.get("callbacks", []), self]}
+
+    def profile(self, runnable):
+        """체인에 프로파일러를 붙인 Runnable. 꺼져 있으면 원래 체인 그대로."""
+        if not self.enabled:
+            return runnable
+        return runnable.with_config(self.config())
+
+    def reset(self):
+        with self._lock:
+            self._active.clear()
+            self.steps = []
+            self._origin = time.perf_counter()
+
+    # ------------------------------------------------------------ 기록
+    def _start(self, run_id, parent_run_id, name, kind):
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else None
+        with self._lock:
+            parent = self._active.get(parent_run_id)
+            path = (*parent.path, name) if parent else (name,)
+            self._active[run_id] = _Step(run_id, parent, name, kind, path, memory)
+
+    def _end(self, run_id, error=None):
+        ended = time.perf_counter()
+        cpu = time.process_time()
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else None
+        with self._lock:
+            step = self._active.pop(run_id, None)
+            if step is None:
+                return None
+            step.wall = ended - step.started
+            step.cpu = cpu - step.cpu_started
+            if memory is not None and step.mem_started is not None:
+                step.allocated = memory - step.mem_started
+            step.error = error
+            if step.parent is not None:
+                step.parent.children_wall += step.wall
+            self.steps.append(step)
+            return step
+
+    @staticmethod
+    def _name(serialized, kwargs, default):
+        if kwargs.get("name"):
+            return kwargs["name"]
+        if serialized:
+            return serialized.get("name") or (serialized.get("id") or [default])[-1]
+        return default
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chat_model"), "model")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), "model")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        step = self._active.get(run_id)
+        if step is not None and step.first_token is None:
+            step.first_token = time.perf_counter() - step.started
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        step = self._end(run_id)
+        if step is not None:
+            step.input_tokens, step.output_tokens = self._token_usage(response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "retriever"), "retriever")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "tool"), "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+    @staticmethod
+    def _token_usage(response):
+        """LLMResult에서 (입력, 출력) 토큰 수. 메시지의 usage_metadata를 먼저 보고 없으면 llm_output."""
+        for generations in response.generations or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    return usage.get("input_tokens"), usage.get("output_tokens")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+    # ------------------------------------------------------------ 출력
+    def collapsed_stacks(self) -> list:
+        """flamegraph용 "a;b;c 값" 줄 목록. 값은 자기 시간(자식 단계를 뺀 시간, 마이크로초)."""
+        totals = defaultdict(int)
+        for step in self.steps:
+            # 병렬 자식들의 합이 부모 시간보다 길 수 있으므로 음수는 0으로
+            totals[";".join(step.path)] += max(0, round((step.wall - step.children_wall) * 1_000_000))
+        return [f"{stack} {value}" for stack, value in totals.items() if value > 0]
+
+    def write_flamegraph(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed_stacks()) + "\n")
+
+    def chrome_trace(self) -> dict:
+        """Chrome trace event 형식 (chrome://tracing, Perfetto, speedscope)."""
+        events = []
+        for step in self.steps:
+            args = {"kind": step.kind, "cpu_ms": round(step.cpu * 1000, 3)}
+            if step.allocated is not None:
+                args["allocated_bytes"] = step.allocated
+            if step.input_tokens is not None:
+                args.update(input_tokens=step.input_tokens, output_tokens=step.output_tokens)
+            if step.first_token is not None:
+                args["first_token_ms"] = round(step.first_token * 1000, 3)
+            if step.error:
+                args["error"] = step.error
+            events.append({"name": step.name, "cat": step.kind, "ph": "X", "pid": os.getpid(), "tid": step.thread,
+                           "ts": round((step.started - self._origin) * 1_000_000), "dur": round(step.wall * 1_000_000),
+                           "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def report(self) -> dict:
+        """단계 (종류, 이름)별 집계. 키는 "종류:이름" (체인과 LLM처럼 이름이 같은 단계가 서로 덮어쓰지 않도록)."""
+        groups = defaultdict(list)
+        for step in self.steps:
+            groups[(step.kind, step.name)].append(step)
+        rows = {}
+        for (kind, name), steps in sorted(groups.items(), key=lambda item: -sum(s.wall for s in item[1])):
+            walls = sorted(step.wall for step in steps)
+            row = {
+                "name": name,
+                "kind": kind,
+                "count": len(steps),
+                "total_ms": round(sum(walls) * 1000, 3),
+                "mean_ms": round(sum(walls) / len(walls) * 1000, 3),
+                "p50_ms": round(_percentile(walls, 0.5) * 1000, 3),
+                "p95_ms": round(_percentile(walls, 0.95) * 1000, 3),
+                "max_ms": round(walls[-1] * 1000, 3),
+                "self_ms": round(sum(max(0.0, s.wall - s.children_wall) for s in steps) * 1000, 3),
+                "cpu_ms": round(sum(step.cpu for step in steps) * 1000, 3),
+                "errors": sum(1 for step in steps if step.error),
+            }
+            allocated = [step.allocated for step in steps if step.allocated is not None]
+            if allocated:
+                row["allocated_kb"] = round(sum(allocated) / 1024, 1)
+            tokens = [step for step in steps if step.input_tokens is not None]
+            if tokens:
+                row["input_tokens"] = sum(step.input_tokens or 0 for step in tokens)
+                row["output_tokens"] = sum(step.output_tokens or 0 for step in tokens)
+            first_tokens = sorted(step.first_token for step in steps if step.first_token is not None)
+            if first_tokens:
+                row["first_token_p50_ms"] = round(_percentile(first_tokens, 0.5) * 1000, 3)
+            rows[f"{kind}:{name}"] = row
+        return rows
+
+    def histogram(self, name: str, buckets: int = 12, kind: str = None) -> list:
+        """단계 1개의 wall time 분포. 2배씩 커지는 구간별 (하한 ms, 상한 ms, 건수). kind를 주면 그 종류만."""
+        walls = [step.wall * 1000 for step in self.steps if step.name == name and kind in (None, step.kind)]
+        if not walls:
+            return []
+        low = max(min(walls), 0.001)
+        edges = [low * 2 ** i for i in range(buckets + 1)]
+        counts = [0] * buckets
+        for wall in walls:
+            index = 0
+            while index < buckets - 1 and wall >= edges[index + 1]:
+                index += 1
+            counts[index] += 1
+        return [(round(edges[i], 3), round(edges[i + 1], 3), counts[i]) for i in range(buckets) if counts[i]]
+
+    def print_report(self, histograms: bool = True):
+        if not self.enabled:
+            return
+        rows = self.report()
+        print(f"{'단계':<28} {'종류':<9} {'횟수':>5} {'합계ms':>10} {'자기ms':>10} {'p50ms':>9} {'p95ms':>9} {'CPUms':>9}  기타")
+        for row in rows.values():
+            name = row["name"]
+            extra = []
+            if "input_tokens" in row:
+                extra.append(f"토큰 {row['input_tokens']}/{row['output_tokens']}")
+            if "first_token_p50_ms" in row:
+                extra.append(f"첫 토큰 {row['first_token_p50_ms']}ms")
+            if "allocated_kb" in row:
+                extra.append(f"할당 {row['allocated_kb']}KB")
+            print(f"{name[:28]:<28} {row['kind']:<9} {row['count']:>5} {row['total_ms']:>10.2f} {row['self_ms']:>10.2f} "
+                  f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['cpu_ms']:>9.2f}  {', '.join(extra)}")
+        if histograms:
+            for row in rows.values():
+                if row["count"] < 2:
+                    continue
+                bins = self.histogram(row["name"], kind=row["kind"])
+                peak = max(count for _, _, count in bins)
+                print(f"\n{row['name']} ({row['kind']}) wall time 분포")
+                for low, high, count in bins:
+                    print(f"  {low:>9.3f} ~ {high:>9.3f} ms | {'#' * max(1, round(count / peak * 40))} {count}")
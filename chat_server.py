@@ -0,0 +1,252 @@
+"""여러 사용자를 한 프로세스에서 동시에 처리하는 비동기 채팅 서버.
+
+2.1/2.3 챗봇은 input() 루프 하나에 previous_response_id 변수 하나라서 프로세스당 사용자 1명만 받을 수 있다.
+여기서는 세션 id -> 응답 체인(previous_response_id)을 세션 테이블에 보관하고,
+각 요청은 챗봇 스크립트의 achatbot_response를 await 하므로 수천 개의 세션을 한 이벤트 루프에서 처리한다.
+
+1. 세션은 마지막 사용 후 ttl초가 지나면 만료되고, max_sessions를 넘으면 가장 오래 안 쓴 세션부터 제거 (LRU)
+2. 같은 세션의 메시지는 순서대로 처리 (응답 체인이 꼬이지 않도록 세션별 lock)
+3. 세션별 최근 지연 시간으로 p50/p95를 계산 (최근 latency_window개만 보관해 메모리 제한)
+
+엔드포인트
+- POST /chat {"message": "...", "session_id": "(선택)"} -> 답변, 세션 id, 지연 시간
+- WS   /ws?session_id=... : 텍스트를 보내면 JSON 답변을 돌려줌
+- GET  /sessions/{id}/metrics, DELETE /sessions/{id}, GET /metrics
+
+실행 예:
+    python chat_server.py --bot little-prince --port 8000
+    curl -X POST localhost:8000/chat -H "Content-Type: application/json" -d '{"message": "안녕"}'
+"""
+import argparse
+import asyncio
+import importlib.util
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+
+BOTS = {
+    "cli": "2.1.cli-chatbot.py",
+    "little-prince": "2.3.little-prince-chatbot.py",
+}
+
+
+def load_chatbot(name: str):
+    """챗봇 예제 파일을 모듈로 불러온다 (파일 이름에 점이 있어 import 문을 쓸 수 없음)."""
+    path = Path(__file__).parent / BOTS[name]
+    spec = importlib.util.spec_from_file_location(f"chatbot_{name.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Session:
+    def __init__(self, session_id: str, latency_window: int):
+        self.id = session_id
+        self.previous_response_id = None
+        self.created = self.last_seen = time.monotonic()
+        self.turns = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.lock = asyncio.Lock()
+
+    def metrics(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pick(p):
+            return round(ordered[min(len(ordered) - 1, round(p * (len(ordered) - 1)))] * 1000, 1) if ordered else None
+
+        return {
+            "session_id": self.id,
+            "turns": self.turns,
+            "errors": self.errors,
+            "p50_ms": pick(0.5),
+            "p95_ms": pick(0.95),
+            "idle_seconds": round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+class SessionTable:
+    """TTL + LRU로 크기가 제한된 세션 테이블."""
+
+    def __init__(self, max_sessions: int = 10_000, ttl: float = 1800.0, latency_window: int = 50):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.latency_window = latency_window
+        self._sessions = OrderedDict()
+        self.counters = {"created": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        """살아 있는 세션을 돌려준다. 없거나 만료되었으면 None."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_seen > self.ttl:
+            self._drop(session_id, "expired")
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def create(self) -> Session:
+        session = Session(uuid.uuid4().hex, self.latency_window)
+        self._sessions[session.id] = session
+        self.counters["created"] += 1
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), "evicted")
+        return session
+
+    def get_or_create(self, session_id=None):
+        return (session_id and self.get(session_id)) or self.create()
+
+    def delete(self, session_id) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _drop(self, session_id, reason):
+        if self._sessions.pop(session_id, None) is not None:
+            self.counters[reason] += 1
+
+    def sweep(self) -> int:
+        """만료된 세션 정리. LRU 순서라 앞쪽부터 보다가 살아 있는 세션을 만나면 멈춘다."""
+        now = time.monotonic()
+        removed = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.ttl:
+                break
+            self._drop(session_id, "expired")
+            removed += 1
+        return removed
+
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+
+def create_app(chatbot_response, sessions: SessionTable = None, sweep_interval: float = 30.0) -> FastAPI:
+    """chatbot_response(user_message, previous_response_id)를 await 하는 채팅 서버 앱."""
+    sessions = sessions or SessionTable()
+    started = time.monotonic()
+    totals = {"requests": 0, "errors": 0, "busy_seconds": 0.0}
+
+    async def sweeper():
+        while True:
+            await asyncio.sleep(sweep_interval)
+            sessions.sweep()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(sweeper())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    app = FastAPI(title="Chat Server", lifespan=lifespan)
+    app.state.sessions = sessions
+
+    async def handle(session: Session, message: str) -> dict:
+        async with session.lock:
+            call_started = time.perf_counter()
+            try:
+                result = await chatbot_response(message, session.previous_response_id)
+            except Exception:
+                session.errors += 1
+                totals["errors"] += 1
+                raise
+            finally:
+                session.last_seen = time.monotonic()
+            latency = time.perf_counter() - call_started
+            session.previous_response_id = result.id
+            session.turns += 1
+            session.latencies.append(latency)
+            totals["requests"] += 1
+            totals["busy_seconds"] += latency
+        return {
+            "session_id": session.id,
+            "reply": result.output_text,
+            "response_id": result.id,
+            "latency_ms": round(latency * 1000, 1),
+        }
+
+    @app.post("/chat")
+    async def chat(request: ChatRequest):
+        session = sessions.get_or_create(request.session_id)
+        try:
+            return await handle(session, request.message)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"{type(e).__name__}: {e}")
+
+    @app.websocket("/ws")
+    async def websocket_chat(websocket: WebSocket, session_id: Optional[str] = None):
+        await websocket.accept()
+        session = sessions.get_or_create(session_id)
+        await websocket.send_json({"session_id": session.id})
+        try:
+            while True:
+                message = await websocket.receive_text()
+                # 오래 연결된 채로 만료/제거되었으면 같은 id로 다시 등록하지 않고 새 세션을 만든다
+                if sessions.get(session.id) is None:
+                    session = sessions.create()
+                try:
+                    await websocket.send_json(await handle(session, message))
+                except Exception as e:
+                    await websocket.send_json({"session_id": session.id, "error": f"{type(e).__name__}: {e}"})
+        except WebSocketDisconnect:
+            pass
+
+    @app.get("/sessions/{session_id}/metrics")
+    async def session_metrics(session_id: str):
+        session = sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="세션이 없거나 만료되었습니다.")
+        return session.metrics()
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        if not sessions.delete(session_id):
+            raise HTTPException(status_code=404, detail="세션이 없거나 만료되었습니다.")
+        return {"deleted": session_id}
+
+    @app.get("/metrics")
+    async def metrics():
+        uptime = time.monotonic() - started
+        return {
+            "active_sessions": len(sessions),
+            **sessions.counters,
+            **totals,
+            "requests_per_second": round(totals["requests"] / uptime, 2) if uptime else 0.0,
+            "mean_latency_ms": round(totals["busy_seconds"] / totals["requests"] * 1000, 1) if totals["requests"] else None,
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="멀티 세션 채팅 서버")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="cli")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-sessions", type=int, default=10_000)
+    parser.add_argument("--ttl", type=float, default=1800.0, help="세션 유휴 만료 시간(초)")
+    args = parser.parse_args()
+
+    bot = load_chatbot(args.bot)
+    app = create_app(bot.achatbot_response, SessionTable(max_sessions=args.max_sessions, ttl=args.ttl))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
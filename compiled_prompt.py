@@ -0,0 +1,177 @@
+"""미리 분해해 둔(compiled) 프롬프트 템플릿.
+
+PromptTemplate.format()은 호출할 때마다 f-string 템플릿을 다시 파싱하고 변수를 검증한다.
+초당 수만 건을 포맷하는 배치 작업에서는 이 비용이 눈에 띄므로,
+CompiledPrompt는 생성 시 한 번만 string.Formatter().parse로 템플릿을 "고정 문자열 / 변수" 조각으로 나눠
+변수 목록과 정규화된 서식 문자열을 만들어 두고, 포맷할 때는 C로 구현된 str.format_map으로 변수 자리만 채운다.
+
+1. partial()은 분해된 템플릿을 복사하지 않고 공유하며, 고정 변수는 ChainMap으로 겹쳐 둔다
+2. format_many()로 여러 건을 한 번에 포맷 (공통 변수는 한 번만 넘김)
+3. CompiledChatPrompt는 ChatPromptTemplate의 (역할, 템플릿) 목록 버전
+
+사용 예:
+    prompt = CompiledPrompt.from_langchain(PromptTemplate.from_template("'{text}' 문장을 {lang}로 번역"))
+    ko = prompt.partial(lang="Korean")
+    ko.format(text="Hello")
+    ko.format_many([{"text": "Hello"}, {"text": "Bye"}])
+
+마이크로 벤치마크:
+    python compiled_prompt.py --n 50000
+"""
+import argparse
+import time
+from collections import ChainMap
+from string import Formatter
+
+_formatter = Formatter()
+
+
+def _escape(literal: str) -> str:
+    return literal.replace("{", "{{").replace("}", "}}")
+
+
+def _compile(template: str):
+    """템플릿을 한 번 분해해 (변수 이름 목록, 정규화된 서식 문자열)을 만든다."""
+    names, pieces = [], []
+    for literal, field_name, format_spec, conversion in _formatter.parse(template):
+        pieces.append(_escape(literal))
+        if field_name is None:
+            continue
+        if not field_name.isidentifier():
+            raise ValueError(f"지원하지 않는 변수 형식입니다: {{{field_name}}}")
+        names.append(field_name)
+        pieces.append("{" + field_name + (f"!{conversion}" if conversion else "") + (f":{format_spec}" if format_spec else "") + "}")
+    return tuple(dict.fromkeys(names)), "".join(pieces)
+
+
+class CompiledPrompt:
+    """f-string 형식 템플릿을 미리 분해해 둔 프롬프트."""
+
+    __slots__ = ("template", "variables", "_format_string", "_partials", "_defaults", "input_variables")
+
+    def __init__(self, template: str, partial_variables: dict = None):
+        self.template = template
+        self.variables, self._format_string = _compile(template)
+        self._set_partials(ChainMap(dict(partial_variables or {})))
+
+    def _set_partials(self, partials: ChainMap):
+        self._partials = partials
+        # 포맷할 때마다 ChainMap을 따라가지 않도록 고정 변수는 한 번만 펼쳐 둔다
+        self._defaults = dict(partials)
+        self.input_variables = [name for name in self.variables if name not in self._defaults]
+
+    @classmethod
+    def from_template(cls, template: str) -> "CompiledPrompt":
+        return cls(template)
+
+    @classmethod
+    def from_langchain(cls, prompt) -> "CompiledPrompt":
+        """랭체인 PromptTemplate(f-string 형식)에서 만든다. partial 변수도 그대로 가져온다."""
+        if getattr(prompt, "template_format", "f-string") != "f-string":
+            raise ValueError("f-string 형식의 템플릿만 컴파일할 수 있습니다.")
+        return cls(prompt.template, dict(prompt.partial_variables or {}))
+
+    def partial(self, **kwargs) -> "CompiledPrompt":
+        """일부 변수를 고정한 새 프롬프트. 분해된 템플릿은 다시 만들지 않고 공유한다."""
+        prompt = object.__new__(CompiledPrompt)
+        prompt.template = self.template
+        prompt.variables, prompt._format_string = self.variables, self._format_string
+        prompt._set_partials(self._partials.new_child(kwargs))
+        return prompt
+
+    def _missing(self, error: KeyError):
+        return KeyError(f"프롬프트 변수가 없습니다: {error.args[0]} (필요한 변수: {self.input_variables})")
+
+    def format(self, **kwargs) -> str:
+        values = {**self._defaults, **kwargs} if self._defaults else kwargs
+        try:
+            # 실제 채우기는 C로 구현된 str.format_map에 맡긴다 (string.Formatter를 매번 거치지 않음)
+            return self._format_string.format_map(values)
+        except KeyError as e:
+            raise self._missing(e) from None
+
+    def format_many(self, rows, **common) -> list:
+        """여러 건을 한 번에 포맷. common은 모든 행에 공통으로 들어가는 변수."""
+        base = {**self._defaults, **common}
+        render = self._format_string.format_map
+        try:
+            if not base:
+                return [render(row) for row in rows]
+            return [render({**base, **row}) for row in rows]
+        except KeyError as e:
+            raise self._missing(e) from None
+
+    def __repr__(self):
+        return f"CompiledPrompt(input_variables={self.input_variables}, template={self.template!r})"
+
+
+class CompiledChatPrompt:
+    """(역할, 템플릿) 목록으로 된 채팅 프롬프트의 컴파일 버전."""
+
+    _ROLES = {"SystemMessagePromptTemplate": "system", "HumanMessagePromptTemplate": "user",
+              "AIMessagePromptTemplate": "assistant"}
+
+    def __init__(self, messages):
+        self.messages = [(role, CompiledPrompt(template)) for role, template in messages]
+        self.input_variables = list(dict.fromkeys(
+            name for _, prompt in self.messages for name in prompt.input_variables))
+
+    @classmethod
+    def from_langchain(cls, chat_prompt) -> "CompiledChatPrompt":
+        """랭체인 ChatPromptTemplate에서 만든다 (MessagesPlaceholder는 지원하지 않음)."""
+        messages = []
+        for message in chat_prompt.messages:
+            role = cls._ROLES.get(type(message).__name__)
+            if role is None:
+                raise ValueError(f"컴파일할 수 없는 메시지 템플릿입니다: {type(message).__name__}")
+            messages.append((role, message.prompt.template))
+        compiled = cls(messages)
+        if chat_prompt.partial_variables:
+            return compiled.partial(**chat_prompt.partial_variables)
+        return compiled
+
+    def partial(self, **kwargs) -> "CompiledChatPrompt":
+        compiled = object.__new__(CompiledChatPrompt)
+        compiled.messages = [(role, prompt.partial(**kwargs)) for role, prompt in self.messages]
+        compiled.input_variables = [name for name in self.input_variables if name not in kwargs]
+        return compiled
+
+    def format_dicts(self, **kwargs) -> list:
+        """OpenAI SDK messages 형식 [{"role": ..., "content": ...}]"""
+        return [{"role": role, "content": prompt.format(**kwargs)} for role, prompt in self.messages]
+
+    def format_messages(self, **kwargs) -> list:
+        """랭체인 메시지 형식."""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+        classes = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+        return [classes[role](content=prompt.format(**kwargs)) for role, prompt in self.messages]
+
+
+def benchmark(n: int = 20_000):
+    """PromptTemplate.format / str.format_map / CompiledPrompt 비교."""
+    from langchain_core.prompts import PromptTemplate
+
+    template = "다음 기사를 {style} 스타일로 요약하세요 \n\n{article}\n\n대상 독자: {audience}"
+    rows = [{"article": f"기사 본문 {i} " * 20, "audience": "개발자"} for i in range(n)]
+    stock = PromptTemplate.from_template(template).partial(style="뉴스")
+    compiled = CompiledPrompt(template).partial(style="뉴스")
+    assert stock.format(**rows[0]) == compiled.format(**rows[0])
+
+    def measure(label, fn):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {elapsed * 1000:9.1f} ms  {n / elapsed:12,.0f} formats/s")
+        return elapsed
+
+    baseline = measure("PromptTemplate.format", lambda: [stock.format(**row) for row in rows])
+    measure("str.format_map (참고)", lambda: [template.format_map({"style": "뉴스", **row}) for row in rows])
+    compiled_time = measure("CompiledPrompt.format", lambda: [compiled.format(**row) for row in rows])
+    many_time = measure("CompiledPrompt.format_many", lambda: compiled.format_many(rows))
+    print(f"속도 향상: format {baseline / compiled_time:.1f}배, format_many {baseline / many_time:.1f}배")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CompiledPrompt 마이크로 벤치마크")
+    parser.add_argument("--n", type=int, default=20_000)
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,233 @@
+"""클라이언트가 직접 관리하는 대화 맥락 (토큰 예산 + 요약).
+
+previous_response_id 체인은 대화가 길어질수록 매 턴마다 지난 대화 전체를 입력 토큰으로 다시 낸다.
+ConversationContext는 대화 이력을 클라이언트에 두고
+
+1. 턴을 추가할 때마다 토큰 수를 누적 계산 (매번 전체를 다시 세지 않음)
+2. 요약 + 최근 턴들이 budget_tokens 안에 들도록 오래된 턴부터 창 밖으로 밀어냄
+3. 밀려난 턴은 백그라운드 스레드에서 기존 요약에 합쳐 새 요약을 만든다 (답변 경로를 막지 않음)
+4. 턴마다 실제 입력 토큰/지연 시간과, 체인 방식이었다면 냈을 입력 토큰을 비교해 기록
+
+사용 예:
+    context = ConversationContext(budget_tokens=1500)
+    result = chatbot_response("안녕", context=context)   # 2.1 / 2.3
+    print(context.report())
+
+비교 실행 (같은 대화를 체인 방식과 관리 방식으로 각각 실행):
+    python conversation_context.py --turns 12
+"""
+import argparse
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 메시지 1개마다 역할/구분자 등으로 붙는 대략적인 추가 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTIONS = """지금까지의 대화 요약과 이어지는 대화 내용이 주어집니다.
+둘을 합쳐 이후 대화에 필요한 사실, 사용자의 요청과 선호, 결정된 사항 위주로 {max_chars}자 이내의 한국어 요약을 작성하세요.
+요약문만 출력하세요."""
+
+
+class _Turn:
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+        self.tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationContext:
+    def __init__(self, budget_tokens: int = 2000, keep_last_turns: int = 2, summary_max_chars: int = 600,
+                 summary_model: str = "gpt-5-mini", summarizer=None):
+        """
+        budget_tokens    : 요약 + 창 안의 턴들이 넘지 않을 토큰 수
+        keep_last_turns  : 예산을 넘더라도 항상 남겨둘 최근 메시지 수
+        summarizer       : (기존 요약, 밀려난 턴 텍스트) -> 새 요약. 없으면 summary_model로 요약
+        """
+        self.budget_tokens = budget_tokens
+        self.keep_last_turns = keep_last_turns
+        self.summary_max_chars = summary_max_chars
+        self.summary_model = summary_model
+        self.summarizer = summarizer or self._summarize_with_llm
+        self.turns = deque()
+        self.window_tokens = 0
+        self.summary = ""
+        self.summary_tokens = 0
+        self._evicted = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+        self._pending = None
+        self._folding = False  # 요약 작업이 _evicted를 비울 때까지 True (_lock으로 보호)
+        # 체인 방식이었다면 다음 턴에 다시 보냈을 지난 대화 토큰 수
+        self.chained_history_tokens = 0
+        self.history = []
+        self._turn_started = None
+        self._sent_tokens = 0
+
+    # ------------------------------------------------------------ 요청/응답
+    def build_input(self, user_message: str) -> list:
+        """사용자 메시지를 추가하고 responses.create의 input으로 쓸 메시지 목록을 돌려준다."""
+        self._turn_started = time.perf_counter()
+        self._append("user", user_message)
+        with self._lock:
+            items = []
+            if self.summary:
+                items.append({"role": "developer", "content": f"이전 대화 요약: {self.summary}"})
+            items += [{"role": turn.role, "content": turn.content} for turn in self.turns]
+            self._sent_tokens = self.window_tokens + self.summary_tokens
+        return items
+
+    def add_response(self, result):
+        """응답을 창에 추가하고 이번 턴의 토큰/지연 시간을 기록한다."""
+        latency = time.perf_counter() - self._turn_started if self._turn_started else None
+        user_tokens = self.turns[-1].tokens if self.turns else 0
+        usage = getattr(result, "usage", None)
+        # 비교는 양쪽 모두 같은 추정치로 하고, 서버가 알려준 실제 입력 토큰은 따로 남긴다
+        chained_tokens = self.chained_history_tokens + user_tokens
+        self.history.append({
+            "turn": len(self.history) + 1,
+            "input_tokens": self._sent_tokens,
+            "chained_input_tokens": chained_tokens,
+            "saved_tokens": chained_tokens - self._sent_tokens,
+            "billed_input_tokens": getattr(usage, "input_tokens", None),
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+        })
+        reply = result.output_text
+        self.chained_history_tokens = chained_tokens + estimate_tokens(reply) + MESSAGE_OVERHEAD_TOKENS
+        self._append("assistant", reply)
+
+    def add_interrupted(self, partial_text: str):
+        """답변이 끝나지 못한 턴을 정리한다 (ResponseStream의 on_interrupt).
+
+        받은 부분이 있으면 assistant 턴으로 남기고, 없으면 build_input이 추가한 사용자 턴을 되돌린다.
+        """
+        self._turn_started = None
+        if partial_text:
+            user_tokens = self.turns[-1].tokens if self.turns else 0
+            self.chained_history_tokens += user_tokens + estimate_tokens(partial_text) + MESSAGE_OVERHEAD_TOKENS
+            self._append("assistant", partial_text)
+            return
+        with self._lock:
+            if self.turns and self.turns[-1].role == "user":
+                self.window_tokens -= self.turns.pop().tokens
+
+    # ------------------------------------------------------------ 창 관리
+    def _append(self, role, content):
+        turn = _Turn(role, content)
+        evicted = []
+        with self._lock:
+            self.turns.append(turn)
+            self.window_tokens += turn.tokens
+            while (self.window_tokens + self.summary_tokens > self.budget_tokens
+                   and len(self.turns) > self.keep_last_turns):
+                old = self.turns.popleft()
+                self.window_tokens -= old.tokens
+                evicted.append(old)
+            self._evicted.extend(evicted)
+            if evicted:
+                self._schedule_summary()
+
+    def _schedule_summary(self):
+        # (_lock 안에서 호출) 요약 작업이 도는 중이면 그 작업이 _evicted가 빌 때까지 계속 처리한다
+        if not self._folding:
+            self._folding = True
+            self._pending = self._executor.submit(self._fold_evicted)
+
+    def _fold_evicted(self):
+        while True:
+            with self._lock:
+                evicted, self._evicted = self._evicted, []
+                summary = self.summary
+                if not evicted:
+                    # 비었는지 확인과 종료 표시를 같은 잠금 안에서 해야 그 사이 밀려난 턴을 놓치지 않는다
+                    self._folding = False
+                    return
+            transcript = "\n".join(f"{turn.role}: {turn.content}" for turn in evicted)
+            try:
+                new_summary = self.summarizer(summary, transcript)
+            except Exception as e:
+                # 밀려난 턴은 버리지 않고 앞에 되돌려 두었다가 다음에 밀려나는 턴과 함께 다시 요약
+                logger.warning(f"대화 요약 실패 (다음 요약 때 다시 시도): {e}")
+                with self._lock:
+                    self._evicted[:0] = evicted
+                    self._folding = False
+                return
+            with self._lock:
+                self.summary = new_summary
+                self.summary_tokens = estimate_tokens(new_summary) + MESSAGE_OVERHEAD_TOKENS
+
+    def _summarize_with_llm(self, summary: str, transcript: str) -> str:
+        from llm_clients import get_openai_client
+        result = get_openai_client().responses.create(
+            model=self.summary_model,
+            instructions=SUMMARY_INSTRUCTIONS.format(max_chars=self.summary_max_chars),
+            input=f"[기존 요약]\n{summary or '(없음)'}\n\n[이어지는 대화]\n{transcript}",
+        )
+        return result.output_text[: self.summary_max_chars * 2]
+
+    def wait_for_summary(self, timeout: float = None):
+        """진행 중인 요약이 끝날 때까지 기다린다 (테스트/종료 시 사용)."""
+        if self._pending is not None:
+            self._pending.result(timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------ 리포트
+    def report(self) -> dict:
+        sent = sum(turn["input_tokens"] for turn in self.history)
+        chained = sum(turn["chained_input_tokens"] for turn in self.history)
+        return {
+            "turns": len(self.history),
+            "window_messages": len(self.turns),
+            "window_tokens": self.window_tokens,
+            "summary_tokens": self.summary_tokens,
+            "input_tokens": sent,
+            "chained_input_tokens": chained,
+            "saved_ratio": round(1 - sent / chained, 3) if chained else 0.0,
+        }
+
+
+def compare(turns: int = 12, budget_tokens: int = 400):
+    """같은 질문들을 previous_response_id 체인과 ConversationContext로 각각 보내고 턴별로 비교."""
+    from llm_clients import get_openai_client
+    client = get_openai_client()
+    questions = [f"{i + 1}번째 질문: 여행 계획을 세우는 중인데, 일정 {i + 1}일차에 할 만한 일을 추천해줘." for i in range(turns)]
+
+    chained = []
+    previous_response_id = None
+    for question in questions:
+        started = time.perf_counter()
+        result = client.responses.create(model="gpt-5-mini", input=question, previous_response_id=previous_response_id)
+        chained.append((result.usage.input_tokens, time.perf_counter() - started))
+        previous_response_id = result.id
+
+    context = ConversationContext(budget_tokens=budget_tokens)
+    for question in questions:
+        result = client.responses.create(model="gpt-5-mini", input=context.build_input(question))
+        context.add_response(result)
+    context.wait_for_summary()
+    context.close()
+
+    print(f"{'턴':>3} {'체인 입력':>10} {'관리 입력':>10} {'절약':>8} {'체인 ms':>9} {'관리 ms':>9}")
+    for (chain_tokens, chain_latency), managed in zip(chained, context.history):
+        managed_tokens = managed["billed_input_tokens"] or managed["input_tokens"]
+        print(f"{managed['turn']:>3} {chain_tokens:>10} {managed_tokens:>10} "
+              f"{chain_tokens - managed_tokens:>8} {chain_latency * 1000:>9.1f} {managed['latency_ms']:>9.1f}")
+    print(context.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="체인 방식 vs 클라이언트 관리 맥락 비교")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--budget", type=int, default=400, help="맥락 토큰 예산")
+    args = parser.parse_args()
+    compare(args.turns, args.budget)
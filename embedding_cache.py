@@ -0,0 +1,345 @@
+"""내용 주소(content-addressed) 임베딩 캐시. 벡터는 memory-mapped float32 파일에 저장한다.
+
+3.7.x / 3.8.1 예제는 실행할 때마다 같은 문서를 다시 임베딩한다. text-embedding-3-large(3072차원)로
+코퍼스를 매번 다시 임베딩하면 느리고 비용도 든다. CachedEmbeddings는 랭체인 Embeddings를 감싸서
+(모델, 차원, sha256(텍스트))가 같은 벡터는 다시 요청하지 않는다.
+
+저장 구조 (기본 .cache/embeddings/)
+- vectors-<세대>.f32 : 모든 벡터를 float32로 이어 붙인 파일. np.memmap으로 열어 복사 없이 view로 읽는다
+- index.sqlite       : 키 -> (차원, 파일 안의 offset, 마지막 사용 시각). 텍스트 자체는 저장하지 않음
+- cache.lock         : 프로세스 간 파일 잠금 (조회는 공유 잠금, 추가/정리는 배타 잠금)
+
+1. 추가는 파일 끝에 벡터를 쓰고 나서 인덱스를 기록 -> 중간에 죽어도 인덱스가 없는 공간만 남는다
+2. 저장된 벡터가 max_bytes를 넘으면 오래 안 쓴 것부터 인덱스에서 지운다 (LRU)
+3. 지워진 공간이 파일의 compact_ratio 이상이면 살아 있는 벡터만 새 세대 파일로 옮기고(compaction)
+   인덱스의 세대 번호를 올린다. 다른 프로세스는 세대 번호가 바뀐 것을 보고 새 파일을 다시 연다
+
+사용 예:
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large"))
+    vectors = embeddings.embed_documents(texts)     # 두 번째 실행부터는 API 호출 없음
+    matrix = embeddings.embed_array(texts)          # numpy (n, 차원) 배열
+    print(embeddings.stats())
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # 윈도우
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache" / "embeddings"
+# SQLite IN (...) 한 번에 넣을 키 수
+_QUERY_CHUNK = 500
+
+
+class EmbeddingCache:
+    """키 -> float32 벡터 저장소 (memmap 파일 + SQLite 인덱스)."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes: int = 2 * 1024 ** 3, compact_ratio: float = 0.5,
+                 min_compact_bytes: int = 16 * 1024 ** 2):
+        """
+        max_bytes         : 살아 있는 벡터의 최대 용량. 넘으면 LRU로 인덱스에서 제거
+        compact_ratio     : 파일에서 지워진 공간의 비율이 이 값을 넘으면 compaction
+        min_compact_bytes : 지워진 공간이 이보다 작으면 compaction 하지 않음
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(self.directory / "cache.lock", "a+b")
+        self._db = sqlite3.connect(str(self.directory / "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=30000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "key TEXT PRIMARY KEY, dims INTEGER NOT NULL, offset INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vectors_last_access ON vectors(last_access)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+        self._generation = None
+        self._map = np.empty(0, dtype=np.float32)
+        self.counters = {"hits": 0, "misses": 0, "added": 0, "evicted": 0, "compactions": 0}
+
+    # ------------------------------------------------------------ 잠금 / 파일
+    @contextmanager
+    def _locked(self, shared: bool):
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            else:
+                # msvcrt에는 공유 잠금이 없어 항상 배타 잠금
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                else:
+                    self._lock_file.seek(0)
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _vector_path(self, generation: int) -> Path:
+        return self.directory / f"vectors-{generation}.f32"
+
+    def _current_generation(self) -> int:
+        return self._db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def _mapped(self, generation: int, needed: int) -> np.ndarray:
+        """세대가 바뀌었거나 파일이 매핑한 범위보다 커졌을 때만 다시 매핑한다."""
+        if self._generation != generation or len(self._map) < needed:
+            path = self._vector_path(generation)
+            size = path.stat().st_size // 4 if path.exists() else 0
+            self._map = np.memmap(path, dtype=np.float32, mode="r", shape=(size,)) if size else np.empty(0, np.float32)
+            self._generation = generation
+        return self._map
+
+    def _rows(self, keys) -> dict:
+        rows = {}
+        for start in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[start:start + _QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            for key, dims, offset in self._db.execute(
+                    f"SELECT key, dims, offset FROM vectors WHERE key IN ({placeholders})", chunk):
+                rows[key] = (dims, offset)
+        return rows
+
+    # ------------------------------------------------------------ 공개 API
+    def get_many(self, keys) -> list:
+        """키마다 벡터(memmap의 읽기 전용 view, 복사 없음) 또는 None."""
+        keys = list(keys)
+        with self._locked(shared=True):
+            rows = self._rows(keys)
+            if not rows:
+                self.counters["misses"] += len(keys)
+                return [None] * len(keys)
+            mapped = self._mapped(self._current_generation(), max(offset + dims for dims, offset in rows.values()))
+            now = time.time()
+            self._db.executemany("UPDATE vectors SET last_access = ? WHERE key = ?", [(now, key) for key in rows])
+        result = []
+        for key in keys:
+            row = rows.get(key)
+            result.append(mapped[row[1]:row[1] + row[0]] if row else None)
+        hits = sum(1 for vector in result if vector is not None)
+        self.counters["hits"] += hits
+        self.counters["misses"] += len(keys) - hits
+        return result
+
+    def put_many(self, items):
+        """(키, 벡터) 목록을 저장. 다른 프로세스가 먼저 저장한 키는 건너뛴다."""
+        items = list(items)
+        if not items:
+            return
+        with self._locked(shared=False):
+            existing = self._rows([key for key, _ in items])
+            fresh, seen = [], set()
+            for key, vector in items:
+                if key not in existing and key not in seen:
+                    seen.add(key)
+                    fresh.append((key, np.ascontiguousarray(vector, dtype=np.float32).ravel()))
+            if not fresh:
+                return
+            path = self._vector_path(self._current_generation())
+            with open(path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size % 4:
+                    # 이전에 쓰다 만 조각이 있으면 4바이트 경계로 맞춘다
+                    f.write(b"\0" * (4 - size % 4))
+                    size += 4 - size % 4
+                offset = size // 4
+                rows = []
+                now = time.time()
+                for key, vector in fresh:
+                    rows.append((key, len(vector), offset, now))
+                    offset += len(vector)
+                f.write(np.concatenate([vector for _, vector in fresh]).tobytes())
+            # 벡터를 파일에 다 쓴 뒤에 인덱스를 기록
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("INSERT OR IGNORE INTO vectors (key, dims, offset, last_access) VALUES (?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+            self.counters["added"] += len(rows)
+            self._maybe_evict()
+
+    def _maybe_evict(self):
+        """(배타 잠금 안에서 호출) 용량을 넘으면 LRU 제거, 지워진 공간이 많으면 compaction."""
+        (live_floats,) = self._db.execute("SELECT COALESCE(SUM(dims), 0) FROM vectors").fetchone()
+        if live_floats * 4 > self.max_bytes:
+            target = int(self.max_bytes * 0.9) // 4
+            doomed = []
+            for key, dims in self._db.execute("SELECT key, dims FROM vectors ORDER BY last_access"):
+                if live_floats <= target:
+                    break
+                doomed.append((key,))
+                live_floats -= dims
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("DELETE FROM vectors WHERE key = ?", doomed)
+            self._db.execute("COMMIT")
+            self.counters["evicted"] += len(doomed)
+        path = self._vector_path(self._current_generation())
+        file_bytes = path.stat().st_size if path.exists() else 0
+        dead = file_bytes - live_floats * 4
+        if dead >= self.min_compact_bytes and dead > file_bytes * self.compact_ratio:
+            self._compact()
+
+    def compact(self):
+        """지워진 공간을 지금 바로 정리한다."""
+        with self._locked(shared=False):
+            self._compact()
+
+    def _compact(self):
+        generation = self._current_generation()
+        old_path = self._vector_path(generation)
+        new_path = self._vector_path(generation + 1)
+        rows = self._db.execute("SELECT key, dims, offset FROM vectors ORDER BY offset").fetchall()
+        old = np.memmap(old_path, dtype=np.float32, mode="r") if old_path.exists() and old_path.stat().st_size else None
+        updates = []
+        with open(new_path, "wb") as f:
+            position = 0
+            for key, dims, offset in rows:
+                f.write(old[offset:offset + dims].tobytes())
+                updates.append((position, key))
+                position += dims
+        del old
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.executemany("UPDATE vectors SET offset = ? WHERE key = ?", updates)
+        self._db.execute("UPDATE meta SET value = ? WHERE name = 'generation'", (generation + 1,))
+        self._db.execute("COMMIT")
+        self.counters["compactions"] += 1
+        # 이전 세대 파일 삭제. 다른 프로세스가 매핑 중이면 (윈도우) 지울 수 없으니 다음 compaction 때 다시 시도
+        for stale in self.directory.glob("vectors-*.f32"):
+            if stale != new_path:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._locked(shared=False):
+            self._db.execute("DELETE FROM vectors")
+            self._compact()
+
+    def stats(self) -> dict:
+        entries, live_floats = self._db.execute("SELECT COUNT(*), COALESCE(SUM(dims), 0) FROM vectors").fetchone()
+        path = self._vector_path(self._current_generation())
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "live_bytes": live_floats * 4,
+            "file_bytes": path.stat().st_size if path.exists() else 0,
+            "generation": self._current_generation(),
+        }
+
+    def close(self):
+        self._map = np.empty(0, dtype=np.float32)
+        self._db.close()
+        self._lock_file.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """EmbeddingCache를 앞에 둔 랭체인 Embeddings. 캐시에 없는 텍스트만 한 번의 요청으로 모아 임베딩한다."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache = None, model: str = None, dimensions: int = None):
+        """
+        model / dimensions : 캐시 키에 들어가는 값. 생략하면 embeddings.model / embeddings.dimensions
+        """
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.dimensions = dimensions if dimensions is not None else getattr(embeddings, "dimensions", None)
+        self._prefix = f"{self.model}|{self.dimensions or 'default'}|"
+
+    def _key(self, text: str, kind: str) -> str:
+        # 문서/질의를 다르게 임베딩하는 모델도 있으므로 종류(d/q)도 키에 넣는다
+        return f"{self._prefix}{kind}|{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _split(self, texts, kind):
+        keys = [self._key(text, kind) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        return keys, vectors, missing
+
+    @staticmethod
+    def _merge(keys, vectors, fetched: dict) -> list:
+        return [vector if vector is not None else fetched[key] for key, vector in zip(keys, vectors)]
+
+    def embed_vectors(self, texts) -> list:
+        """numpy 벡터 목록. 캐시에 있던 벡터는 memmap view 그대로(복사 없음)."""
+        texts = list(texts)
+        keys, vectors, missing = self._split(texts, "d")
+        fetched = {}
+        if missing:
+            results = self.embeddings.embed_documents(list(missing.values()))
+            fetched = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, results)}
+            self.cache.put_many(fetched.items())
+        return self._merge(keys, vectors, fetched)
+
+    def embed_array(self, texts) -> np.ndarray:
+        """(텍스트 수, 차원) float32 배열."""
+        vectors = self.embed_vectors(texts)
+        return np.stack(vectors) if vectors else np.empty((0, self.dimensions or 0), dtype=np.float32)
+
+    def embed_documents(self, texts) -> list:
+        return [vector.tolist() for vector in self.embed_vectors(texts)]
+
+    def embed_query(self, text: str) -> list:
+        keys, vectors, missing = self._split([text], "q")
+        if vectors[0] is not None:
+            return vectors[0].tolist()
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        self.cache.put_many([(keys[0], vector)])
+        return vector.tolist()
+
+    async def aembed_documents(self, texts) -> list:
+        texts = list(texts)
+        keys, vectors, missing = await asyncio.to_thread(self._split, texts, "d")
+        fetched = {}
+        if missing:
+            results = await self.embeddings.aembed_documents(list(missing.values()))
+            fetched = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, results)}
+            await asyncio.to_thread(self.cache.put_many, list(fetched.items()))
+        return [vector.tolist() for vector in self._merge(keys, vectors, fetched)]
+
+    async def aembed_query(self, text: str) -> list:
+        keys, vectors, missing = await asyncio.to_thread(self._split, [text], "q")
+        if vectors[0] is not None:
+            return vectors[0].tolist()
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        await asyncio.to_thread(self.cache.put_many, [(keys[0], vector)])
+        return vector.tolist()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """프로세스 공용 임베딩 캐시. EMBEDDING_CACHE_DIR 환경 변수로 위치를 바꿀 수 있다."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache(os.environ.get("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR))
+        return _default_cache
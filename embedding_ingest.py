@@ -0,0 +1,182 @@
+"""토큰 수에 맞춰 청크를 묶고, 여러 배치를 동시에 임베딩하면서 도착하는 대로 FAISS에 넣는 적재기.
+
+3.7.x의 FAISS.from_documents / embed_documents는 토큰 수와 상관없이 정해진 개수(chunk_size)로 나눈 요청을
+하나씩 차례로 보내고, 모든 요청이 끝난 뒤에야 색인을 만든다.
+
+1. 청크를 순서대로 담다가 요청 하나의 토큰 한도(max_batch_tokens)나 입력 수 한도(max_inputs)에
+   닿으면 다음 배치로 넘긴다 -> 요청 수를 최소로
+2. 배치 여러 개를 동시에 보내되 rate_limiter.get_governor()의 RPM/TPM/동시성 한도 안에서,
+   재시도는 retry_policy.RetryPolicy로 (bulk_runner.py와 같은 경로)
+3. 끝난 배치부터 바로 FAISS.add_embeddings로 색인에 추가 (색인 순서 = 도착 순서)
+4. 청크 수 / 배치 수 / 추정 토큰 수 / 초당 청크 수를 stats()로 확인
+
+사용 예:
+    vectorstore = ingest_documents(split_docs, embeddings)            # 동기 코드에서
+    ingestor = EmbeddingIngestor(embeddings, concurrency=8)
+    vectorstore = await ingestor.aingest_documents(split_docs)        # 비동기 코드에서
+    print(ingestor.stats())
+
+python embedding_ingest.py 로 차례대로 보내는 FAISS.from_documents와 처리량 비교 (MOCK_LLM_SERVER를 주면 오프라인 실행)
+"""
+import asyncio
+import time
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from rate_limiter import estimate_tokens, get_governor
+from retry_policy import RetryPolicy
+
+# OpenAI 임베딩 API 한도: 요청 하나에 입력 2048개 / 합계 30만 토큰, 입력 하나에 8191 토큰
+# 토큰 수는 추정치이므로 요청 한도에는 여유를 둔다
+MAX_REQUEST_TOKENS = 250_000
+MAX_INPUT_TOKENS = 8191
+# langchain OpenAIEmbeddings의 chunk_size 기본값. 이보다 크게 묶으면 내부에서 다시 나눠 차례로 보낸다
+DEFAULT_MAX_INPUTS = 1000
+
+
+def pack_batches(token_counts, max_batch_tokens: int = MAX_REQUEST_TOKENS, max_inputs: int = DEFAULT_MAX_INPUTS) -> list:
+    """토큰 수 목록을 순서대로 담아 [[인덱스, ...], ...] 배치로 나눈다."""
+    batches, current, current_tokens = [], [], 0
+    for index, tokens in enumerate(token_counts):
+        if tokens > MAX_INPUT_TOKENS:
+            raise ValueError(f"{index}번째 청크가 약 {tokens} 토큰으로 입력 한도({MAX_INPUT_TOKENS})를 넘습니다. "
+                             f"텍스트 분할기의 chunk_size를 줄이세요.")
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingIngestor:
+    """토큰 단위로 묶은 배치를 동시에 임베딩하는 스케줄러."""
+
+    def __init__(self, embeddings, max_batch_tokens: int = MAX_REQUEST_TOKENS, max_inputs: int = DEFAULT_MAX_INPUTS,
+                 concurrency: int = 4, provider: str = "openai", model: Optional[str] = None,
+                 policy: Optional[RetryPolicy] = None):
+        """
+        embeddings       : 랭체인 Embeddings (CachedEmbeddings로 감싼 것도 가능)
+        max_batch_tokens : 요청 하나에 담을 추정 토큰 수 상한
+        max_inputs       : 요청 하나에 담을 청크 수 상한
+        concurrency      : 동시에 보낼 배치 수 (governor의 동시성 한도도 함께 적용)
+        provider / model : governor에서 한도를 찾을 이름. model을 생략하면 embeddings.model
+        """
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_inputs = max_inputs
+        self.concurrency = concurrency
+        self.provider = provider
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.policy = policy or RetryPolicy(max_attempts=5)
+        self.counters = {"chunks": 0, "batches": 0, "tokens": 0, "seconds": 0.0}
+
+    async def aiter_embeddings(self, texts):
+        """배치가 끝나는 순서대로 (인덱스 목록, 벡터 목록)을 돌려주는 비동기 제너레이터."""
+        texts = list(texts)
+        token_counts = [estimate_tokens(text) for text in texts]
+        batches = pack_batches(token_counts, self.max_batch_tokens, self.max_inputs)
+        governor = get_governor()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def embed(batch):
+            tokens = sum(token_counts[i] for i in batch)
+            batch_texts = [texts[i] for i in batch]
+
+            async def fetch():
+                async with governor.slot(self.provider, self.model, tokens=tokens):
+                    return await self.embeddings.aembed_documents(batch_texts)
+
+            async with semaphore:
+                vectors = await self.policy.call(f"{self.provider}.embeddings", fetch)
+            return batch, tokens, vectors
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(embed(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                batch, tokens, vectors = await next_done
+                self.counters["chunks"] += len(batch)
+                self.counters["batches"] += 1
+                self.counters["tokens"] += tokens
+                self.counters["seconds"] = time.perf_counter() - started
+                yield batch, vectors
+        finally:
+            # 중간에 실패하거나 소비를 멈추면 남은 배치는 취소
+            for task in tasks:
+                task.cancel()
+
+    async def aingest_documents(self, documents, vectorstore=None):
+        """문서를 임베딩하면서 끝난 배치부터 FAISS에 추가. vectorstore가 없으면 첫 배치로 새로 만든다."""
+        from langchain_community.vectorstores import FAISS
+
+        documents = list(documents)
+        async for batch, vectors in self.aiter_embeddings(doc.page_content for doc in documents):
+            text_embeddings = [(documents[i].page_content, vector) for i, vector in zip(batch, vectors)]
+            metadatas = [documents[i].metadata for i in batch]
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+        return vectorstore
+
+    def stats(self) -> dict:
+        seconds = self.counters["seconds"]
+        return {
+            **self.counters,
+            "chunks_per_second": self.counters["chunks"] / seconds if seconds else 0.0,
+            "governor": get_governor().stats(),
+        }
+
+
+def ingest_documents(documents, embeddings, vectorstore=None, **kwargs):
+    """EmbeddingIngestor(embeddings, **kwargs)로 문서를 적재하고 처리량을 출력하는 동기 함수."""
+    ingestor = EmbeddingIngestor(embeddings, **kwargs)
+    vectorstore = asyncio.run(ingestor.aingest_documents(documents, vectorstore))
+    stats = ingestor.stats()
+    print(f"[임베딩 적재] 청크 {stats['chunks']}개, 배치 {stats['batches']}개, 약 {stats['tokens']:,} 토큰, "
+          f"{stats['seconds']:.2f}초 ({stats['chunks_per_second']:.1f} chunks/s)")
+    return vectorstore
+
+
+def benchmark(repeat: int = 40, max_inputs: int = 100, concurrency: int = 8, model: str = "text-embedding-3-small"):
+    """documents/ 청크를 repeat배로 늘려 차례대로 보내는 FAISS.from_documents와 초당 청크 수 비교."""
+    from langchain.text_splitter import CharacterTextSplitter
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    from langchain_community.vectorstores import FAISS
+    from langchain_openai import OpenAIEmbeddings
+
+    from llm_clients import apply_mock_server_env
+
+    apply_mock_server_env()
+    loader = DirectoryLoader(str(Path(__file__).parent / "documents"), glob="**/*.txt", loader_cls=TextLoader,
+                             loader_kwargs={"encoding": "utf-8"})
+    split_docs = CharacterTextSplitter(chunk_size=200, chunk_overlap=20).split_documents(loader.load())
+    documents = [Document(page_content=f"{doc.page_content} ({n})", metadata=doc.metadata)
+                 for n in range(repeat) for doc in split_docs]
+    # 오프라인(모의 서버)에서는 tiktoken 파일을 받을 수 없으므로 토큰 길이 검사를 끈다.
+    # 두 방식 모두 요청 하나에 max_inputs개씩 보내도록 맞춤
+    embeddings = OpenAIEmbeddings(model=model, chunk_size=max_inputs, check_embedding_ctx_length=False)
+
+    started = time.perf_counter()
+    FAISS.from_documents(documents, embeddings)
+    serial = time.perf_counter() - started
+    print(f"FAISS.from_documents (차례대로) : {len(documents)}개, {serial:.2f}초, {len(documents) / serial:.1f} chunks/s")
+
+    ingestor = EmbeddingIngestor(embeddings, max_inputs=max_inputs, concurrency=concurrency)
+    vectorstore = asyncio.run(ingestor.aingest_documents(documents))
+    stats = ingestor.stats()
+    print(f"EmbeddingIngestor (동시 {concurrency})   : {stats['chunks']}개, {stats['seconds']:.2f}초, "
+          f"{stats['chunks_per_second']:.1f} chunks/s, 배치 {stats['batches']}개 -> "
+          f"{serial / stats['seconds']:.1f}배, 색인 {vectorstore.index.ntotal}개")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    benchmark()
@@ -0,0 +1,331 @@
+"""LCEL 체인(RunnableParallel/Sequence/Branch)을 이벤트 루프 위에서 가볍게 실행하는 실행 모드.
+
+기본 Runnable 실행기는
+- RunnableLambda(lambda x: len(x["word"]))처럼 마이크로초 단위로 끝나는 함수도 ainvoke에서는 스레드 풀로 넘기고
+- .batch()는 문자열 끝에 '!'를 붙이는 일에도 스레드 풀을 띄우며
+- 단계마다 콜백/설정(config) 처리를 거친다.
+
+FastChain은 체인 구조를 한 번 훑어 실행 계획을 만들어 두고
+1. 동기 함수(RunnableLambda, 프롬프트 템플릿, 출력 파서, Passthrough)는 스레드 풀 없이 그 자리에서 실행
+2. 모델 호출(LLM 분기)만 이벤트 루프에서 await 하고, max_concurrency 개까지만 동시에 upstream으로 보낸다
+3. batch()로 동시에 들어온 모델 호출 중 (모델, 메시지)가 같은 것은 SingleFlight로 upstream 요청 1번으로 합친다
+   (chat 모델은 서로 다른 프롬프트를 한 요청에 담는 API가 없으므로, 합칠 수 있는 것은 같은 요청뿐이다)
+4. 체인 전체가 동기 단계로만 되어 있으면 이벤트 루프도 만들지 않고 그냥 반복문으로 실행
+
+콜백/트레이싱(LangSmith 등)은 호출되지 않으므로, 그게 필요한 실행에는 원래 체인을 쓴다.
+
+사용 예:
+    fast = FastChain(analysis_chain, max_concurrency=8)
+    fast.invoke({"word": "peaceful"})
+    fast.batch([{"word": w} for w in words])
+    await fast.abatch(...)
+
+벤치마크 (기본 실행기 vs FastChain, 모의 서버 사용):
+    python fast_chain.py --n 200
+"""
+import argparse
+import asyncio
+import inspect
+import os
+import time
+import weakref
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import HumanMessage, convert_to_messages
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.prompt_values import PromptValue
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import (
+    Runnable,
+    RunnableBranch,
+    RunnableLambda,
+    RunnableParallel,
+    RunnablePassthrough,
+    RunnableSequence,
+)
+from langchain_core.runnables.passthrough import RunnableAssign
+from langchain_core.runnables.utils import accepts_config
+
+from response_cache import make_cache_key
+from single_flight import get_single_flight
+
+
+class _Step:
+    """실행 계획의 한 단계. is_async가 False면 fn(x)가 바로 값을, True면 awaitable을 돌려준다.
+
+    afn : 동기 단계를 비동기 경로에서 실행할 때 쓸 코루틴 함수 (람다가 돌려준 Runnable을 ainvoke로 잇기 위해)
+    """
+
+    __slots__ = ("fn", "is_async", "afn")
+
+    def __init__(self, fn, is_async: bool, afn=None):
+        self.fn = fn
+        self.is_async = is_async
+        self.afn = afn
+
+
+async def _run(step: _Step, value):
+    if step.is_async:
+        return await step.fn(value)
+    if step.afn is not None:
+        return await step.afn(value)
+    return step.fn(value)
+
+
+class FastChain:
+    def __init__(self, runnable: Runnable, max_concurrency: int = 8, merge_duplicates: bool = True):
+        """
+        max_concurrency  : 동시에 upstream으로 보낼 모델 호출 수
+        merge_duplicates : 동시에 들어온 같은 모델 호출을 1번으로 합칠지 여부
+        """
+        self.runnable = runnable
+        self.max_concurrency = max_concurrency
+        self.merge_duplicates = merge_duplicates
+        self._semaphores = weakref.WeakKeyDictionary()  # 이벤트 루프별 세마포어
+        self._flight = get_single_flight()
+        self.counters = {"model_calls": 0, "inline_calls": 0}
+        self._plan = self._compile(runnable)
+
+    # ------------------------------------------------------------ 실행 계획
+    def _compile(self, runnable) -> _Step:
+        if isinstance(runnable, RunnableSequence):
+            return self._sequence([self._compile(step) for step in runnable.steps])
+        if isinstance(runnable, RunnableParallel):
+            return self._parallel({key: self._compile(step) for key, step in runnable.steps__.items()})
+        if isinstance(runnable, RunnableAssign):
+            mapper = self._compile(runnable.mapper)
+
+            async def assign(x):
+                return {**x, **await _run(mapper, x)}
+            if not mapper.is_async:
+                return _Step(lambda x: {**x, **mapper.fn(x)}, False, assign if mapper.afn else None)
+            return _Step(assign, True)
+        if isinstance(runnable, RunnableBranch):
+            return self._branch([(self._compile(condition), self._compile(branch))
+                                 for condition, branch in runnable.branches], self._compile(runnable.default))
+        if isinstance(runnable, RunnablePassthrough) and runnable.func is None and runnable.afunc is None:
+            return _Step(lambda x: x, False)
+        if isinstance(runnable, RunnableLambda) and hasattr(runnable, "func") and not accepts_config(runnable.func):
+            func = runnable.func
+            if not inspect.iscoroutinefunction(func):
+                return self._inline_lambda(func)
+        if isinstance(runnable, (BasePromptTemplate, BaseOutputParser)):
+            return _Step(self._inline(runnable.invoke), False)
+        if isinstance(runnable, BaseLanguageModel):
+            return _Step(self._model_call(runnable), True)
+        # 그 밖의 Runnable은 원래 비동기 경로로 실행
+        return _Step(runnable.ainvoke, True)
+
+    def _inline(self, func):
+        counters = self.counters
+
+        def call(x):
+            counters["inline_calls"] += 1
+            return func(x)
+        return call
+
+    def _inline_lambda(self, func) -> _Step:
+        counters = self.counters
+
+        # RunnableLambda가 Runnable을 돌려주면 그 Runnable을 이어서 실행 (LCEL과 같은 동작)
+        # 동기 경로에서는 invoke, 비동기 경로에서는 이벤트 루프를 막지 않도록 ainvoke
+        def call(x):
+            counters["inline_calls"] += 1
+            result = func(x)
+            return result.invoke(x) if isinstance(result, Runnable) else result
+
+        async def acall(x):
+            counters["inline_calls"] += 1
+            result = func(x)
+            return await result.ainvoke(x) if isinstance(result, Runnable) else result
+        return _Step(call, False, acall)
+
+    @staticmethod
+    def _sequence(steps) -> _Step:
+        async def run(x):
+            for step in steps:
+                x = await _run(step, x)
+            return x
+
+        if not any(step.is_async for step in steps):
+            def run_sync(x):
+                for step in steps:
+                    x = step.fn(x)
+                return x
+            return _Step(run_sync, False, run if any(step.afn for step in steps) else None)
+        return _Step(run, True)
+
+    @staticmethod
+    def _parallel(steps: dict) -> _Step:
+        sync_steps = [(key, step) for key, step in steps.items() if not step.is_async]
+        async_steps = [(key, step) for key, step in steps.items() if step.is_async]
+
+        async def run(x):
+            # 모델 호출을 먼저 띄워 두고, 그동안 동기 함수들은 그 자리에서 계산
+            tasks = [asyncio.ensure_future(step.fn(x)) for _, step in async_steps]
+            try:
+                result = {}
+                for key, step in sync_steps:
+                    result[key] = await step.afn(x) if step.afn else step.fn(x)
+                for (key, _), value in zip(async_steps, await asyncio.gather(*tasks)):
+                    result[key] = value
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            return {key: result[key] for key in steps}
+
+        if not async_steps:
+            return _Step(lambda x: {key: step.fn(x) for key, step in sync_steps}, False,
+                         run if any(step.afn for _, step in sync_steps) else None)
+        return _Step(run, True)
+
+    @staticmethod
+    def _branch(branches, default: _Step) -> _Step:
+        async def run(x):
+            for condition, branch in branches:
+                if await _run(condition, x):
+                    return await _run(branch, x)
+            return await _run(default, x)
+
+        steps = [step for pair in branches for step in pair] + [default]
+        if not any(step.is_async for step in steps):
+            def run_sync(x):
+                for condition, branch in branches:
+                    if condition.fn(x):
+                        return branch.fn(x)
+                return default.fn(x)
+            return _Step(run_sync, False, run if any(step.afn for step in steps) else None)
+        return _Step(run, True)
+
+    def _model_call(self, model):
+        async def limited(x):
+            async with self._semaphore():
+                self.counters["model_calls"] += 1
+                return await model.ainvoke(x)
+
+        async def call(x):
+            if not self.merge_duplicates:
+                return await limited(x)
+            messages = [(message.type, message.content) for message in _input_messages(x)]
+            key = (id(model), make_cache_key({"messages": messages}))
+            return await self._flight.do(key, lambda: limited(x))
+        return call
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    # ------------------------------------------------------------ 실행
+    async def ainvoke(self, input):
+        return await _run(self._plan, input)
+
+    async def abatch(self, inputs) -> list:
+        if not self._plan.is_async and self._plan.afn is None:
+            return [self._plan.fn(x) for x in inputs]
+        return list(await asyncio.gather(*(_run(self._plan, x) for x in inputs)))
+
+    def invoke(self, input):
+        if not self._plan.is_async:
+            return self._plan.fn(input)
+        _require_no_running_loop("invoke")
+        return asyncio.run(self.ainvoke(input))
+
+    def batch(self, inputs) -> list:
+        """스레드 풀 없이 한 이벤트 루프에서 모든 입력을 동시에 처리 (모델 호출은 max_concurrency로 제한)."""
+        if not self._plan.is_async:
+            return [self._plan.fn(x) for x in inputs]
+        _require_no_running_loop("batch")
+        return asyncio.run(self.abatch(inputs))
+
+
+def _input_messages(x) -> list:
+    """모델 입력(PromptValue / 문자열 / 메시지 목록)을 메시지 목록으로 바꾼다 (중복 요청 병합 키용)."""
+    if isinstance(x, PromptValue):
+        return x.to_messages()
+    if isinstance(x, str):
+        return [HumanMessage(x)]
+    return convert_to_messages(x)
+
+
+def _require_no_running_loop(method: str):
+    # asyncio.run은 실행 중인 이벤트 루프 안에서 부를 수 없다 (주피터, FastAPI 핸들러 등)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f"이벤트 루프 안에서는 FastChain.{method}()를 쓸 수 없습니다. "
+                       f"대신 await chain.a{method}(...)를 사용하세요.")
+
+
+def benchmark(n: int = 200, concurrency: int = 8):
+    """3.5의 exclamation_runnable / analysis_chain을 기본 실행기와 FastChain으로 각각 실행해 비교."""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from llm_clients import get_chat_openai
+
+    def measure(label, fn):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<42} {elapsed * 1000:9.1f} ms")
+        return elapsed
+
+    exclamation_runnable = RunnableLambda(lambda text: f"{text}!")
+    texts = [f"안녕 {i}" for i in range(n * 50)]
+    fast = FastChain(exclamation_runnable)
+    assert fast.batch(texts[:3]) == exclamation_runnable.batch(texts[:3])
+    base = measure(f"RunnableLambda.batch ({len(texts)}건)", lambda: exclamation_runnable.batch(texts))
+    quick = measure(f"FastChain.batch ({len(texts)}건)", lambda: fast.batch(texts))
+    print(f"  -> {base / quick:.1f}배")
+
+    prompt = ChatPromptTemplate.from_template("주어진 '{word}'와 유사한 단어 3가지를 나열해주세요. 단어만 나열합니다.")
+    analysis_chain = RunnableParallel(
+        synonyms=prompt | get_chat_openai("gpt-5-mini") | StrOutputParser(),
+        word_count=RunnableLambda(lambda x: len(x["word"])),
+        uppercase=RunnableLambda(lambda x: x["word"].upper()),
+    )
+    # 같은 단어가 섞여 있는 입력 (중복 호출 합치기 효과 확인용)
+    words = [{"word": f"word-{i % (n // 2 or 1)}"} for i in range(n)]
+    config = {"max_concurrency": concurrency}
+    fast = FastChain(analysis_chain, max_concurrency=concurrency)
+    base = measure(f"analysis_chain.batch ({n}건, 동시 {concurrency})",
+                   lambda: analysis_chain.batch(words, config=config))
+    unmerged = FastChain(analysis_chain, max_concurrency=concurrency, merge_duplicates=False)
+    quick = measure("FastChain.batch (중복 합치기 없음)", lambda: unmerged.batch(words))
+    print(f"  -> {base / quick:.1f}배")
+    quick = measure(f"FastChain.batch ({n}건, 동시 {concurrency})", lambda: fast.batch(words))
+    print(f"  -> {base / quick:.1f}배, upstream 모델 호출 {fast.counters['model_calls']}번 (입력 {n}건)")
+    base = measure("analysis_chain.abatch", lambda: asyncio.run(analysis_chain.abatch(words, config=config)))
+    quick = measure("FastChain.abatch", lambda: asyncio.run(fast.abatch(words)))
+    print(f"  -> {base / quick:.1f}배")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="기본 Runnable 실행기 vs FastChain 벤치마크")
+    parser.add_argument("--n", type=int, default=200, help="analysis_chain 입력 수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server", help="이미 실행 중인 모의 서버 URL (없으면 프로세스 안에 띄움)")
+    args = parser.parse_args()
+
+    import llm_clients
+    if args.server:
+        os.environ["MOCK_LLM_SERVER"] = args.server
+    if os.environ.get("MOCK_LLM_SERVER"):
+        llm_clients.apply_mock_server_env()
+        benchmark(args.n, args.concurrency)
+    else:
+        import socket
+
+        from mock_llm_server import BackgroundServer, MockConfig
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        os.environ["MOCK_LLM_SERVER"] = f"http://127.0.0.1:{port}"
+        llm_clients.apply_mock_server_env()
+        with BackgroundServer(MockConfig(ttft=0.05, tokens_per_second=200.0), port=port):
+            benchmark(args.n, args.concurrency)
@@ -0,0 +1,310 @@
+"""여러 예제가 공유하는 LLM 클라이언트 팩토리.
+
+스크립트마다 OpenAI()/ChatOpenAI()를 따로 만들면 커넥션 풀이 분리되어
+TLS 핸드셰이크가 반복되고 keep-alive 재사용이 되지 않는다.
+여기서는 프로세스 전체가 하나의 httpx 커넥션 풀(keep-alive, HTTP/2)을 공유하고,
+OpenAI/Anthropic/LangChain 클라이언트는 모두 그 풀을 통해 요청을 보낸다.
+
+사용 예:
+    from llm_clients import get_openai_client, pool_stats
+    client = get_openai_client()
+    ...
+    print(pool_stats())  # 풀 hit/miss, 연결 수립 시간
+
+MOCK_LLM_SERVER 환경 변수가 있으면 OpenAI/Anthropic 요청이 로컬 모의 서버(mock_llm_server.py)로 간다.
+"""
+import asyncio
+import importlib
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+
+import httpx
+
+try:
+    import h2  # noqa: F401  HTTP/2 사용 시 필요 (pip install "httpx[http2]")
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass
+class PoolConfig:
+    """커넥션 풀 설정. 환경 변수로도 조정할 수 있다."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 600.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """LLM_POOL_* 환경 변수에서 설정을 읽는다."""
+        return cls(
+            max_connections=int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.environ.get("LLM_POOL_KEEPALIVE_EXPIRY", 30.0)),
+            connect_timeout=float(os.environ.get("LLM_POOL_CONNECT_TIMEOUT", 10.0)),
+            read_timeout=float(os.environ.get("LLM_POOL_READ_TIMEOUT", 600.0)),
+            http2=os.environ.get("LLM_POOL_HTTP2", "1") != "0",
+        )
+
+    def limits(self, module=httpx):
+        return module.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, module=httpx):
+        return module.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    @property
+    def use_http2(self) -> bool:
+        return self.http2 and HTTP2_AVAILABLE
+
+
+@dataclass
+class PoolStats:
+    """풀 재사용 통계. 새 연결을 맺지 않은 요청은 hit, 새 연결을 맺은 요청은 miss."""
+    requests: int = 0
+    pool_hits: int = 0
+    pool_misses: int = 0
+    connect_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, setup_seconds):
+        """요청 1건의 결과를 기록. setup_seconds가 None이면 기존 연결을 재사용한 것."""
+        with self._lock:
+            self.requests += 1
+            if setup_seconds is None:
+                self.pool_hits += 1
+            else:
+                self.pool_misses += 1
+                self.connect_seconds += setup_seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg_setup = self.connect_seconds / self.pool_misses if self.pool_misses else 0.0
+            return {
+                "requests": self.requests,
+                "pool_hits": self.pool_hits,
+                "pool_misses": self.pool_misses,
+                "hit_ratio": self.pool_hits / self.requests if self.requests else 0.0,
+                "avg_connect_ms": avg_setup * 1000,
+                # 재사용된 요청들이 아낀 것으로 추정되는 핸드셰이크 시간
+                "estimated_saved_ms": self.pool_hits * avg_setup * 1000,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests = self.pool_hits = self.pool_misses = 0
+            self.connect_seconds = 0.0
+
+
+class _ConnectionTrace:
+    """httpcore trace 확장으로 요청 1건의 TCP/TLS 연결 수립 시간을 잰다."""
+
+    def __init__(self):
+        self.started = None
+        self.completed = None
+
+    def on_event(self, name, info):
+        if name == "connection.connect_tcp.started":
+            self.started = time.perf_counter()
+        elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self.completed = time.perf_counter()
+
+    def setup_seconds(self):
+        if self.started is None:
+            return None
+        return (self.completed or time.perf_counter()) - self.started
+
+
+def _loop_local_transport(module, config: PoolConfig):
+    """이벤트 루프마다 별도의 AsyncHTTPTransport를 쓰는 전송 계층을 만든다.
+
+    비동기 커넥션은 자신을 만든 이벤트 루프에 묶여 있어서, asyncio.run()을 여러 번
+    호출하는 스크립트(예: 4.5)에서 하나의 풀을 그대로 공유하면 오류가 난다.
+    """
+
+    class LoopLocalAsyncTransport(module.AsyncBaseTransport):
+        def __init__(self):
+            self._transports = weakref.WeakKeyDictionary()
+
+        def _transport(self):
+            loop = asyncio.get_running_loop()
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = module.AsyncHTTPTransport(http2=config.use_http2, limits=config.limits(module))
+                self._transports[loop] = transport
+            return transport
+
+        async def handle_async_request(self, request):
+            return await self._transport().handle_async_request(request)
+
+        async def aclose(self):
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+            if transport is not None:
+                await transport.aclose()
+
+    return LoopLocalAsyncTransport()
+
+
+def apply_mock_server_env():
+    """MOCK_LLM_SERVER가 설정되어 있으면 SDK들이 읽는 base URL 환경 변수를 모의 서버로 맞춘다."""
+    url = os.environ.get("MOCK_LLM_SERVER")
+    if not url:
+        return
+    url = url.rstrip("/")
+    os.environ["OPENAI_BASE_URL"] = f"{url}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "mock")
+    # 에이전트 SDK의 트레이스 업로드(api.openai.com)도 끈다
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+
+
+apply_mock_server_env()
+
+_config = PoolConfig.from_env()
+_stats = PoolStats()
+_lock = threading.Lock()
+_http_clients = {}  # httpx 계열 모듈 이름 -> 공유 동기 클라이언트
+_async_http_clients = {}  # httpx 계열 모듈 이름 -> 공유 비동기 클라이언트
+_sdk_clients = {}
+
+
+def _httpx_module_for(sdk: str):
+    """SDK가 사용하는 httpx 계열 모듈. 최근 openai/anthropic SDK는 httpx 대신 httpx2를 쓴다."""
+    try:
+        base_client = importlib.import_module(f"{sdk}._base_client")
+    except ImportError:
+        return httpx
+    return getattr(base_client, "httpx2", None) or getattr(base_client, "httpx", httpx)
+
+
+def _traced_request(request):
+    trace = _ConnectionTrace()
+    request.extensions["trace"] = trace.on_event
+    request.extensions["_llm_clients_trace"] = trace
+
+
+async def _atraced_request(request):
+    trace = _ConnectionTrace()
+
+    async def on_event(name, info):
+        trace.on_event(name, info)
+
+    request.extensions["trace"] = on_event
+    request.extensions["_llm_clients_trace"] = trace
+
+
+def _record_response(response):
+    trace = response.request.extensions.get("_llm_clients_trace")
+    if trace is not None:
+        _stats.record(trace.setup_seconds())
+
+
+async def _arecord_response(response):
+    _record_response(response)
+
+
+def configure_pool(config: PoolConfig):
+    """풀 설정을 바꾼다. 이미 만들어진 클라이언트가 있다면 다음 생성부터 적용된다."""
+    global _config
+    with _lock:
+        _config = config
+        _http_clients.clear()
+        _async_http_clients.clear()
+        _sdk_clients.clear()
+
+
+def get_http_client(module=httpx):
+    """프로세스 전체가 공유하는 동기 httpx(또는 httpx2) 클라이언트."""
+    with _lock:
+        client = _http_clients.get(module.__name__)
+        if client is None:
+            client = _http_clients[module.__name__] = module.Client(
+                http2=_config.use_http2,
+                limits=_config.limits(module),
+                timeout=_config.timeout(module),
+                event_hooks={"request": [_traced_request], "response": [_record_response]},
+            )
+        return client
+
+
+def get_async_http_client(module=httpx):
+    """프로세스 전체가 공유하는 비동기 httpx(또는 httpx2) 클라이언트 (풀은 이벤트 루프별로 유지)."""
+    with _lock:
+        client = _async_http_clients.get(module.__name__)
+        if client is None:
+            client = _async_http_clients[module.__name__] = module.AsyncClient(
+                transport=_loop_local_transport(module, _config),
+                timeout=_config.timeout(module),
+                event_hooks={"request": [_atraced_request], "response": [_arecord_response]},
+            )
+        return client
+
+
+def _cached(kind, factory, **kwargs):
+    key = (kind, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    with _lock:
+        client = _sdk_clients.get(key)
+    if client is None:
+        client = factory(**kwargs)
+        with _lock:
+            client = _sdk_clients.setdefault(key, client)
+    return client
+
+
+def get_openai_client(**kwargs):
+    """공유 풀을 쓰는 OpenAI 클라이언트. kwargs는 OpenAI()에 그대로 전달된다."""
+    from openai import OpenAI
+    return _cached("openai", lambda **kw: OpenAI(http_client=get_http_client(_httpx_module_for("openai")), **kw), **kwargs)
+
+
+def get_async_openai_client(**kwargs):
+    """공유 풀을 쓰는 AsyncOpenAI 클라이언트."""
+    from openai import AsyncOpenAI
+    return _cached("async_openai", lambda **kw: AsyncOpenAI(http_client=get_async_http_client(_httpx_module_for("openai")), **kw), **kwargs)
+
+
+def get_anthropic_client(**kwargs):
+    """공유 풀을 쓰는 Anthropic 클라이언트."""
+    from anthropic import Anthropic
+    return _cached("anthropic", lambda **kw: Anthropic(http_client=get_http_client(_httpx_module_for("anthropic")), **kw), **kwargs)
+
+
+def get_async_anthropic_client(**kwargs):
+    """공유 풀을 쓰는 AsyncAnthropic 클라이언트."""
+    from anthropic import AsyncAnthropic
+    return _cached("async_anthropic", lambda **kw: AsyncAnthropic(http_client=get_async_http_client(_httpx_module_for("anthropic")), **kw), **kwargs)
+
+
+def get_chat_openai(model: str = "gpt-5-mini", **kwargs):
+    """공유 풀을 쓰는 랭체인 ChatOpenAI. 같은 설정이면 같은 인스턴스를 돌려준다."""
+    from langchain_openai import ChatOpenAI
+    module = _httpx_module_for("openai")
+    return _cached(
+        "chat_openai",
+        lambda **kw: ChatOpenAI(
+            http_client=get_http_client(module), http_async_client=get_async_http_client(module), **kw
+        ),
+        model=model,
+        **kwargs,
+    )
+
+
+def pool_stats() -> dict:
+    """커넥션 풀 hit/miss와 연결 수립 시간 통계."""
+    snapshot = _stats.snapshot()
+    snapshot["http2"] = _config.use_http2
+    return snapshot
+
+
+def reset_pool_stats():
+    _stats.reset()
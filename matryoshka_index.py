@@ -0,0 +1,236 @@
+"""차원을 줄인(Matryoshka) 임베딩으로 1차 검색하고, 후보만 전체 차원으로 다시 점수 매기는 색인.
+
+text-embedding-3-large는 3072차원이라 FAISS 색인과 메모리가 768차원일 때의 4배다.
+text-embedding-3 모델은 앞쪽 차원에 정보가 몰리도록 학습되어(Matryoshka 표현) 벡터의 앞 256/512차원만
+잘라 다시 정규화해도 검색 품질이 크게 떨어지지 않는다.
+
+1. 메모리에는 앞 prefix_dims 차원만 잘라 정규화한 행렬을 둔다 (similarity_engine.SimilarityEngine)
+2. 전체 차원 벡터는 디스크의 float32 파일(full.f32)에만 저장하고 np.memmap으로 연다
+3. 검색 : 짧은 벡터로 후보 candidates개를 고른 뒤, 그 행들만 디스크에서 읽어 전체 차원으로 다시 점수 매김
+   -> 메모리 사용량은 prefix_dims / 전체 차원 비율로 줄고, 디스크에서는 후보 몇 줄만 읽는다
+
+사용 예:
+    index = MatryoshkaIndex(".cache/matryoshka/docs", prefix_dims=256)
+    index.add_documents(split_docs, embeddings)
+    for doc, score in index.similarity_search_with_score("초보자가 배우기 좋은 언어는?", embeddings, k=2):
+        ...
+
+python matryoshka_index.py 로 documents/ 코퍼스에서 recall / 메모리 / 지연 시간 비교 (MOCK_LLM_SERVER를 주면 오프라인 실행)
+"""
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from similarity_engine import SimilarityEngine, normalize
+
+DEFAULT_INDEX_DIR = Path(__file__).parent / ".cache" / "matryoshka"
+
+
+class MatryoshkaIndex:
+    """앞 prefix_dims 차원으로 1차 검색 + 디스크의 전체 벡터로 재점수."""
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR, prefix_dims: int = 256, candidates: int = 50):
+        """
+        directory   : 전체 차원 벡터(full.f32)와 문서(documents.jsonl)를 저장할 폴더. 기존 내용이 있으면 이어서 사용
+        prefix_dims : 메모리에 둘 앞쪽 차원 수
+        candidates  : 전체 차원으로 다시 점수 매길 1차 후보 수 (클수록 recall은 오르고 느려짐)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix_dims = prefix_dims
+        self.candidates = candidates
+        self.dims = None
+        self.engine = SimilarityEngine()
+        self.documents = []
+        self._full = None
+        self._load()
+
+    @property
+    def _vector_path(self) -> Path:
+        return self.directory / "full.f32"
+
+    @property
+    def _documents_path(self) -> Path:
+        return self.directory / "documents.jsonl"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    def _load(self):
+        if not self._meta_path.exists():
+            return
+        self.dims = json.loads(self._meta_path.read_text(encoding="utf-8"))["dims"]
+        full = self._full_vectors()
+        # 짧은 벡터는 디스크에서 앞 prefix_dims 열만 읽어 한 번에 다시 만든다 (나눠 넣으면 나중에 다시 합치는 복사가 생김)
+        if len(full):
+            self.engine.add(full[:, :self.prefix_dims])
+        if self._documents_path.exists():
+            with open(self._documents_path, encoding="utf-8") as f:
+                self.documents = [Document(**json.loads(line)) for line in f]
+
+    def _full_vectors(self) -> np.ndarray:
+        rows = self._vector_path.stat().st_size // (4 * self.dims) if self._vector_path.exists() else 0
+        if self._full is None or len(self._full) != rows:
+            self._full = (np.memmap(self._vector_path, dtype=np.float32, mode="r", shape=(rows, self.dims))
+                          if rows else np.empty((0, self.dims), dtype=np.float32))
+        return self._full
+
+    def __len__(self) -> int:
+        return len(self.engine)
+
+    # ------------------------------------------------------------ 추가
+    def add_vectors(self, vectors, documents=None) -> range:
+        """전체 차원 벡터를 디스크에 저장하고 앞 prefix_dims 차원만 메모리 색인에 넣는다.
+
+        documents는 벡터와 같은 수여야 한다. 문서 없이 벡터만 넣는 색인(검색은 search()로)과 섞어 쓸 수는 없다
+        -> self.documents[i]가 항상 i번째 행의 문서
+        """
+        matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+        if documents is not None:
+            documents = list(documents)
+            if len(documents) != len(matrix):
+                raise ValueError(f"벡터 {len(matrix)}개에 문서 {len(documents)}개가 주어졌습니다.")
+        if len(self) and (documents is not None) != bool(self.documents):
+            raise ValueError("문서가 있는 색인과 벡터만 있는 색인을 섞으면 행 번호와 문서가 어긋납니다.")
+        if self.dims is None:
+            if matrix.shape[1] < self.prefix_dims:
+                raise ValueError(f"벡터 차원({matrix.shape[1]})이 prefix_dims({self.prefix_dims})보다 작습니다.")
+            self.dims = matrix.shape[1]
+            self._meta_path.write_text(json.dumps({"dims": self.dims}), encoding="utf-8")
+        elif matrix.shape[1] != self.dims:
+            raise ValueError(f"벡터 차원이 {self.dims}이어야 하는데 {matrix.shape[1]}입니다.")
+        with open(self._vector_path, "ab") as f:
+            f.write(matrix.tobytes())
+        if documents is not None:
+            with open(self._documents_path, "a", encoding="utf-8") as f:
+                for doc in documents:
+                    f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata},
+                                       ensure_ascii=False) + "\n")
+            self.documents.extend(documents)
+        return self.engine.add(matrix[:, :self.prefix_dims])
+
+    def add_documents(self, documents, embeddings) -> range:
+        documents = list(documents)
+        vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+        return self.add_vectors(vectors, documents)
+
+    # ------------------------------------------------------------ 검색
+    def search(self, queries, k: int = 4, candidates: Optional[int] = None, rescore: bool = True):
+        """질의(전체 차원 벡터)마다 (유사도, 행 번호) top-k. SimilarityEngine.search와 같은 모양으로 돌려준다.
+
+        rescore=False면 짧은 벡터의 점수만으로 top-k (비교용)
+        """
+        if len(self) == 0:
+            # 아직 아무것도 넣지 않은 색인 (dims도 모름) -> SimilarityEngine처럼 빈 결과
+            return self.engine.search(queries, k=k)
+        single = np.ndim(queries) == 1
+        query_matrix = normalize(queries)
+        if not rescore:
+            scores, indices = self.engine.search(query_matrix[:, :self.prefix_dims], k=k)
+            return (scores[0], indices[0]) if single else (scores, indices)
+        candidates = max(k, candidates or self.candidates)
+        _, candidate_indices = self.engine.search(query_matrix[:, :self.prefix_dims], k=candidates)
+        k = min(k, candidate_indices.shape[1])
+        full = self._full_vectors()
+        # 모든 질의의 후보 행을 한 번에 (오름차순으로) 읽어 디스크 접근을 순차적으로
+        rows, inverse = np.unique(candidate_indices, return_inverse=True)
+        candidate_vectors = normalize(full[rows])
+        scores = np.empty((len(query_matrix), k), dtype=np.float32)
+        indices = np.empty((len(query_matrix), k), dtype=np.int64)
+        inverse = inverse.reshape(candidate_indices.shape)
+        for i, query in enumerate(query_matrix):
+            full_scores = candidate_vectors[inverse[i]] @ query
+            order = np.argsort(-full_scores, kind="stable")[:k]
+            scores[i] = full_scores[order]
+            indices[i] = candidate_indices[i][order]
+        return (scores[0], indices[0]) if single else (scores, indices)
+
+    def similarity_search_with_score(self, query: str, embeddings, k: int = 4) -> list:
+        if len(self) and not self.documents:
+            raise ValueError("문서 없이 벡터만 넣은 색인입니다. search()로 행 번호를 받으세요.")
+        scores, indices = self.search(embeddings.embed_query(query), k=k)
+        return [(self.documents[i], float(score)) for score, i in zip(scores, indices)]
+
+    def similarity_search(self, query: str, embeddings, k: int = 4) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, embeddings, k)]
+
+    def memory_bytes(self) -> int:
+        """메모리에 올라와 있는 짧은 벡터 행렬의 크기."""
+        return self.engine.matrix.nbytes
+
+
+def _recall(expected: np.ndarray, found: np.ndarray) -> float:
+    return float(np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected.tolist(), found.tolist())]))
+
+
+def benchmark(prefix_dims=(256, 512, 768, 1536), k: int = 5, candidates: int = 50, scale: int = 200,
+              model: str = "text-embedding-3-large", seed: int = 0):
+    """documents/ 코퍼스에서 전체 차원 정확 검색 대비 recall@k / 메모리 / 질의 지연 비교.
+
+    scale : 문서가 적어 지연/메모리 차이가 안 보이므로 무작위 벡터를 채워 넣어 코퍼스를 이 배수로 늘린다
+            (무작위 벡터는 질의와 거의 무관하므로 recall은 실제 청크들 사이의 순위가 유지되는지를 본다)
+    """
+    import tempfile
+
+    from langchain.text_splitter import CharacterTextSplitter
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_cache import CachedEmbeddings
+    from llm_clients import apply_mock_server_env
+
+    apply_mock_server_env()
+    loader = DirectoryLoader(str(Path(__file__).parent / "documents"), glob="**/*.txt", loader_cls=TextLoader,
+                             loader_kwargs={"encoding": "utf-8"})
+    split_docs = CharacterTextSplitter(chunk_size=200, chunk_overlap=20).split_documents(loader.load())
+    # 오프라인(모의 서버)에서는 tiktoken 파일을 받을 수 없으므로 토큰 길이 검사를 끈다
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model=model, check_embedding_ctx_length=False))
+    base = np.asarray(embeddings.embed_vectors([doc.page_content for doc in split_docs]))
+    questions = ["초보자가 배우기 좋은 프로그래밍 언어는?", "인공지능과 머신러닝의 차이", "자바스크립트는 어떻게 발전했나?",
+                 "딥러닝에서 신경망의 역할", "웹 브라우저에서 실행되는 언어"]
+    # 청크 자신의 텍스트를 질의로 쓰면 자기 자신이 항상 1등이라 recall이 부풀려지므로 따로 만든 질문만 사용
+    queries = np.asarray(embeddings.embed_vectors(questions))
+
+    rng = np.random.default_rng(seed)
+    filler = rng.standard_normal((len(base) * (scale - 1), base.shape[1]), dtype=np.float32)
+    corpus = np.concatenate([base, filler])
+    del filler
+    print(f"청크 {len(split_docs)}개 + 무작위 벡터 = {len(corpus):,}개, {base.shape[1]}차원, 질의 {len(queries)}개, "
+          f"k={k}, 후보 {candidates}개")
+
+    exact = SimilarityEngine(corpus)
+    started = time.perf_counter()
+    _, expected = exact.search(queries, k=k)
+    exact_time = (time.perf_counter() - started) / len(queries)
+    print(f"{'방식':>18} | {'메모리':>9} | {'recall@' + str(k):>9} | {'질의당':>9}")
+    print(f"{'전체 ' + str(base.shape[1]) + '차원':>18} | {exact.matrix.nbytes / 2 ** 20:>6.1f} MB | {1.0:>9.3f} | "
+          f"{exact_time * 1000:>6.2f} ms")
+    del exact
+
+    for dims in prefix_dims:
+        if dims >= base.shape[1]:
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            index = MatryoshkaIndex(directory, prefix_dims=dims, candidates=candidates)
+            index.add_vectors(corpus)
+            index.engine.matrix  # 정규화/합치기는 색인 단계 비용이므로 측정에서 제외
+            for rescore in (False, True):
+                started = time.perf_counter()
+                _, found = index.search(queries, k=k, rescore=rescore)
+                elapsed = (time.perf_counter() - started) / len(queries)
+                label = f"{dims}차원" + (" + 재점수" if rescore else "")
+                print(f"{label:>18} | {index.memory_bytes() / 2 ** 20:>6.1f} MB | {_recall(expected, found):>9.3f} | "
+                      f"{elapsed * 1000:>6.2f} ms")
+            del index
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    benchmark()
@@ -0,0 +1,502 @@
+"""오프라인 부하/지연 테스트용 로컬 모의(mock) 서버.
+
+OpenAI/Anthropic/Nominatim/open-meteo/DuckDuckGo 대신 응답하는 로컬 서버로,
+CI나 인터넷이 막힌 환경에서도 예제들을 실행하고 벤치마크할 수 있게 해준다.
+
+구현한 API
+- OpenAI: POST /v1/chat/completions (stream 포함, tools/response_format 지원)
+          POST /v1/responses (stream, previous_response_id 포함)
+          POST /v1/embeddings (float / base64)
+- Anthropic: POST /v1/messages (stream 포함)
+- Nominatim: GET /search, open-meteo: GET /v1/forecast, DuckDuckGo 대체: GET /duckduckgo/search
+
+지연 시간 분포, 첫 토큰까지의 시간(TTFT), 초당 토큰 수, 오류/429 주입 비율을 옵션으로 조절한다.
+프롬프트 앞부분이 이전 요청과 같으면 provider의 prompt caching처럼 cached_tokens를 돌려주고 TTFT를 줄인다.
+
+실행 예:
+    python mock_llm_server.py --port 8080 --latency lognormal:0.2,0.5 --ttft 0.3 --tokens-per-second 80 \\
+        --error-rate 0.01 --rate-limit-rate 0.02
+
+예제 스크립트는 환경 변수 하나로 이 서버를 바라보게 할 수 있다.
+    export MOCK_LLM_SERVER=http://127.0.0.1:8080
+(llm_clients를 쓰지 않는 스크립트는 OPENAI_BASE_URL=http://127.0.0.1:8080/v1 로도 가능)
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIMENSIONS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536, "text-embedding-ada-002": 1536}
+
+
+@dataclass
+class LatencyModel:
+    """'fixed:0.2', 'uniform:0.1,0.5', 'lognormal:mu_seconds,sigma' 형식의 지연 시간 분포."""
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, values = spec.partition(":")
+        params = tuple(float(v) for v in values.split(",")) if values else (0.0,)
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"지원하지 않는 지연 시간 분포: {spec}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0.0, sigma)
+        return self.params[0]
+
+
+@dataclass
+class MockConfig:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    ttft: float = 0.0
+    tokens_per_second: float = 0.0  # 0이면 토큰 사이 지연 없음
+    output_tokens: int = 40
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int = None
+    cache_min_tokens: int = 1024  # 이보다 짧은 프롬프트는 캐시하지 않음 (OpenAI 기준)
+    cache_block_tokens: int = 128  # 캐시는 이 단위로 늘어난다
+    cache_ttft_speedup: float = 0.5  # 입력 전체가 캐시 hit일 때 줄어드는 TTFT 비율
+    max_stored_responses: int = 10_000  # previous_response_id로 이어 갈 수 있는 최근 응답 수
+
+
+class PrefixCache:
+    """프롬프트 앞부분을 블록 단위 해시로 기억해 두고, 이전 요청과 같은 앞부분의 토큰 수를 돌려준다."""
+
+    def __init__(self, min_tokens: int, block_tokens: int, max_entries: int = 100_000):
+        self.min_tokens = min_tokens
+        # 모의 서버의 토큰 수 계산(_count_tokens)과 같게 2글자를 1토큰으로 본다
+        self.block_chars = block_tokens * 2
+        self.max_entries = max_entries
+        self._blocks = {}
+
+    def lookup(self, text: str) -> int:
+        if len(text) < self.min_tokens * 2:
+            return 0
+        digest = hashlib.sha256()
+        cached_blocks, hit = 0, True
+        for start in range(0, len(text) - self.block_chars + 1, self.block_chars):
+            digest.update(text[start:start + self.block_chars].encode("utf-8"))
+            key = digest.copy().digest()
+            if hit and key in self._blocks:
+                cached_blocks += 1
+            else:
+                hit = False
+                self._blocks[key] = None
+        while len(self._blocks) > self.max_entries:
+            self._blocks.pop(next(iter(self._blocks)))
+        cached_chars = cached_blocks * self.block_chars
+        return cached_chars // 2 if cached_chars >= self.min_tokens * 2 else 0
+
+
+# ----------------------------------------------------------------------------- 응답 생성 도우미
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 2) if text else 0
+
+
+def _message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _reply_tokens(prompt: str, n: int) -> list:
+    """프롬프트에 따라 결정적으로 정해지는 모의 응답 토큰 목록."""
+    head = prompt.strip().replace("\n", " ")[:30] or "질문"
+    words = [f"'{head}'에", "대한", "모의", "응답입니다."]
+    filler = ["로컬", "모의", "서버가", "생성한", "토큰", "스트림", "입니다."]
+    tokens = [w + " " for w in words]
+    while len(tokens) < n:
+        tokens.append(filler[len(tokens) % len(filler)] + " ")
+    return tokens[:n]
+
+
+def _fake_from_schema(schema: dict, defs: dict = None):
+    """JSON schema에 맞는 최소한의 모의 값 (structured output 요청용)."""
+    defs = defs or schema.get("$defs", {})
+    if "$ref" in schema:
+        return _fake_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "anyOf" in schema:
+        return _fake_from_schema(schema["anyOf"][0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _fake_from_schema(sub, defs) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_fake_from_schema(schema.get("items", {}), defs)]
+    if kind == "number":
+        return 7.5
+    if kind == "integer":
+        return 7
+    if kind == "boolean":
+        return True
+    if "enum" in schema:
+        return schema["enum"][0]
+    return "모의 값"
+
+
+def _embedding(text, dims: int) -> np.ndarray:
+    """문자 3-gram feature hashing으로 만든 결정적 임베딩 (비슷한 문장은 비슷한 벡터)."""
+    if not isinstance(text, str):
+        text = " ".join(map(str, text))  # 토큰 id 배열로 들어온 경우
+    vector = np.zeros(dims, dtype=np.float32)
+    padded = f"  {text}  "
+    for i in range(len(padded) - 2):
+        digest = hashlib.md5(padded[i:i + 3].encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dims
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# ----------------------------------------------------------------------------- 서버
+def create_app(config: MockConfig = None) -> FastAPI:
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Mock LLM Server")
+    app.state.config = config
+    app.state.responses = OrderedDict()  # response id -> 누적 입력 토큰 수 (previous_response_id 체인용)
+    app.state.counters = {"requests": 0, "errors_injected": 0, "rate_limited": 0, "cached_tokens": 0}
+    prefix_cache = PrefixCache(config.cache_min_tokens, config.cache_block_tokens)
+
+    def cache_lookup(prompt_text: str, input_tokens: int):
+        """(cached_tokens, 이번 요청의 TTFT)"""
+        cached = min(prefix_cache.lookup(prompt_text), input_tokens)
+        app.state.counters["cached_tokens"] += cached
+        ratio = cached / input_tokens if input_tokens else 0.0
+        return cached, config.ttft * (1 - config.cache_ttft_speedup * ratio)
+
+    async def inject_faults(provider: str):
+        """지연 시간을 흉내내고, 설정된 확률로 429/500 오류를 돌려준다."""
+        app.state.counters["requests"] += 1
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            app.state.counters["rate_limited"] += 1
+            error = {"type": "rate_limit_error", "message": "Rate limit reached (mock)"}
+            body = {"type": "error", "error": error} if provider == "anthropic" else {"error": {**error, "code": "rate_limit_exceeded"}}
+            return JSONResponse(body, status_code=429, headers={"retry-after": str(config.retry_after)})
+        if roll < config.rate_limit_rate + config.error_rate:
+            app.state.counters["errors_injected"] += 1
+            error = {"type": "server_error", "message": "Injected failure (mock)"}
+            body = {"type": "error", "error": error} if provider == "anthropic" else {"error": error}
+            return JSONResponse(body, status_code=500)
+        await asyncio.sleep(config.latency.sample(rng))
+        return None
+
+    async def token_stream(tokens, ttft):
+        """TTFT와 초당 토큰 수를 흉내내며 토큰을 하나씩 내보낸다."""
+        await asyncio.sleep(ttft)
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second else 0.0
+        for i, token in enumerate(tokens):
+            if i and interval:
+                await asyncio.sleep(interval)
+            yield token
+
+    async def full_generation_delay(n_tokens, ttft):
+        await asyncio.sleep(ttft + (n_tokens / config.tokens_per_second if config.tokens_per_second else 0.0))
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **app.state.counters}
+
+    # ------------------------------------------------------------------ OpenAI chat.completions
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if (fault := await inject_faults("openai")) is not None:
+            return fault
+        model = body.get("model", "mock")
+        messages = body.get("messages", [])
+        prompt = _message_text(messages[-1].get("content")) if messages else ""
+        input_tokens = sum(_count_tokens(_message_text(m.get("content"))) for m in messages)
+        cached_tokens, ttft = cache_lookup(
+            json.dumps([body.get("tools") or [], messages], ensure_ascii=False), input_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        message = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        tools = body.get("tools") or []
+        already_called = any(m.get("role") == "tool" for m in messages)
+        response_format = body.get("response_format") or {}
+        if tools and body.get("tool_choice") != "none" and not already_called:
+            function = tools[0]["function"]
+            arguments = _fake_from_schema(function.get("parameters") or {"type": "object"})
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(arguments, ensure_ascii=False)},
+            }]
+            finish_reason = "tool_calls"
+            tokens = []
+        elif response_format.get("type") == "json_schema":
+            text = json.dumps(_fake_from_schema(response_format["json_schema"]["schema"]), ensure_ascii=False)
+            tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        else:
+            tokens = _reply_tokens(prompt, body.get("max_completion_tokens") or body.get("max_tokens") or config.output_tokens)
+        usage = {"prompt_tokens": input_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": input_tokens + len(tokens),
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+
+        if not body.get("stream"):
+            await full_generation_delay(len(tokens), ttft)
+            message["content"] = "".join(tokens) if tokens else None
+            return {"id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}], "usage": usage}
+
+        async def events():
+            base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+            yield _sse({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+            if message.get("tool_calls"):
+                call = dict(message["tool_calls"][0], index=0)
+                yield _sse({**base, "choices": [{"index": 0, "delta": {"tool_calls": [call]}, "finish_reason": None}]})
+            async for token in token_stream(tokens, ttft):
+                yield _sse({**base, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            yield _sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield _sse({**base, "choices": [], "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ------------------------------------------------------------------ OpenAI responses
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        previous_id = body.get("previous_response_id")
+        if previous_id and previous_id not in app.state.responses:
+            return JSONResponse({"error": {"type": "invalid_request_error", "code": "previous_response_not_found",
+                                           "message": f"Previous response with id '{previous_id}' not found."}},
+                                status_code=400)
+        if (fault := await inject_faults("openai")) is not None:
+            return fault
+        model = body.get("model", "mock")
+        user_input = body.get("input", "")
+        prompt = user_input if isinstance(user_input, str) else _message_text(
+            (user_input[-1] if user_input else {}).get("content"))
+        history_tokens = app.state.responses.get(previous_id, 0)
+        input_tokens = history_tokens + _count_tokens(body.get("instructions") or "") + _count_tokens(
+            user_input if isinstance(user_input, str) else json.dumps(user_input, ensure_ascii=False))
+        # previous_response_id로 이어진 이전 이력은 캐시 계산에서 제외 (instructions + input만 비교)
+        cached_tokens, ttft = cache_lookup(
+            (body.get("instructions") or "") + json.dumps(user_input, ensure_ascii=False), input_tokens)
+        tokens = _reply_tokens(prompt, body.get("max_output_tokens") or config.output_tokens)
+        response_id = f"resp_{uuid.uuid4().hex}"
+        message_id = f"msg_{uuid.uuid4().hex}"
+        text = "".join(tokens)
+        app.state.responses[response_id] = input_tokens + len(tokens)
+        # 오래된 응답부터 잊는다 (실제 API처럼 이어 가려면 400 previous_response_not_found)
+        while len(app.state.responses) > config.max_stored_responses:
+            app.state.responses.popitem(last=False)
+
+        def response_object(status, output_text):
+            output = []
+            if status == "completed":
+                output = [{"type": "message", "id": message_id, "status": "completed", "role": "assistant",
+                           "content": [{"type": "output_text", "text": output_text, "annotations": []}]}]
+            return {
+                "id": response_id, "object": "response", "created_at": int(time.time()), "model": model,
+                "status": status, "output": output, "previous_response_id": previous_id,
+                "instructions": body.get("instructions"), "parallel_tool_calls": True, "tool_choice": "auto",
+                "tools": [], "usage": {
+                    "input_tokens": input_tokens, "output_tokens": len(tokens),
+                    "total_tokens": input_tokens + len(tokens),
+                    "input_tokens_details": {"cached_tokens": cached_tokens},
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                } if status == "completed" else None,
+            }
+
+        if not body.get("stream"):
+            await full_generation_delay(len(tokens), ttft)
+            return response_object("completed", text)
+
+        async def events():
+            seq = iter(range(1_000_000))
+            item = {"type": "message", "id": message_id, "status": "in_progress", "role": "assistant", "content": []}
+            part = {"type": "output_text", "text": "", "annotations": []}
+            yield _sse({"type": "response.created", "sequence_number": next(seq), "response": response_object("in_progress", "")}, "response.created")
+            yield _sse({"type": "response.output_item.added", "sequence_number": next(seq), "output_index": 0, "item": item}, "response.output_item.added")
+            yield _sse({"type": "response.content_part.added", "sequence_number": next(seq), "item_id": message_id,
+                        "output_index": 0, "content_index": 0, "part": part}, "response.content_part.added")
+            async for token in token_stream(tokens, ttft):
+                yield _sse({"type": "response.output_text.delta", "sequence_number": next(seq), "item_id": message_id,
+                            "output_index": 0, "content_index": 0, "delta": token, "logprobs": []}, "response.output_text.delta")
+            yield _sse({"type": "response.output_text.done", "sequence_number": next(seq), "item_id": message_id,
+                        "output_index": 0, "content_index": 0, "text": text, "logprobs": []}, "response.output_text.done")
+            yield _sse({"type": "response.content_part.done", "sequence_number": next(seq), "item_id": message_id,
+                        "output_index": 0, "content_index": 0, "part": {**part, "text": text}}, "response.content_part.done")
+            done_item = {**item, "status": "completed", "content": [{**part, "text": text}]}
+            yield _sse({"type": "response.output_item.done", "sequence_number": next(seq), "output_index": 0, "item": done_item}, "response.output_item.done")
+            yield _sse({"type": "response.completed", "sequence_number": next(seq), "response": response_object("completed", text)}, "response.completed")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ------------------------------------------------------------------ OpenAI embeddings
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if (fault := await inject_faults("openai")) is not None:
+            return fault
+        model = body.get("model", "text-embedding-3-small")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dims = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(model, 1536)
+        data = []
+        for index, text in enumerate(inputs):
+            vector = _embedding(text, dims)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(_count_tokens(t) if isinstance(t, str) else len(t) for t in inputs)
+        return {"object": "list", "data": data, "model": model, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    # ------------------------------------------------------------------ Anthropic messages
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        if (fault := await inject_faults("anthropic")) is not None:
+            return fault
+        model = body.get("model", "mock")
+        history = body.get("messages", [])
+        prompt = _message_text(history[-1].get("content")) if history else ""
+        input_tokens = _count_tokens(_message_text(body.get("system") or "")) + sum(
+            _count_tokens(_message_text(m.get("content"))) for m in history)
+        tokens = _reply_tokens(prompt, min(body.get("max_tokens", config.output_tokens), config.output_tokens))
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        prompt_text = json.dumps([body.get("system") or "", history], ensure_ascii=False)
+        cached_tokens, ttft = 0, config.ttft
+        # Anthropic은 cache_control로 표시한 경우에만 캐시한다
+        if '"cache_control"' in prompt_text:
+            cached_tokens, ttft = cache_lookup(prompt_text, input_tokens)
+        usage = {"input_tokens": input_tokens - cached_tokens, "output_tokens": len(tokens),
+                 "cache_read_input_tokens": cached_tokens, "cache_creation_input_tokens": 0}
+
+        if not body.get("stream"):
+            await full_generation_delay(len(tokens), ttft)
+            return {"id": message_id, "type": "message", "role": "assistant", "model": model,
+                    "content": [{"type": "text", "text": "".join(tokens)}],
+                    "stop_reason": "end_turn", "stop_sequence": None, "usage": usage}
+
+        async def events():
+            start = {"id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+                     "stop_reason": None, "stop_sequence": None, "usage": {**usage, "output_tokens": 0}}
+            yield _sse({"type": "message_start", "message": start}, "message_start")
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start")
+            async for token in token_stream(tokens, ttft):
+                yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}, "content_block_delta")
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": len(tokens)}}, "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ------------------------------------------------------------------ 외부 API 대체
+    @app.get("/search")
+    async def nominatim_search(q: str = "", format: str = "json"):
+        if (fault := await inject_faults("nominatim")) is not None:
+            return fault
+        digest = hashlib.md5(q.encode("utf-8")).digest()
+        lat = 33.0 + digest[0] / 255 * 5.0
+        lon = 126.0 + digest[1] / 255 * 3.5
+        return [{"place_id": int.from_bytes(digest[:4], "little"), "lat": f"{lat:.4f}", "lon": f"{lon:.4f}",
+                 "display_name": f"{q} (mock)", "class": "place", "type": "city", "importance": 0.5}]
+
+    @app.get("/v1/forecast")
+    async def open_meteo_forecast(latitude: float = 37.5, longitude: float = 127.0):
+        if (fault := await inject_faults("open-meteo")) is not None:
+            return fault
+        return {"latitude": latitude, "longitude": longitude, "timezone": "GMT",
+                "current_weather": {"time": time.strftime("%Y-%m-%dT%H:00"), "interval": 900,
+                                    "temperature": round(15 + (latitude + longitude) % 10, 1),
+                                    "windspeed": 7.2, "winddirection": 180, "is_day": 1, "weathercode": 1}}
+
+    @app.get("/duckduckgo/search")
+    async def duckduckgo_search(q: str = "", max_results: int = 4):
+        if (fault := await inject_faults("duckduckgo")) is not None:
+            return fault
+        return [{"title": f"{q} 관련 문서 {i + 1}", "link": f"https://example.com/{i + 1}",
+                 "snippet": f"'{q}'에 대한 모의 검색 결과 {i + 1}입니다."} for i in range(max_results)]
+
+    return app
+
+
+class BackgroundServer:
+    """벤치마크 등에서 같은 프로세스 안에 모의 서버를 띄울 때 사용 (별도 스레드의 uvicorn)."""
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 8080):
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Anthropic 호환 로컬 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:초 | uniform:최소,최대 | lognormal:중앙값,sigma")
+    parser.add_argument("--ttft", type=float, default=0.0, help="첫 토큰까지의 시간(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="0이면 토큰 사이 지연 없음")
+    parser.add_argument("--output-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류 주입 비율")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 오류 주입 비율")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="prompt caching을 흉내낼 최소 프롬프트 토큰 수")
+    parser.add_argument("--cache-ttft-speedup", type=float, default=0.5, help="전체 캐시 hit 시 줄어드는 TTFT 비율")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=LatencyModel.parse(args.latency), ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, seed=args.seed,
+        cache_min_tokens=args.cache_min_tokens, cache_ttft_speedup=args.cache_ttft_speedup,
+    )
+    url = f"http://{args.host}:{args.port}"
+    print("모의 서버를 사용하려면 다음 환경 변수를 설정하세요:")
+    print(f"  export MOCK_LLM_SERVER={url}")
+    print("llm_clients를 쓰지 않는 스크립트(랭체인, 에이전트 SDK)는 SDK 표준 환경 변수도 함께 설정:")
+    print(f"  export OPENAI_BASE_URL={url}/v1 ANTHROPIC_BASE_URL={url} OPENAI_API_KEY=mock OPENAI_AGENTS_DISABLE_TRACING=1")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""provider 쪽 prompt caching이 잘 맞도록 프롬프트를 배치하는 도우미.
+
+OpenAI/Anthropic의 prompt caching은 "앞에서부터 바이트 단위로 똑같은 부분"만 재사용한다
+(OpenAI는 1024토큰 이상부터 128토큰 단위). 그래서
+
+1. 페르소나/지시문/출력 형식처럼 바뀌지 않는 내용은 항상 맨 앞에, 정규화된 같은 문자열로 보내고
+2. 사용자 정보, 메모리, 검색 결과처럼 매번 바뀌는 내용은 그 뒤에 둔다
+
+또한 응답의 usage에서 캐시된 입력 토큰 수를 읽어 캐시 hit 여부와 지연 시간/비용 차이를 집계한다.
+
+사용 예:
+    PERSONA = PromptLayout(LITTLE_PRINCE_PERSONA, name="little-prince")
+    result = client.responses.create(model=..., instructions=PERSONA.instructions,
+                                     prompt_cache_key=PERSONA.cache_key, input=user_message)
+    get_cache_usage().record(result, latency)
+    print(get_cache_usage().stats())
+"""
+import hashlib
+import textwrap
+import threading
+
+
+def normalize_prompt(text: str) -> str:
+    """들여쓰기/줄 끝 공백/앞뒤 빈 줄을 정리해 항상 같은 바이트열이 되도록 한다."""
+    lines = textwrap.dedent(text).strip("\n").splitlines()
+    # 첫 줄만 따옴표 바로 뒤에 붙어 있는 경우(들여쓰기 없음)도 나머지 줄 들여쓰기를 정리
+    if len(lines) > 1:
+        lines = [lines[0]] + textwrap.dedent("\n".join(lines[1:])).splitlines()
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class PromptLayout:
+    """고정된 앞부분(stable prefix) + 매번 바뀌는 뒷부분으로 프롬프트를 조립한다."""
+
+    def __init__(self, *stable_sections: str, name: str = "prompt"):
+        self.prefix = "\n\n".join(normalize_prompt(section) for section in stable_sections if section)
+        self.name = name
+        self.prefix_hash = hashlib.sha256(self.prefix.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def instructions(self) -> str:
+        """responses API의 instructions나 에이전트 instructions로 쓸 고정 문자열."""
+        return self.prefix
+
+    @property
+    def cache_key(self) -> str:
+        """OpenAI prompt_cache_key. 같은 앞부분을 쓰는 요청이 같은 캐시로 가도록 묶어준다."""
+        return f"{self.name}-{self.prefix_hash}"
+
+    def messages(self, user: str = None, dynamic: str = None) -> list:
+        """chat.completions / responses input 형식: [고정 system] + [동적 맥락] + [사용자]"""
+        items = [{"role": "system", "content": self.prefix}]
+        if dynamic:
+            items.append({"role": "system", "content": dynamic})
+        if user is not None:
+            items.append({"role": "user", "content": user})
+        return items
+
+    def langchain_messages(self, user: str = None, dynamic: str = None) -> list:
+        """랭체인 메시지 버전."""
+        from langchain_core.messages import HumanMessage, SystemMessage
+        messages = [SystemMessage(content=self.prefix)]
+        if dynamic:
+            messages.append(SystemMessage(content=dynamic))
+        if user is not None:
+            messages.append(HumanMessage(content=user))
+        return messages
+
+
+def cached_token_usage(response) -> tuple:
+    """응답(또는 usage)에서 (입력 토큰 수, 캐시된 입력 토큰 수)를 읽는다.
+
+    - OpenAI responses: usage.input_tokens_details.cached_tokens
+    - OpenAI chat.completions: usage.prompt_tokens_details.cached_tokens
+    - Anthropic: usage.cache_read_input_tokens (input_tokens에는 캐시분이 빠져 있음)
+    - 랭체인 AIMessage: usage_metadata["input_token_details"]["cache_read"]
+    - 에이전트 SDK Usage: input_tokens_details.cached_tokens
+    """
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata:
+        return metadata.get("input_tokens", 0), (metadata.get("input_token_details") or {}).get("cache_read", 0) or 0
+    usage = getattr(response, "usage", response)
+    if usage is None:
+        return 0, 0
+    if getattr(usage, "cache_read_input_tokens", None) is not None:
+        cached = usage.cache_read_input_tokens or 0
+        return usage.input_tokens + cached, cached
+    for total_field, details_field in (("input_tokens", "input_tokens_details"), ("prompt_tokens", "prompt_tokens_details")):
+        total = getattr(usage, total_field, None)
+        if total is not None:
+            details = getattr(usage, details_field, None)
+            return total, (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    return 0, 0
+
+
+class CacheUsage:
+    """캐시 hit/miss별 토큰 수와 지연 시간 집계."""
+
+    def __init__(self, cached_price_ratio: float = 0.1):
+        # 캐시된 입력 토큰 가격 / 일반 입력 토큰 가격 (OpenAI gpt-5 계열 0.1, Anthropic 캐시 읽기 0.1)
+        self.cached_price_ratio = cached_price_ratio
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.input_tokens = 0
+            self.cached_tokens = 0
+            self._latency = {"hit": [0, 0.0], "miss": [0, 0.0]}
+
+    def record(self, response, latency: float = None):
+        """응답 1건을 집계하고 이번 요청의 캐시된 토큰 수를 돌려준다. latency는 TTFT나 전체 지연(초)."""
+        input_tokens, cached = cached_token_usage(response)
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached
+            if latency is not None:
+                bucket = self._latency["hit" if cached else "miss"]
+                bucket[0] += 1
+                bucket[1] += latency
+        return cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            def mean_ms(kind):
+                count, total = self._latency[kind]
+                return round(total / count * 1000, 1) if count else None
+
+            return {
+                "requests": self.requests,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_ratio": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+                # 캐시 덕분에 덜 낸 입력 토큰 비용 (일반 입력 토큰 가격 대비 비율)
+                "input_cost_saved_ratio": round(
+                    self.cached_tokens * (1 - self.cached_price_ratio) / self.input_tokens, 3) if self.input_tokens else 0.0,
+                "hit_latency_ms": mean_ms("hit"),
+                "miss_latency_ms": mean_ms("miss"),
+            }
+
+
+_default = CacheUsage()
+
+
+def get_cache_usage() -> CacheUsage:
+    """프로세스 공용 캐시 사용량 집계."""
+    return _default
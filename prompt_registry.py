@@ -0,0 +1,250 @@
+"""YAML 프롬프트 파일을 한 번만 읽어 메모리에 두는 프롬프트 레지스트리.
+
+load_prompt()는 부를 때마다 파일을 다시 읽고 YAML을 다시 파싱하며, 윈도우에서는 기본 인코딩(cp949) 때문에
+한글 템플릿을 읽다가 실패한다. PromptRegistry는
+
+1. 폴더의 *.yaml 파일을 항상 UTF-8로 한 번만 읽어 CompiledPrompt(+ 랭체인 PromptTemplate)로 만들어 두고
+2. (이름, 버전) -> 프롬프트 dict로 O(1) 조회 (요청 처리 중에는 디스크를 건드리지 않음)
+3. 백그라운드 스레드가 파일의 수정 시각/크기를 주기적으로 확인해 바뀐 파일만 다시 읽는다 (재시작 불필요)
+   - 새 테이블을 만든 뒤 통째로 바꿔 끼우므로 조회 쪽은 lock 없이 항상 일관된 테이블을 본다
+   - 고친 파일에 문법 오류가 있으면 이전 버전을 그대로 유지한다
+
+YAML 형식 (load_prompt와 같은 형식 + 선택 항목 name/version):
+    _type: prompt
+    name: qa            # 없으면 파일 이름
+    version: 2          # 없으면 1
+    input_variables: ["context", "question"]
+    template: |
+      컨텍스트: {context}
+
+사용 예:
+    registry = PromptRegistry("prompts", watch=True)
+    prompt = registry.get("qa")             # 최신 버전
+    prompt = registry.get("qa", version=1)
+    prompt.format(context=..., question=...)
+    registry.langchain("qa")                # 랭체인 PromptTemplate이 필요할 때
+"""
+import threading
+from pathlib import Path
+
+import yaml
+
+from compiled_prompt import CompiledPrompt
+
+
+def _version_key(version: str):
+    """'10'이 '9'보다 뒤에 오도록 숫자 버전은 숫자로 비교."""
+    return (0, int(version), "") if version.isdigit() else (1, 0, version)
+
+
+class RegisteredPrompt:
+    """레지스트리에 올라간 프롬프트 1개."""
+
+    __slots__ = ("name", "version", "path", "compiled", "template", "template_format", "partial_variables", "_langchain")
+
+    def __init__(self, name: str, version: str, path: Path, spec: dict):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.template = spec["template"]
+        self.template_format = spec.get("template_format", "f-string")
+        self.partial_variables = dict(spec.get("partial_variables") or {})
+        self.compiled = CompiledPrompt(self.template, self.partial_variables)
+        declared = spec.get("input_variables")
+        if declared is not None and set(declared) != set(self.compiled.input_variables):
+            raise ValueError(f"input_variables {declared}가 템플릿 변수 {self.compiled.input_variables}와 다릅니다.")
+        self._langchain = None
+
+    def format(self, **kwargs) -> str:
+        return self.compiled.format(**kwargs)
+
+    def format_many(self, rows, **common) -> list:
+        return self.compiled.format_many(rows, **common)
+
+    def langchain(self):
+        """랭체인 PromptTemplate (처음 요청할 때 한 번만 만든다)."""
+        if self._langchain is None:
+            from langchain_core.prompts import PromptTemplate
+            self._langchain = PromptTemplate.from_template(self.template).partial(**self.partial_variables)
+        return self._langchain
+
+    def __repr__(self):
+        return f"RegisteredPrompt(name={self.name!r}, version={self.version!r}, path={str(self.path)!r})"
+
+
+def load_prompt_file(path) -> RegisteredPrompt:
+    """YAML 프롬프트 파일 1개를 UTF-8로 읽는다."""
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        spec = yaml.safe_load(f)
+    if not isinstance(spec, dict) or "template" not in spec:
+        raise ValueError(f"template 항목이 없는 프롬프트 파일입니다: {path}")
+    if spec.get("_type", "prompt") != "prompt":
+        raise ValueError(f"지원하지 않는 _type입니다: {spec.get('_type')} ({path})")
+    if spec.get("template_format", "f-string") != "f-string":
+        raise ValueError(f"f-string 형식의 템플릿만 지원합니다: {path}")
+    return RegisteredPrompt(str(spec.get("name") or path.stem), str(spec.get("version", 1)), path, spec)
+
+
+class PromptRegistry:
+    def __init__(self, directory, pattern: str = "*.yaml", watch: bool = False, poll_interval: float = 1.0,
+                 on_reload=None):
+        """
+        directory     : 프롬프트 YAML 파일이 있는 폴더
+        watch         : True면 백그라운드 스레드로 파일 변경을 감시해 자동으로 다시 읽음
+        poll_interval : 파일 변경 확인 주기(초)
+        on_reload     : (이름, 버전) -> None. 프롬프트가 새로 읽힐 때마다 호출
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self._files = {}     # 경로 -> (mtime_ns, size, RegisteredPrompt 또는 None)
+        self._prompts = {}   # (이름, 버전) -> RegisteredPrompt
+        self._latest = {}    # 이름 -> 최신 버전 RegisteredPrompt
+        self._lock = threading.Lock()  # 새로 읽기(refresh)끼리만 직렬화. 조회는 lock 없음
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {"loads": 0, "reloads": 0, "removed": 0, "errors": 0}
+        self.refresh()
+        if watch:
+            self.start()
+
+    # ------------------------------------------------------------ 조회
+    def get(self, name: str, version=None) -> RegisteredPrompt:
+        """이름(과 버전)으로 프롬프트를 찾는다. 버전을 생략하면 최신 버전."""
+        try:
+            if version is None:
+                return self._latest[name]
+            return self._prompts[(name, str(version))]
+        except KeyError:
+            raise KeyError(f"등록되지 않은 프롬프트입니다: {name}" + (f" (버전 {version})" if version is not None else "")) from None
+
+    def langchain(self, name: str, version=None):
+        return self.get(name, version).langchain()
+
+    def format(self, name: str, version=None, **kwargs) -> str:
+        return self.get(name, version).format(**kwargs)
+
+    def versions(self, name: str) -> list:
+        return sorted((version for prompt_name, version in self._prompts if prompt_name == name), key=_version_key)
+
+    def names(self) -> list:
+        return sorted(self._latest)
+
+    def __contains__(self, name):
+        return name in self._latest
+
+    def __len__(self):
+        return len(self._prompts)
+
+    # ------------------------------------------------------------ 읽기/다시 읽기
+    def refresh(self) -> int:
+        """폴더를 훑어 새로 생기거나 바뀐 파일만 다시 읽는다. 바뀐 파일 수를 돌려준다."""
+        with self._lock:
+            files = dict(self._files)
+            seen = set()
+            changed = []
+            failed = False
+            for path in self.directory.glob(self.pattern):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                seen.add(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                previous = files.get(path)
+                if previous is not None and previous[:2] == signature:
+                    continue
+                try:
+                    prompt = load_prompt_file(path)
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    print(f"프롬프트 파일을 읽지 못했습니다 (이전 버전 유지): {path.name}: {e}")
+                    # 같은 내용으로 계속 실패하지 않도록 시그니처만 갱신하고 이전 프롬프트는 그대로 둔다
+                    files[path] = (*signature, previous[2] if previous else None)
+                    failed = True
+                    continue
+                self.counters["reloads" if previous else "loads"] += 1
+                files[path] = (*signature, prompt)
+                changed.append(prompt)
+            for path in set(files) - seen:
+                del files[path]
+                self.counters["removed"] += 1
+                changed.append(None)
+            if not changed and not failed:
+                return 0
+            self._swap(files)
+        if self.on_reload:
+            for prompt in changed:
+                if prompt is not None:
+                    self.on_reload(prompt.name, prompt.version)
+        return len(changed)
+
+    def _swap(self, files: dict):
+        """파일 목록으로 조회 테이블을 새로 만들어 한 번에 바꿔 끼운다."""
+        prompts = {}
+        for path in sorted(files):
+            prompt = files[path][2]
+            if prompt is None:
+                continue
+            key = (prompt.name, prompt.version)
+            if key in prompts:
+                print(f"같은 이름/버전의 프롬프트가 여러 파일에 있습니다: {key} ({prompts[key].path.name}, {path.name})")
+            prompts[key] = prompt
+        latest = {}
+        for prompt in prompts.values():
+            current = latest.get(prompt.name)
+            if current is None or _version_key(prompt.version) > _version_key(current.version):
+                latest[prompt.name] = prompt
+        self._files, self._prompts, self._latest = files, prompts, latest
+
+    # ------------------------------------------------------------ 파일 감시
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="prompt-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"프롬프트 폴더 확인 실패: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        return {"prompts": len(self._prompts), "files": len(self._files), **self.counters}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="프롬프트 폴더를 감시하며 바뀐 프롬프트를 출력")
+    parser.add_argument("directory", nargs="?", default=str(Path(__file__).parent))
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with PromptRegistry(args.directory, watch=True, poll_interval=args.interval,
+                        on_reload=lambda name, version: print(f"다시 읽음: {name} v{version}")) as registry:
+        for name in registry.names():
+            prompt = registry.get(name)
+            print(f"{name} v{prompt.version}: {prompt.compiled.input_variables}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(registry.stats())
@@ -0,0 +1,151 @@
+"""여러 provider에 같은 요청을 보내고 가장 먼저 도착한 '쓸 만한' 응답을 사용.
+
+asyncio.gather는 모든 응답을 기다리지만, 지연 시간이 중요한 요청이라면 가장 빠른 응답 하나면 충분하다.
+race()는 먼저 성공한 응답을 돌려주고 나머지 작업은 취소해서 토큰 스트리밍을 멈춘다.
+- predicate: 응답 품질 검사 (False면 그 응답은 버리고 나머지를 계속 기다림)
+- deadlines: provider별 제한 시간
+- RaceStats: 어떤 provider가 이겼는지 기록해 라우팅 순서를 정하는 데 활용
+
+사용 예:
+    result = await race({
+        "openai": lambda: call_async_openai(prompt),
+        "claude": lambda: call_async_claude(prompt),
+    }, predicate=lambda text: bool(text.strip()))
+    print(result.provider, result.value)
+"""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+
+
+class RaceError(RuntimeError):
+    """모든 provider가 실패했거나 품질 검사를 통과하지 못했을 때 발생. errors에 provider별 원인."""
+
+    def __init__(self, errors: dict):
+        super().__init__(f"모든 provider가 실패했습니다: {errors}")
+        self.errors = errors
+
+
+class RejectedResponse(Exception):
+    """predicate를 통과하지 못한 응답."""
+
+
+@dataclass
+class RaceResult:
+    provider: str
+    value: object
+    latency: float
+
+
+class RaceStats:
+    """provider별 승리/실패 횟수와 승리 시 평균 지연 시간."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def _entry(self, provider):
+        return self._stats.setdefault(
+            provider, {"races": 0, "wins": 0, "errors": 0, "timeouts": 0, "rejected": 0, "win_seconds": 0.0}
+        )
+
+    def record(self, provider: str, outcome: str, latency: float = 0.0):
+        entry = self._entry(provider)
+        entry["races"] += 1
+        if outcome == "win":
+            entry["wins"] += 1
+            entry["win_seconds"] += latency
+        elif outcome in ("errors", "timeouts", "rejected"):
+            entry[outcome] += 1
+
+    def ranking(self) -> list:
+        """승률이 높고, 같다면 평균 승리 지연이 짧은 provider 순서."""
+        def key(item):
+            _, entry = item
+            win_rate = entry["wins"] / entry["races"] if entry["races"] else 0.0
+            avg = entry["win_seconds"] / entry["wins"] if entry["wins"] else float("inf")
+            return -win_rate, avg
+        return [provider for provider, _ in sorted(self._stats.items(), key=key)]
+
+    def snapshot(self) -> dict:
+        return {provider: dict(entry) for provider, entry in self._stats.items()}
+
+
+_default_stats = RaceStats()
+
+
+def get_race_stats() -> RaceStats:
+    return _default_stats
+
+
+def _as_named(candidates) -> dict:
+    if isinstance(candidates, dict):
+        return dict(candidates)
+    return {f"provider_{i}": candidate for i, candidate in enumerate(candidates)}
+
+
+async def race(candidates, predicate=None, deadlines: dict = None, timeout: float = None,
+               stats: RaceStats = None) -> RaceResult:
+    """가장 먼저 성공(그리고 predicate 통과)한 응답을 돌려주고 나머지는 취소한다.
+
+    candidates는 {이름: 코루틴 또는 코루틴을 돌려주는 함수} 딕셔너리나 그 리스트.
+    """
+    stats = stats or _default_stats
+    deadlines = deadlines or {}
+    named = _as_named(candidates)
+    started = time.perf_counter()
+
+    async def run(provider, candidate):
+        awaitable = candidate if inspect.isawaitable(candidate) else candidate()
+        deadline = deadlines.get(provider)
+        value = await (asyncio.wait_for(awaitable, deadline) if deadline else awaitable)
+        if predicate is not None and not predicate(value):
+            raise RejectedResponse(f"{provider} 응답이 품질 검사를 통과하지 못했습니다")
+        return value
+
+    tasks = {asyncio.ensure_future(run(provider, candidate)): provider for provider, candidate in named.items()}
+    pending = set(tasks)
+    errors = {}
+    winner = None
+    timed_out = False
+    try:
+        while pending:
+            remaining = None if timeout is None else timeout - (time.perf_counter() - started)
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            # 같은 순간에 끝난 참가자도 모두 기록 (먼저 확인한 성공 응답이 승자)
+            for task in done:
+                provider = tasks[task]
+                exc = task.exception()
+                if exc is None:
+                    if winner is None:
+                        winner = RaceResult(provider, task.result(), time.perf_counter() - started)
+                        stats.record(provider, "win", winner.latency)
+                    else:
+                        stats.record(provider, "lost")
+                    continue
+                errors[provider] = exc
+                if isinstance(exc, RejectedResponse):
+                    stats.record(provider, "rejected")
+                elif isinstance(exc, asyncio.TimeoutError):
+                    stats.record(provider, "timeouts")
+                else:
+                    stats.record(provider, "errors")
+            if winner is not None:
+                return winner
+        for task in pending:
+            errors[tasks[task]] = asyncio.TimeoutError("전체 제한 시간 초과")
+        raise RaceError(errors)
+    finally:
+        # 진 쪽(또는 전체 제한 시간을 넘긴 쪽)은 취소해서 더 이상 토큰을 받지 않게 한다
+        for task in pending:
+            task.cancel()
+            # race를 부른 쪽이 취소된 경우는 승부가 나지 않았으므로 기록하지 않는다
+            if winner is not None:
+                stats.record(tasks[task], "lost")
+            elif timed_out:
+                stats.record(tasks[task], "timeouts")
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,329 @@
+"""비동기 팬아웃을 위한 적응형 레이트 리미터 / 동시성 제어기.
+
+asyncio.gather로 수천 개의 요청을 한 번에 보내면 곧바로 429(Too Many Requests)를 맞고,
+재시도가 몰리면서 꼬리 지연이 더 나빠진다. 여기서는 provider/model마다
+- 분당 요청 수(RPM) 토큰 버킷
+- 분당 토큰 수(TPM) 토큰 버킷
+- 동시 요청 수 제한(세마포어)
+을 두고, 429나 Retry-After를 받으면 한도를 줄였다가 성공이 이어지면 다시 늘린다 (AIMD).
+
+사용 예:
+    from rate_limiter import get_governor, estimate_tokens
+    governor = get_governor()
+    async with governor.slot("openai", model, tokens=estimate_tokens(prompt)):
+        response = await client.chat.completions.create(...)
+"""
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:  # tiktoken이 없거나 인코딩 파일을 받을 수 없는 환경
+            _encoding = None
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """텍스트의 토큰 수를 추정. tiktoken이 없으면 글자 수 기반으로 어림한다."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 한국어는 대략 1~2글자, 영어는 4글자 정도가 1토큰
+    return max(1, len(text) // 2)
+
+
+def retry_after_seconds(exc: BaseException):
+    """예외에 붙은 HTTP 응답에서 Retry-After(초) 값을 읽는다. 없으면 None."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            # HTTP-date 형식
+            from email.utils import parsedate_to_datetime
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                continue
+        else:
+            if name == "retry-after-ms":
+                seconds /= 1000
+        return max(0.0, seconds)
+    return None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+class _LoopLocal:
+    """이벤트 루프마다 따로 만드는 asyncio 동기화 객체.
+
+    asyncio.Lock/Condition은 처음 경쟁한 이벤트 루프에 묶이므로, asyncio.run()을 여러 번 호출하는
+    스크립트에서 공용 governor를 그대로 쓰면 오류가 난다 (llm_clients의 루프별 전송 계층과 같은 방식).
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._objects = weakref.WeakKeyDictionary()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        obj = self._objects.get(loop)
+        if obj is None:
+            obj = self._objects[loop] = self._factory()
+        return obj
+
+
+class AsyncTokenBucket:
+    """분당 rate만큼 채워지는 토큰 버킷. acquire()는 토큰이 모일 때까지 기다린다."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._locks = _LoopLocal(asyncio.Lock)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_minute / 60)
+        self._updated = now
+
+    def set_rate(self, rate_per_minute: float):
+        self._refill()
+        self.rate_per_minute = rate_per_minute
+
+    def drain(self):
+        """Retry-After 등으로 당분간 보내지 말아야 할 때 버킷을 비운다."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+    def debit(self, amount: float):
+        """실제 사용량이 예상보다 많았을 때 차액을 빚으로 기록 (음수 허용)."""
+        self._refill()
+        self._tokens -= amount
+
+    async def acquire(self, amount: float = 1):
+        # 버킷 크기보다 큰 요청은 버킷을 가득 채운 뒤 빚을 지고 보낸다
+        amount = min(amount, self.capacity)
+        async with self._locks.get():
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) * 60 / self.rate_per_minute)
+
+
+class AdaptiveSemaphore:
+    """한도를 실행 중에 바꿀 수 있는 세마포어."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._conditions = _LoopLocal(asyncio.Condition)
+
+    async def acquire(self):
+        condition = self._conditions.get()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._conditions.get()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def set_limit(self, limit: int):
+        condition = self._conditions.get()
+        async with condition:
+            self.limit = limit
+            condition.notify_all()
+
+
+@dataclass
+class LimitConfig:
+    rpm: float
+    tpm: float
+    max_concurrency: int
+
+
+DEFAULT_LIMITS = {
+    "openai": LimitConfig(rpm=500, tpm=200_000, max_concurrency=32),
+    "anthropic": LimitConfig(rpm=50, tpm=50_000, max_concurrency=8),
+}
+FALLBACK_LIMITS = LimitConfig(rpm=60, tpm=60_000, max_concurrency=8)
+
+
+class ProviderLimiter:
+    """provider/model 하나에 대한 RPM/TPM 버킷 + 동시성 제한."""
+
+    # 429를 받으면 한도를 절반으로, 성공하면 조금씩 회복
+    DECREASE_FACTOR = 0.5
+    MIN_SCALE = 0.05
+    RECOVERY_STEP = 0.05
+    RECOVERY_COOLDOWN = 5.0
+
+    def __init__(self, config: LimitConfig):
+        self.config = config
+        self.scale = 1.0
+        self.requests = AsyncTokenBucket(config.rpm)
+        self.tokens = AsyncTokenBucket(config.tpm)
+        self.concurrency = AdaptiveSemaphore(config.max_concurrency)
+        self._paused_until = 0.0
+        self._last_throttle = 0.0
+        self.counters = {"requests": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    async def _apply_scale(self):
+        self.requests.set_rate(self.config.rpm * self.scale)
+        self.tokens.set_rate(self.config.tpm * self.scale)
+        await self.concurrency.set_limit(max(1, int(self.config.max_concurrency * self.scale)))
+
+    async def _wait_pause(self):
+        # 기다리는 동안 다른 요청이 429를 받아 멈춤 시간이 늘어날 수 있으므로 다시 확인
+        while (pause := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(pause)
+
+    async def acquire(self, tokens: int):
+        started = time.monotonic()
+        await self._wait_pause()
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+        await self.concurrency.acquire()
+        # 버킷/세마포어에서 기다리던 요청은 Retry-After가 걸린 뒤에 풀려날 수 있다.
+        # drain()은 버킷만 비우므로 토큰이 하나 채워지자마자 보내지 않도록 마지막에 한 번 더 멈춤을 확인
+        try:
+            await self._wait_pause()
+        except BaseException:
+            await self.concurrency.release()
+            raise
+        self.counters["requests"] += 1
+        self.counters["waited_seconds"] += time.monotonic() - started
+
+    async def release(self):
+        await self.concurrency.release()
+
+    async def on_rate_limited(self, retry_after: float = None):
+        """429 응답: 한도를 줄이고, Retry-After 동안은 새 요청을 보내지 않는다."""
+        now = time.monotonic()
+        self.counters["rate_limited"] += 1
+        self._last_throttle = now
+        self.scale = max(self.MIN_SCALE, self.scale * self.DECREASE_FACTOR)
+        await self._apply_scale()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self.requests.drain()
+
+    async def on_success(self):
+        """429 없이 일정 시간이 지나면 한도를 조금씩 원래대로 되돌린다."""
+        if self.scale < 1.0 and time.monotonic() - self._last_throttle > self.RECOVERY_COOLDOWN:
+            self.scale = min(1.0, self.scale + self.RECOVERY_STEP)
+            await self._apply_scale()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "scale": self.scale,
+            "rpm": self.requests.rate_per_minute,
+            "tpm": self.tokens.rate_per_minute,
+            "max_concurrency": self.concurrency.limit,
+            "in_flight": self.concurrency.in_flight,
+        }
+
+
+class _Slot:
+    def __init__(self, limiter: ProviderLimiter, reserved_tokens: int):
+        self._limiter = limiter
+        self._reserved = reserved_tokens
+
+    def record_usage(self, total_tokens: int):
+        """응답의 실제 토큰 사용량을 알려주면 예상치와의 차이를 TPM 버킷에 반영한다."""
+        if total_tokens and total_tokens > self._reserved:
+            self._limiter.tokens.debit(total_tokens - self._reserved)
+            self._reserved = total_tokens
+
+
+class RateGovernor:
+    """provider/model별 ProviderLimiter를 관리하는 공용 제어기."""
+
+    def __init__(self, limits: dict = None):
+        self._limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._overrides = {}
+        self._limiters = {}
+
+    def configure(self, provider: str, model: str = None, rpm: float = None, tpm: float = None,
+                  max_concurrency: int = None):
+        """provider 전체(model=None) 또는 특정 model의 한도를 지정."""
+        base = self._config_for(provider, model)
+        config = LimitConfig(
+            rpm=rpm or base.rpm,
+            tpm=tpm or base.tpm,
+            max_concurrency=max_concurrency or base.max_concurrency,
+        )
+        if model is None:
+            self._limits[provider] = config
+        else:
+            self._overrides[(provider, model)] = config
+        self._limiters = {key: value for key, value in self._limiters.items() if key[0] != provider}
+
+    def _config_for(self, provider, model):
+        return self._overrides.get((provider, model)) or self._limits.get(provider, FALLBACK_LIMITS)
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = ProviderLimiter(self._config_for(provider, model))
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str, tokens: int = 0):
+        """한도 안에서 요청 1건을 실행할 자리를 얻는다. 429 예외는 자동으로 한도에 반영된다."""
+        limiter = self.limiter(provider, model)
+        await limiter.acquire(tokens)
+        try:
+            yield _Slot(limiter, tokens)
+        except BaseException as exc:
+            if is_rate_limited(exc):
+                await limiter.on_rate_limited(retry_after_seconds(exc))
+            raise
+        else:
+            await limiter.on_success()
+        finally:
+            await limiter.release()
+
+    def stats(self) -> dict:
+        return {f"{provider}/{model}": limiter.stats() for (provider, model), limiter in self._limiters.items()}
+
+
+_governor = None
+
+
+def get_governor() -> RateGovernor:
+    """프로세스 공용 RateGovernor."""
+    global _governor
+    if _governor is None:
+        _governor = RateGovernor()
+    return _governor
@@ -0,0 +1,237 @@
+"""LLM 응답 2단계 캐시 (메모리 LRU -> SQLite 디스크).
+
+같은 (모델, 시스템 프롬프트, 사용자 프롬프트) 요청이 반복되면 네트워크 호출 없이
+저장된 응답을 돌려준다. 키는 요청을 보낸 endpoint(base URL)와 요청 인자를 정렬된 JSON으로 직렬화한 뒤
+sha256으로 해시한다. 모의 서버(MOCK_LLM_SERVER)에서 받은 응답이 실제 API 호출에 쓰이지 않도록 endpoint도 키에 넣는다.
+
+- 1단계: 프로세스 내부 LRU (OrderedDict)
+- 2단계: SQLite 파일 (프로세스 재시작 후에도 유지)
+- TTL이 지난 항목은 무시/삭제하고, 항목 수가 상한을 넘으면 오래 안 쓰인 것부터 지운다.
+- 캐시 여부는 call/acall의 use_cache로 정한다
+  - None(기본) : temperature=0이나 seed를 명시한 요청만 캐시. temperature를 생략하면 기본값(1)으로 샘플링하므로 캐시하지 않음
+  - True       : 호출하는 쪽이 선택해서 캐시. 처음 샘플링된 답을 TTL 동안 같은 질문에 계속 돌려준다
+                 (답의 다양성 대신 지연/비용을 택하는 것. gpt-5 계열처럼 temperature를 받지 않는 모델은 이 방법뿐)
+  - False      : 캐시를 보지도 저장하지도 않음
+  n > 1, stream 요청은 어느 경우에도 캐시하지 않는다.
+
+사용 예:
+    from response_cache import get_response_cache
+    cache = get_response_cache()
+    text = cache.call(request, lambda: fetch(request), endpoint=str(client.base_url))
+    print(cache.stats())  # hit ratio, 절약한 지연 시간
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".cache" / "llm_responses.sqlite"
+DEFAULT_BASE_URLS = {"openai": "https://api.openai.com/v1", "anthropic": "https://api.anthropic.com"}
+
+
+def default_endpoint(provider: str = "openai") -> str:
+    """SDK가 환경 변수에서 읽을 base URL. 모의 서버가 지정되어 있으면 모의 서버 주소."""
+    mock = os.environ.get("MOCK_LLM_SERVER")
+    if mock:
+        return f"{provider}:{mock.rstrip('/')}"
+    base_url = os.environ.get(f"{provider.upper()}_BASE_URL") or DEFAULT_BASE_URLS.get(provider, "")
+    return f"{provider}:{base_url.rstrip('/')}"
+
+
+def make_cache_key(request: dict, endpoint: str = None) -> str:
+    """endpoint와 요청 인자를 정규화된 JSON으로 만든 뒤 sha256 해시를 키로 사용.
+
+    endpoint를 생략하면 default_endpoint("openai")
+    """
+    payload = {"endpoint": endpoint or default_endpoint(), "request": request}
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(request: dict, use_cache: bool = None) -> bool:
+    """use_cache=None이면 결과가 입력만으로 정해지는 요청만(temperature=0 또는 seed 명시), True면 항상 캐시."""
+    if use_cache is False or request.get("stream") or request.get("n", 1) > 1:
+        return False
+    if use_cache:
+        return True
+    # temperature를 생략하면 기본값 1로 샘플링하므로 결정적이지 않다
+    return request.get("temperature") == 0 or "seed" in request
+
+
+class ResponseCache:
+    """메모리 LRU 앞단 + SQLite 뒷단으로 구성된 응답 캐시."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 100_000, ttl: float = 24 * 60 * 60):
+        """path가 None이면 디스크 단계 없이 메모리 LRU만 사용."""
+        self.path = Path(path) if path is not None else None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (value, expires_at, latency)
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes_since_evict = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "saved_seconds": 0.0}
+
+    # ------------------------------------------------------------------ 디스크
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "latency REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        return self._db
+
+    def _disk_get(self, key, now):
+        if self.path is None:
+            return None
+        db = self._connection()
+        row = db.execute("SELECT value, expires_at, latency FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, latency = row
+        if expires_at < now:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(value), expires_at, latency
+
+    def _disk_set(self, key, value, expires_at, latency, now):
+        if self.path is None:
+            return
+        db = self._connection()
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at, latency, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at, latency, now),
+        )
+        # 매번 COUNT(*)를 하지 않도록 일정 횟수마다 만료/초과 항목을 정리
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= 100:
+            self._writes_since_evict = 0
+            self._disk_evict(now)
+
+    def _disk_evict(self, now):
+        db = self._connection()
+        db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        (count,) = db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+
+    # ------------------------------------------------------------------ 메모리
+    def _memory_set(self, key, value, expires_at, latency):
+        self._memory[key] = (value, expires_at, latency)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------ 공개 API
+    def get(self, key: str):
+        """(찾았는지 여부, 값)을 돌려준다. 메모리에 없으면 디스크를 보고 메모리로 끌어올린다."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, latency = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    self._counters["saved_seconds"] += latency
+                    return True, value
+                del self._memory[key]
+
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                value, expires_at, latency = entry
+                self._memory_set(key, value, expires_at, latency)
+                self._counters["disk_hits"] += 1
+                self._counters["saved_seconds"] += latency
+                return True, value
+
+            self._counters["misses"] += 1
+            return False, None
+
+    def set(self, key: str, value, latency: float = 0.0, ttl: float = None):
+        """값을 두 단계 모두에 저장. latency는 원래 호출에 걸린 시간(절약 시간 계산용)."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._memory_set(key, value, expires_at, latency)
+            self._disk_set(key, value, expires_at, latency, now)
+
+    def call(self, request: dict, fetch, use_cache: bool = None, endpoint: str = None):
+        """캐시를 먼저 보고, 없으면 fetch()를 호출해 결과를 저장한다. endpoint는 요청을 보낼 base URL."""
+        if not is_cacheable(request, use_cache):
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return fetch()
+        key = make_cache_key(request, endpoint)
+        found, value = self.get(key)
+        if found:
+            return value
+        started = time.perf_counter()
+        value = fetch()
+        self.set(key, value, latency=time.perf_counter() - started)
+        return value
+
+    async def acall(self, request: dict, fetch, use_cache: bool = None, endpoint: str = None):
+        """call()의 비동기 버전. fetch는 코루틴을 돌려주는 함수이며, 디스크 접근은 스레드에서 처리한다."""
+        if not is_cacheable(request, use_cache):
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return await fetch()
+        key = make_cache_key(request, endpoint)
+        found, value = await asyncio.to_thread(self.get, key)
+        if found:
+            return value
+        started = time.perf_counter()
+        value = await fetch()
+        await asyncio.to_thread(self.set, key, value, time.perf_counter() - started)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.path is not None:
+                self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """hit ratio와 캐시 덕분에 절약한 누적 지연 시간."""
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        counters["hit_ratio"] = hits / lookups if lookups else 0.0
+        counters["memory_entries"] = len(self._memory)
+        return counters
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """프로세스 공용 캐시. LLM_CACHE_PATH, LLM_CACHE_TTL 환경 변수로 조정할 수 있다."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl=float(os.environ.get("LLM_CACHE_TTL", 24 * 60 * 60)),
+            )
+        return _default_cache
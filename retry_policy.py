@@ -0,0 +1,248 @@
+"""오류 분류 + Retry-After + 서킷 브레이커 + 헤지 요청을 갖춘 재시도 정책.
+
+1.4.2의 @retry는 모든 예외(400 Bad Request 같은 재시도해도 소용없는 오류 포함)를
+고정된 지수 백오프로 재시도하고, 서버가 알려주는 Retry-After도 무시한다.
+여기서는 tenacity 위에
+- 오류 분류: 연결 오류/타임아웃/408/409/429/5xx만 재시도
+- Retry-After 헤더가 있으면 그만큼 기다리고, 없으면 지터가 있는 지수 백오프
+- endpoint별 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 호출을 막음
+- (선택) 헤지 요청: p95 지연 시간이 지나도 응답이 없으면 같은 요청을 하나 더 보내고 먼저 온 쪽을 사용
+을 얹었다. 재시도/헤지/브레이커 상태 전환은 모두 metrics()로 확인할 수 있다.
+
+사용 예:
+    policy = RetryPolicy(max_attempts=3, hedge=True)
+
+    @policy.wrap("openai.chat")
+    async def call(prompt): ...
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from rate_limiter import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷 브레이커가 열려 있어 호출하지 않고 바로 실패시킬 때 발생."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """재시도하면 성공할 가능성이 있는 오류인지 분류."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    # openai.APIConnectionError, httpx.TransportError 등 상태 코드 없는 네트워크 오류
+    name = type(exc).__name__
+    return name.endswith(("ConnectionError", "TimeoutError", "TransportError", "ProtocolError"))
+
+
+class CircuitBreaker:
+    """closed -> (연속 실패) -> open -> (reset_timeout 경과) -> half_open -> 성공 시 closed."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, on_transition=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._on_transition = on_transition
+
+    def _transition(self, state):
+        if state != self.state:
+            logger.warning(f"서킷 브레이커 [{self.name}] {self.state} -> {state}")
+            if self._on_transition:
+                self._on_transition(self.name, self.state, state)
+            self.state = state
+
+    def before_call(self):
+        """호출 전에 확인. 열려 있으면 CircuitOpenError."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} 서킷이 열려 있습니다")
+            self._transition("half_open")
+        if self.state == "half_open":
+            # half_open에서는 시험 호출 1건만 허용
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"{self.name} 서킷 시험 호출 중입니다")
+            self._probe_in_flight = True
+
+    def on_success(self):
+        self._failures = 0
+        self._probe_in_flight = False
+        self._transition("closed")
+
+    def on_cancel(self):
+        """호출이 취소되면 성공/실패로 세지 않고 시험 호출 자리만 돌려준다."""
+        self._probe_in_flight = False
+
+    def on_failure(self, exc: BaseException):
+        self._probe_in_flight = False
+        if not is_retryable(exc):
+            # 4xx처럼 요청 자체가 잘못된 경우는 endpoint 장애로 보지 않는다
+            return
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition("open")
+
+
+class LatencyTracker:
+    """최근 지연 시간 샘플로 p95를 계산 (헤지 요청 기준 시간)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class RetryPolicy:
+    """endpoint별 서킷 브레이커와 지연 시간 통계를 가진 재시도 정책."""
+
+    def __init__(self, max_attempts: int = 3, max_delay: float = 30.0, hedge: bool = False,
+                 hedge_percentile: float = 0.95, hedge_min_samples: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.max_attempts = max_attempts
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._latencies = {}
+        self._fallback_wait = wait_random_exponential(multiplier=0.5, max=max_delay)
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                         "circuit_rejections": 0, "breaker_transitions": {}}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(
+                endpoint, self.failure_threshold, self.reset_timeout, on_transition=self._count_transition
+            )
+            self._latencies[endpoint] = LatencyTracker()
+        return self._breakers[endpoint]
+
+    def _count_transition(self, name, old, new):
+        key = f"{name}:{old}->{new}"
+        transitions = self.counters["breaker_transitions"]
+        transitions[key] = transitions.get(key, 0) + 1
+
+    def _wait(self, retry_state) -> float:
+        """서버가 Retry-After를 주면 그 값을, 아니면 지터가 있는 지수 백오프를 사용."""
+        retry_after = retry_after_seconds(retry_state.outcome.exception())
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self._fallback_wait(retry_state)
+
+    def _before_sleep(self, retry_state):
+        self.counters["retries"] += 1
+        logger.warning(
+            f"API 호출 실패: {retry_state.outcome.exception()}, "
+            f"{retry_state.attempt_number}번째 재시도 중... ({retry_state.next_action.sleep:.1f}초 대기)"
+        )
+
+    async def _hedged(self, endpoint: str, fn):
+        """p95 지연이 지나도록 응답이 없으면 같은 요청을 하나 더 보내고 먼저 성공한 결과를 쓴다."""
+        latencies = self._latencies[endpoint]
+        primary = asyncio.ensure_future(fn())
+        if not self.hedge or len(latencies) < self.hedge_min_samples:
+            return await primary
+
+        deadline = latencies.percentile(self.hedge_percentile)
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=deadline)
+        except BaseException:
+            # asyncio.wait는 바깥 작업이 취소되어도 기다리던 작업을 취소하지 않는다
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+
+        self.counters["hedges"] += 1
+        hedge = asyncio.ensure_future(fn())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+            # 둘 다 실패하면 원래 요청의 오류를 전달
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, endpoint: str, fn):
+        """fn(코루틴을 돌려주는 함수)을 정책에 따라 실행."""
+        breaker = self.breaker(endpoint)
+        self.counters["calls"] += 1
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._before_sleep,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                try:
+                    breaker.before_call()
+                except CircuitOpenError:
+                    self.counters["circuit_rejections"] += 1
+                    raise
+                started = time.perf_counter()
+                try:
+                    result = await self._hedged(endpoint, fn)
+                except Exception as exc:
+                    breaker.on_failure(exc)
+                    raise
+                except BaseException:
+                    # race의 패자 취소처럼 CancelledError로 끝나면 half_open 시험 호출 자리를 풀어 준다
+                    breaker.on_cancel()
+                    raise
+                breaker.on_success()
+                self._latencies[endpoint].add(time.perf_counter() - started)
+        return result
+
+    def wrap(self, endpoint: str):
+        """비동기 함수에 정책을 적용하는 데코레이터."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await self.call(endpoint, lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def metrics(self) -> dict:
+        return {
+            **self.counters,
+            "breakers": {name: breaker.state for name, breaker in self._breakers.items()},
+            "p95_seconds": {
+                name: tracker.percentile(0.95) for name, tracker in self._latencies.items() if len(tracker)
+            },
+        }
@@ -0,0 +1,188 @@
+"""LCEL 파이프라인 어디에나 끼워 넣을 수 있는 메모이제이션 Runnable.
+
+3.5의 체인들은 {"word": "행복"}처럼 같은 입력이 다시 들어와도 prompt | model | parser를 매번 다시 실행한다.
+CachedRunnable은 감싼 Runnable의 결과를 입력의 안정적인 해시로 저장해 두고, 같은 입력이 오면 바로 돌려준다.
+
+1. 키 : sha256(구간 이름 + 정렬된 JSON으로 직렬화한 입력). 메시지/PromptValue 같은 랭체인 객체도 직렬화해서 키에 넣는다
+2. 저장소 : response_cache.ResponseCache를 그대로 사용 (메모리 LRU + 선택적 SQLite, TTL, 크기 제한)
+   - path를 주지 않으면 메모리에만 저장. 저장할 때와 돌려줄 때 deepcopy하므로 받은 결과를 고쳐도 캐시는 그대로
+   - path를 주면 프로세스를 다시 띄워도 유지. 이때는 name이 필요
+     결과 안의 랭체인 객체(메시지 등)는 dumpd/load, pydantic 모델은 model_dump/model_validate로 중첩된 것까지 직렬화하고,
+     JSON으로 저장할 수 없는 값이 나오면 TypeError
+3. 구간(segment)별 hit ratio / 절약한 시간 집계 : cached_runnable.stats(), 전체는 cache_stats()
+
+결과가 입력만으로 정해지는(결정적인) 구간에만 쓴다. temperature가 높은 모델 호출을 감싸면
+같은 입력에 항상 같은 답을 돌려주게 된다는 점에 주의.
+
+사용 예:
+    chain = prompt | cached(model, name="synonyms-model", ttl=3600) | parser
+    branch = cached(language_aware_chain, name="synonyms", path=".cache/synonyms.sqlite")
+    print(cache_stats())
+"""
+import asyncio
+import copy
+import hashlib
+import importlib
+import inspect
+import json
+import time
+import weakref
+from typing import Any, Optional
+
+from langchain_core.load import dumpd, load
+from langchain_core.load.serializable import Serializable
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.base import coerce_to_runnable
+from pydantic import BaseModel
+
+from response_cache import ResponseCache
+
+_segments = weakref.WeakSet()
+# 캐시 파일에는 이 모듈이 dumpd로 쓴 랭체인 core 객체(메시지 등)만 들어 있다 (allowed_objects는 최신 버전에만 있음)
+_LOAD_KWARGS = {"allowed_objects": "core"} if "allowed_objects" in inspect.signature(load).parameters else {}
+
+
+def _stable(value):
+    """json.dumps가 모르는 객체를 실행마다 같은 값이 되도록 바꾼다."""
+    if isinstance(value, Serializable):
+        return dumpd(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    # repr()에는 메모리 주소가 들어갈 수 있어 실행마다 키가 달라진다 -> 조용히 캐시를 놓치는 대신 바로 알린다
+    raise TypeError(f"{type(value).__name__} 값은 캐시 키로 직렬화할 수 없습니다. "
+                    f"JSON으로 표현할 수 있는 입력이나 랭체인/pydantic 객체를 넘기세요.")
+
+
+def input_key(segment: str, input) -> str:
+    canonical = json.dumps([segment, input], sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=_stable)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _to_json(value, segment: str):
+    """결과를 JSON으로 저장할 수 있는 형태로 (dict/list 안에 든 메시지 등도 재귀적으로)."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Serializable):
+        return {"__lc__": dumpd(value)}
+    if isinstance(value, BaseModel):
+        model = type(value)
+        return {"__pydantic__": f"{model.__module__}:{model.__qualname__}", "data": value.model_dump(mode="json")}
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _to_json(v, segment) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_to_json(v, segment) for v in value]}
+    if isinstance(value, list):
+        return [_to_json(v, segment) for v in value]
+    raise TypeError(f"'{segment}' 구간의 결과에 디스크 캐시에 저장할 수 없는 {type(value).__name__} 값이 있습니다. "
+                    f"path 없이 메모리 캐시만 쓰거나, 결과를 JSON/랭체인/pydantic 객체로 바꾸세요.")
+
+
+def _from_json(value):
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "__lc__" in value:
+        return load(value["__lc__"], **_LOAD_KWARGS)
+    if "__pydantic__" in value:
+        module, _, qualname = value["__pydantic__"].partition(":")
+        model = importlib.import_module(module)
+        for part in qualname.split("."):
+            model = getattr(model, part)
+        return model.model_validate(value["data"])
+    if "__tuple__" in value:
+        return tuple(_from_json(v) for v in value["__tuple__"])
+    return {k: _from_json(v) for k, v in value.items()}
+
+
+class CachedRunnable(Runnable):
+    """감싼 Runnable의 결과를 입력별로 캐시하는 Runnable."""
+
+    def __init__(self, runnable, name: Optional[str] = None, ttl: float = 60 * 60, max_entries: int = 1024,
+                 path=None, max_disk_entries: int = 100_000):
+        """
+        runnable    : 감쌀 Runnable (함수를 넘기면 RunnableLambda로 감싼다)
+        name        : 구간 이름. 통계에 쓰이고 디스크 캐시의 키에도 들어가므로 path를 쓸 때는 필수
+        ttl         : 항목 유효 시간(초)
+        max_entries : 메모리 LRU 항목 수
+        path        : SQLite 파일 경로. None이면 메모리에만 저장
+        """
+        if path is not None and not name:
+            raise ValueError("디스크에 저장하는 캐시는 구간을 구분할 name이 필요합니다.")
+        self.runnable = coerce_to_runnable(runnable)
+        self.name = name or self.runnable.get_name()
+        self.persistent = path is not None
+        self.cache = ResponseCache(path=path, max_memory_entries=max_entries,
+                                   max_disk_entries=max_disk_entries, ttl=ttl)
+        _segments.add(self)
+
+    # ------------------------------------------------------------ Runnable 타입 정보
+    @property
+    def InputType(self) -> Any:
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.runnable.OutputType
+
+    def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+        return name or f"Cached[{self.name}]" + (suffix or "")
+
+    # ------------------------------------------------------------ 값 변환
+    def _encode(self, value):
+        # 메모리에만 둘 때는 객체의 복사본을, 디스크에도 둘 때는 JSON으로 저장할 수 있는 형태로
+        return _to_json(value, self.name) if self.persistent else copy.deepcopy(value)
+
+    def _decode(self, value):
+        # 호출한 쪽이 결과를 고쳐도 캐시에 든 값이 바뀌지 않도록 항상 새 객체를 돌려준다
+        return _from_json(value) if self.persistent else copy.deepcopy(value)
+
+    # ------------------------------------------------------------ 실행
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        key = input_key(self.name, input)
+        found, value = self.cache.get(key)
+        if found:
+            return self._decode(value)
+        started = time.perf_counter()
+        output = self.runnable.invoke(input, config, **kwargs)
+        self.cache.set(key, self._encode(output), latency=time.perf_counter() - started)
+        return output
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        key = input_key(self.name, input)
+        # 디스크를 볼 때만 스레드로 넘기고, 메모리만 쓰면 그 자리에서 조회
+        if self.persistent:
+            found, value = await asyncio.to_thread(self.cache.get, key)
+        else:
+            found, value = self.cache.get(key)
+        if found:
+            return self._decode(value)
+        started = time.perf_counter()
+        output = await self.runnable.ainvoke(input, config, **kwargs)
+        latency = time.perf_counter() - started
+        if self.persistent:
+            await asyncio.to_thread(self.cache.set, key, self._encode(output), latency)
+        else:
+            self.cache.set(key, self._encode(output), latency)
+        return output
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return {"segment": self.name, **self.cache.stats()}
+
+    def __repr__(self):
+        return f"CachedRunnable(name={self.name!r}, runnable={self.runnable!r})"
+
+
+def cached(runnable, **kwargs) -> CachedRunnable:
+    """CachedRunnable(runnable, **kwargs)의 짧은 이름."""
+    return CachedRunnable(runnable, **kwargs)
+
+
+def cache_stats() -> dict:
+    """살아 있는 모든 CachedRunnable 구간의 통계."""
+    return {segment.name: segment.stats() for segment in list(_segments)}
@@ -0,0 +1,125 @@
+"""동일한 요청이 동시에 여러 번 들어오면 실제 호출은 한 번만 하는 single-flight 계층.
+
+같은 FAQ 질문이 한꺼번에 몰리면 코루틴마다 따로 upstream 호출을 하게 된다.
+SingleFlight는 같은 키로 동시에 들어온 요청들이 하나의 진행 중인 future를 공유하게 하고,
+스트리밍 요청은 한 번 받은 토큰 스트림을 기다리는 모든 소비자에게 나눠준다
+(늦게 합류한 소비자는 이미 받은 청크부터 다시 받는다).
+
+사용 예:
+    flight = get_single_flight()
+    text = await flight.do(key, lambda: call_api(prompt))
+    async for chunk in flight.stream(key, lambda: stream_api(prompt)):
+        ...
+    print(flight.stats())  # 합쳐진(collapsed) 호출 수
+"""
+import asyncio
+
+
+class _Flight:
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = asyncio.Condition()
+        self.task = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._streams = {}
+        self.counters = {"calls": 0, "collapsed": 0, "stream_calls": 0, "stream_collapsed": 0}
+
+    async def do(self, key, fn):
+        """key가 같은 요청이 진행 중이면 그 결과를 기다리고, 아니면 fn()을 실행한다."""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.counters["calls"] += 1
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.future.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.counters["collapsed"] += 1
+
+        flight.waiters += 1
+        try:
+            # 한 소비자가 취소되어도 공유 중인 호출은 계속되도록 shield
+            return await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.future.done():
+                # 마지막 소비자까지 떠났다면 upstream 호출도 취소
+                flight.future.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _pump(self, key, flight, source):
+        try:
+            async for chunk in source:
+                async with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except Exception as exc:
+            flight.error = exc
+        finally:
+            self._streams.pop(key, None)
+            async with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    async def stream(self, key, fn):
+        """스트리밍 버전. fn()은 async iterator를 돌려주며, 받은 청크는 모든 소비자에게 전달된다."""
+        flight = self._streams.get(key)
+        if flight is None:
+            self.counters["stream_calls"] += 1
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, fn()))
+        else:
+            self.counters["stream_collapsed"] += 1
+
+        flight.waiters += 1
+        position = 0
+        try:
+            while True:
+                async with flight.condition:
+                    await flight.condition.wait_for(lambda: position < len(flight.chunks) or flight.done)
+                    chunks = flight.chunks[position:]
+                    finished = flight.done
+                for chunk in chunks:
+                    yield chunk
+                position += len(chunks)
+                if finished and position >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.done:
+                # 아무도 듣지 않는 스트림은 더 받지 않는다
+                flight.task.cancel()
+                self._streams.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.counters["calls"] + self.counters["collapsed"]
+        stream_total = self.counters["stream_calls"] + self.counters["stream_collapsed"]
+        return {
+            **self.counters,
+            "collapse_ratio": self.counters["collapsed"] / total if total else 0.0,
+            "stream_collapse_ratio": self.counters["stream_collapsed"] / stream_total if stream_total else 0.0,
+        }
+
+
+_default = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """프로세스 공용 SingleFlight."""
+    return _default
@@ -0,0 +1,409 @@
+"""LLM 스트리밍 응답을 다른 컴포넌트가 소비할 수 있는 async generator로 바꿔주는 모듈.
+
+1. chat_deltas/response_deltas : SDK 스트림에서 텍스트 조각(delta)만 뽑아낸다
+   shared_chat_deltas : 동시에 들어온 같은 요청은 upstream 스트림 1개를 나눠 받는다 (single_flight.stream)
+2. coalesce : 작은 조각들을 최대 max_chars / max_delay 단위의 프레임으로 묶는다.
+   내부 큐 크기가 제한되어 있어 소비자가 느리면 생산자(네트워크 읽기)도 멈춘다 (backpressure)
+3. 렌더러 : PlainRenderer(표준 출력), RichRenderer(rich Live), SSERenderer(Server-Sent Events)
+4. StreamStats : 스트림마다 TTFT, 토큰 간 지연, 초당 토큰 수를 기록
+5. interruptible_chat : 답변을 스트리밍으로 출력하다가 새 메시지가 들어오면 진행 중인 생성을 취소하는 CLI 루프
+
+사용 예:
+    stats = StreamStats()
+    frames = coalesce(chat_deltas(client, stats, model="gpt-5-mini", messages=messages), stats=stats)
+    await render(frames, PlainRenderer(), stats)
+    print(stats.as_dict())
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from response_cache import make_cache_key
+from single_flight import get_single_flight
+
+
+class StreamStats:
+    """스트림 1개의 지연 시간 통계."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.last_token_at = None
+        self.finished_at = None
+        self.deltas = 0
+        self.frames = 0
+        self.chars = 0
+        self.output_tokens = None  # 서버가 알려준 usage가 있으면 그 값을 쓴다
+        self.gaps = []
+
+    def on_delta(self, text: str):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.gaps.append(now - self.last_token_at)
+        self.last_token_at = now
+        self.deltas += 1
+        self.chars += len(text)
+
+    def finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+
+    @property
+    def ttft(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started
+
+    @property
+    def tokens(self) -> int:
+        # usage가 없으면 delta 1개를 토큰 1개로 본다
+        return self.output_tokens if self.output_tokens is not None else self.deltas
+
+    @property
+    def tokens_per_second(self):
+        end = self.finished_at or self.last_token_at
+        if self.first_token_at is None or end is None or end <= self.started:
+            return None
+        return self.tokens / (end - self.started)
+
+    def inter_token_latency(self, percentile: float = 50):
+        if not self.gaps:
+            return None
+        ordered = sorted(self.gaps)
+        return ordered[min(len(ordered) - 1, round(percentile / 100 * (len(ordered) - 1)))]
+
+    def as_dict(self) -> dict:
+        def ms(value):
+            return None if value is None else round(value * 1000, 2)
+
+        return {
+            "ttft_ms": ms(self.ttft),
+            "itl_p50_ms": ms(self.inter_token_latency(50)),
+            "itl_p95_ms": ms(self.inter_token_latency(95)),
+            "tokens": self.tokens,
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+            "deltas": self.deltas,
+            "frames": self.frames,
+            "chars": self.chars,
+        }
+
+
+# ----------------------------------------------------------------------------- 소스
+async def chat_deltas(client, stats: StreamStats = None, **request):
+    """AsyncOpenAI chat.completions 스트림의 텍스트 조각."""
+    request.setdefault("stream_options", {"include_usage": True})
+    stream = await client.chat.completions.create(stream=True, **request)
+    async for chunk in stream:
+        if chunk.usage is not None and stats is not None:
+            stats.output_tokens = chunk.usage.completion_tokens
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def shared_chat_deltas(client, stats: StreamStats = None, flight=None, **request):
+    """chat_deltas와 같지만, 같은 요청이 이미 스트리밍 중이면 새로 호출하지 않고 그 스트림을 함께 받는다.
+
+    늦게 합류한 쪽도 처음 조각부터 받는다. usage(output_tokens)는 실제로 호출한 쪽의 stats에만 기록된다.
+    """
+    flight = flight or get_single_flight()
+    key = make_cache_key({"stream": "chat.completions", **request}, str(client.base_url))
+    async for delta in flight.stream(key, lambda: chat_deltas(client, stats, **request)):
+        yield delta
+
+
+async def response_deltas(client, stats: StreamStats = None, **request):
+    """AsyncOpenAI responses 스트림의 output_text 조각."""
+    async for delta in ResponseStream(client, stats, **request).deltas():
+        yield delta
+
+
+class ResponseStream:
+    """responses 스트림 1개.
+
+    response.created 이벤트에서 응답 id를 먼저 잡아 두므로, 중간에 취소되더라도
+    다음 턴의 previous_response_id로 쓸 id를 알 수 있다. 완료되면 on_complete(최종 응답)를 호출하고,
+    완료되지 못한 스트림은 interrupted()가 on_interrupt(그때까지 받은 텍스트)를 호출한다.
+    """
+
+    def __init__(self, client, stats: StreamStats = None, on_complete=None, on_interrupt=None, **request):
+        self.client = client
+        self.stats = stats
+        self.on_complete = on_complete
+        self.on_interrupt = on_interrupt
+        self.request = request
+        self.response_id = None
+        self.response = None
+        self._parts = []
+
+    @property
+    def partial_text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def completed(self) -> bool:
+        return self.response is not None
+
+    def interrupted(self):
+        """스트림이 끝나지 못했으면 on_interrupt를 (한 번만) 호출한다. 다음 요청을 만들기 전에 불러야 한다."""
+        if self.response is None and self.on_interrupt is not None:
+            on_interrupt, self.on_interrupt = self.on_interrupt, None
+            on_interrupt(self.partial_text)
+
+    async def deltas(self):
+        async with self.client.responses.stream(**self.request) as stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    self._parts.append(event.delta)
+                    yield event.delta
+                elif event.type == "response.created":
+                    self.response_id = event.response.id
+                elif event.type == "response.completed":
+                    self.response = event.response
+                    if self.stats is not None and event.response.usage:
+                        self.stats.output_tokens = event.response.usage.output_tokens
+                    if self.on_complete is not None:
+                        self.on_complete(event.response)
+
+
+# ----------------------------------------------------------------------------- 프레임 묶기
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+async def coalesce(source, stats: StreamStats = None, max_chars: int = 64, max_delay: float = 0.03,
+                   queue_size: int = 64):
+    """source의 작은 조각들을 프레임으로 묶어 돌려준다.
+
+    - 프레임 하나는 max_chars 글자 안팎 (조각 하나가 더 길면 그대로 한 프레임)
+    - 첫 조각이 도착한 뒤 max_delay초가 지나면 덜 찼더라도 내보낸다
+    - 큐가 queue_size만큼 차면 source 읽기를 멈춘다
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    loop = asyncio.get_running_loop()
+
+    async def produce():
+        try:
+            async for delta in source:
+                if not delta:
+                    continue
+                if stats is not None:
+                    stats.on_delta(delta)
+                await queue.put(delta)
+        except Exception as exc:
+            await queue.put(_Failure(exc))
+            return
+        await queue.put(_END)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        item = await queue.get()
+        while item is not _END:
+            if isinstance(item, _Failure):
+                raise item.exc
+            frame, size = [item], len(item)
+            deadline = loop.time() + max_delay
+            item = None
+            while size < max_chars:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _END or isinstance(item, _Failure):
+                    break
+                frame.append(item)
+                size += len(item)
+                item = None
+            if stats is not None:
+                stats.frames += 1
+            yield "".join(frame)
+            if item is None:
+                item = await queue.get()
+    finally:
+        producer.cancel()
+        if stats is not None:
+            stats.finish()
+
+
+# ----------------------------------------------------------------------------- 렌더러
+class PlainRenderer:
+    """표준 출력에 프레임 단위로 쓰고 flush."""
+
+    def __init__(self, file=None):
+        self.file = file or sys.stdout
+
+    def write(self, frame: str):
+        self.file.write(frame)
+        self.file.flush()
+
+    def close(self, stats: StreamStats = None):
+        self.file.write("\n")
+        self.file.flush()
+
+
+class RichRenderer:
+    """rich Live로 출력. 화면 갱신은 refresh_per_second로 제한되어 토큰이 빨라도 CPU를 적게 쓴다."""
+
+    def __init__(self, refresh_per_second: float = 8, show_stats: bool = True):
+        from rich.live import Live
+        from rich.text import Text
+        self.text = Text()
+        self.live = Live(self.text, refresh_per_second=refresh_per_second)
+        self.show_stats = show_stats
+        self.live.start()
+
+    def write(self, frame: str):
+        self.text.append(frame)
+
+    def close(self, stats: StreamStats = None):
+        self.live.stop()
+        if self.show_stats and stats is not None:
+            self.live.console.print(stats.as_dict())
+
+
+def sse_event(data, event: str = None) -> str:
+    """Server-Sent Events 형식 문자열 1개."""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in payload.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+class SSERenderer:
+    """프레임을 SSE 이벤트로 send에 전달. 마지막에 통계 이벤트와 [DONE]을 보낸다."""
+
+    def __init__(self, send=None):
+        self.send = send or sys.stdout.write
+
+    def write(self, frame: str):
+        self.send(sse_event({"delta": frame}))
+
+    def close(self, stats: StreamStats = None):
+        if stats is not None:
+            self.send(sse_event(stats.as_dict(), event="stats"))
+        self.send(sse_event("[DONE]"))
+
+
+async def render(frames, renderer, stats: StreamStats = None) -> str:
+    """프레임을 렌더러로 출력하고 전체 텍스트를 돌려준다."""
+    parts = []
+    try:
+        async for frame in frames:
+            parts.append(frame)
+            renderer.write(frame)
+    finally:
+        renderer.close(stats)
+    return "".join(parts)
+
+
+async def to_sse(frames, stats: StreamStats = None):
+    """웹 서버(StreamingResponse 등)에서 바로 쓸 수 있는 SSE 문자열 async generator."""
+    async for frame in frames:
+        yield sse_event({"delta": frame})
+    if stats is not None:
+        yield sse_event(stats.as_dict(), event="stats")
+    yield sse_event("[DONE]")
+
+
+# ----------------------------------------------------------------------------- 중단 가능한 CLI 채팅
+def start_input_thread(loop, queue, stop_words=("exit",)):
+    """input()을 별도 스레드에서 읽어 이벤트 루프의 큐로 넘긴다 (윈도우에서도 동작)."""
+
+    def read():
+        while True:
+            try:
+                line = input()
+            except EOFError:
+                line = None
+            loop.call_soon_threadsafe(queue.put_nowait, line)
+            # 종료 입력 뒤에는 더 읽지 않는다 (인터프리터 종료 시 input()에 막힌 스레드가 남지 않도록)
+            if line is None or line.strip().lower() in stop_words:
+                return
+
+    threading.Thread(target=read, daemon=True).start()
+
+
+def _is_missing_previous_response(exc) -> bool:
+    return getattr(exc, "status_code", None) in (400, 404) and "previous" in str(exc).lower()
+
+
+async def interruptible_chat(respond, label: str = "챗봇", prompt: str = "메시지: ", renderer_factory=PlainRenderer):
+    """respond(user_message, previous_response_id) -> ResponseStream 로 대화하는 CLI 루프.
+
+    답변이 출력되는 도중 새 메시지를 입력하면 진행 중인 스트림을 끊어 생성을 멈추고(더 이상 토큰 비용을 내지 않음)
+    바로 새 메시지를 처리한다. 끊긴 응답의 id도 체인에 이어 붙이며,
+    서버가 그 id를 받아주지 않으면 마지막으로 완료된 응답 id로 다시 요청한다.
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    start_input_thread(loop, lines)
+    previous_response_id = None
+    completed_response_id = None
+    pending = None
+
+    while True:
+        if pending is None:
+            print(prompt, end="", flush=True)
+            user_message = await lines.get()
+        else:
+            user_message, pending = pending, None
+        if user_message is None or user_message.strip().lower() == "exit":
+            print("대화를 종료합니다.")
+            return
+
+        # 다시 요청하면 진행 중인 스트림이 바뀌므로, 끊긴 응답의 id는 active[0]에서 읽는다
+        active = [respond(user_message, previous_response_id)]
+
+        async def run():
+            print(f"{label}: ", end="", flush=True)
+            stream = active[0]
+            try:
+                await render(coalesce(stream.deltas(), stats=stream.stats), renderer_factory())
+            except Exception as exc:
+                if previous_response_id == completed_response_id or not _is_missing_previous_response(exc):
+                    raise
+                # 끊긴 응답은 체인에 이어 붙일 수 없는 경우가 있다 -> 마지막 완료 응답에서 다시 시작
+                retry = active[0] = respond(user_message, completed_response_id)
+                await render(coalesce(retry.deltas(), stats=retry.stats), renderer_factory())
+            return active[0]
+
+        reply = asyncio.ensure_future(run())
+        next_line = asyncio.ensure_future(lines.get())
+        done, _ = await asyncio.wait({reply, next_line}, return_when=asyncio.FIRST_COMPLETED)
+
+        if reply in done:
+            # 답변이 끝난 순간에 입력된 줄도 버리지 않고 다음 메시지로 처리
+            if next_line.done():
+                pending = next_line.result()
+            else:
+                next_line.cancel()
+            try:
+                finished = reply.result()
+            except Exception as exc:
+                active[0].interrupted()
+                print(f"\n오류: {type(exc).__name__}: {exc}")
+                continue
+            previous_response_id = completed_response_id = finished.response_id
+        else:
+            # 답변 도중 새 메시지 -> 진행 중인 생성 취소 (HTTP 스트림을 닫으면 서버도 생성을 멈춘다)
+            reply.cancel()
+            try:
+                await reply
+            except (asyncio.CancelledError, Exception):
+                pass
+            print("(답변 중단됨)")
+            # 받은 만큼을 대화 맥락에 남기거나 사용자 턴을 되돌린다 (다음 메시지를 보내기 전에)
+            active[0].interrupted()
+            previous_response_id = active[0].response_id or previous_response_id
+            pending = next_line.result()
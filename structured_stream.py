@@ -0,0 +1,334 @@
+"""구조화 출력(Pydantic 스키마)을 스트리밍하면서 점진적으로 파싱.
+
+with_structured_output(...).invoke()는 JSON 전체가 생성되고 검증될 때까지 기다리므로
+title을 받아 놓고도 review가 끝날 때까지 보여줄 수 없다. 여기서는 토큰이 도착하는 대로
+
+1. JSON을 한 글자씩 상태 기계로 읽어 (앞부분을 매번 다시 파싱하지 않음) 최상위 필드가 완성될 때마다 이벤트를 낸다
+   - "delta" : 문자열 필드가 자라는 중 (새로 도착한 텍스트)
+   - "field" : 필드 1개 완성 (필드 타입으로 바로 검증된 값)
+   - "done"  : 전체 객체 완성 (모델 검증까지 끝난 객체)
+   모든 이벤트의 partial에는 지금까지 받은 값으로 만든 부분 객체(model_construct)가 들어 있다.
+2. 잘못된 출력은 가능한 한 빨리 잡아 StructuredOutputError를 던진다.
+   JSON 문법 오류, 스키마에 없는 필드, 값의 첫 글자부터 타입이 다른 경우(예: float 필드에 문자열), 필드 검증 실패.
+   예외가 나면 스트림을 닫으므로 나머지 토큰 생성이 중단된다.
+
+사용 예:
+    for event in stream_structured(llm, MovieReview, "영화 '기생충'에 대한 리뷰를 작성해줘"):
+        if event.kind == "field":
+            print(event.field, event.value)
+        elif event.kind == "done":
+            review: MovieReview = event.value
+"""
+import json
+from typing import Annotated, Any, NamedTuple, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+_decoder = json.JSONDecoder(strict=False)
+_WHITESPACE = " \t\r\n"
+
+# 값의 첫 글자 -> JSON 타입
+_KIND_BY_FIRST_CHAR = {'"': "string", "{": "object", "[": "array", "t": "boolean", "f": "boolean", "n": "null"}
+_KIND_BY_FIRST_CHAR.update({c: "number" for c in "-0123456789"})
+
+
+class StructuredOutputError(ValueError):
+    """스트리밍 중 발견한 잘못된 구조화 출력. 지금까지 받은 텍스트와 위치를 함께 담는다."""
+
+    def __init__(self, message: str, text: str = "", position: int = 0):
+        super().__init__(f"{message} (위치 {position})")
+        self.text = text
+        self.position = position
+
+
+class StructuredEvent(NamedTuple):
+    kind: str               # "delta" / "field" / "done"
+    field: Optional[str]
+    value: Any
+    partial: Any            # 지금까지 받은 값으로 만든 부분 객체 (검증 안 함)
+
+
+def _json_kinds(schema: dict) -> Optional[set]:
+    """JSON 스키마가 허용하는 값 종류. 알 수 없으면 None (검사하지 않음)."""
+    branches = schema.get("anyOf") or schema.get("oneOf") or [schema]
+    kinds = set()
+    for branch in branches:
+        kind = branch.get("type")
+        if kind is None:
+            return None
+        for name in kind if isinstance(kind, list) else [kind]:
+            kinds.add("number" if name == "integer" else name)
+    return kinds
+
+
+class _Field:
+    __slots__ = ("adapter", "kinds")
+
+    def __init__(self, info):
+        # Field(ge=..., le=...) 같은 제약도 같이 검증하도록 FieldInfo를 붙여서 만든다
+        self.adapter = TypeAdapter(Annotated[info.annotation, info])
+        try:
+            self.kinds = _json_kinds(self.adapter.json_schema())
+        except Exception:
+            self.kinds = None
+
+
+class StructuredStreamParser:
+    """최상위가 객체인 JSON을 조각 단위로 받아 필드 이벤트를 만드는 점진적 파서."""
+
+    def __init__(self, schema: type, allow_extra: bool = False):
+        self.schema = schema
+        self.allow_extra = allow_extra
+        self._fields = {name: _Field(info) for name, info in schema.model_fields.items()}
+        self.values = {}
+        self.text_parts = []
+        self.position = 0
+        self._state = "start"
+        self._key_raw = []
+        self._key = None
+        self._raw = []          # 문자열이 아닌 값의 원문
+        self._string = []       # 문자열 값 중 아직 디코딩하지 않은 원문
+        self._decoded = []      # 문자열 값 중 디코딩된 부분
+        self._escape = 0
+        self._escape_at = 0
+        self._depth = 0
+        self._nested_string = False
+        self.result = None
+
+    # ------------------------------------------------------------ 공개 API
+    def feed(self, text: str) -> list:
+        """새로 도착한 텍스트를 읽고 그동안 생긴 이벤트 목록을 돌려준다."""
+        if not text:
+            return []
+        self.text_parts.append(text)
+        events = []
+        for char in text:
+            self._step(char, events)
+            self.position += 1
+        if self._state == "string" and self._string:
+            delta = self._flush_string()
+            if delta:
+                events.append(self._event("delta", self._key, delta))
+        return events
+
+    def close(self):
+        """스트림이 끝났을 때 호출. 객체가 닫히지 않았으면 오류."""
+        if self.result is None:
+            self._fail("출력이 JSON 객체 중간에서 끝났습니다")
+        return self.result
+
+    def partial(self):
+        """지금까지 받은 값으로 만든 부분 객체 (문자열 필드는 받은 데까지 포함, 검증 안 함)."""
+        values = dict(self.values)
+        if self._state == "string" and self._key is not None:
+            values[self._key] = "".join(self._decoded)
+        return self.schema.model_construct(**values)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    # ------------------------------------------------------------ 상태 기계
+    def _step(self, char, events):
+        state = self._state
+        if state == "string":
+            self._string.append(char)
+            if self._escape:
+                # -1: 방금 \ 를 읽음, 그 뒤로는 \uXXXX의 남은 글자 수
+                self._escape = (4 if char == "u" else 0) if self._escape == -1 else self._escape - 1
+            elif char == "\\":
+                self._escape, self._escape_at = -1, len(self._string) - 1
+            elif char == '"':
+                self._string.pop()
+                delta = self._flush_string()
+                if delta:
+                    events.append(self._event("delta", self._key, delta))
+                self._complete("".join(self._decoded), events)
+        elif state == "scalar":
+            if char in _WHITESPACE or char in ",}":
+                self._complete(self._load("".join(self._raw)), events)
+                self._step(char, events)
+            else:
+                self._raw.append(char)
+        elif state == "nested":
+            self._raw.append(char)
+            if self._nested_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._nested_string = False
+            elif char == '"':
+                self._nested_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(self._load("".join(self._raw)), events)
+        elif state == "key":
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._start_key()
+                return
+            self._key_raw.append(char)
+        elif char in _WHITESPACE:
+            return
+        elif state == "start":
+            self._expect(char, "{")
+            self._state = "before_key"
+        elif state in ("before_key", "after_comma"):
+            if char == '"':
+                self._state, self._key_raw = "key", []
+            elif char == "}" and state == "before_key":
+                self._finish(events)
+            else:
+                self._fail(f"필드 이름 대신 {char!r}가 왔습니다")
+        elif state == "after_key":
+            self._expect(char, ":")
+            self._state = "before_value"
+        elif state == "before_value":
+            self._start_value(char)
+        elif state == "after_value":
+            if char == ",":
+                self._state = "after_comma"
+            elif char == "}":
+                self._finish(events)
+            else:
+                self._fail(f"',' 또는 '}}' 대신 {char!r}가 왔습니다")
+        elif state == "end":
+            self._fail(f"JSON 객체가 끝난 뒤에 {char!r}가 왔습니다")
+
+    def _start_key(self):
+        key = self._load('"' + "".join(self._key_raw) + '"')
+        if key in self.values:
+            self._fail(f"필드가 중복되었습니다: {key}")
+        if key not in self._fields and not self.allow_extra:
+            self._fail(f"스키마에 없는 필드입니다: {key}")
+        self._key = key
+        self._state = "after_key"
+
+    def _start_value(self, char):
+        kind = _KIND_BY_FIRST_CHAR.get(char)
+        if kind is None:
+            self._fail(f"값이 {char!r}로 시작할 수 없습니다")
+        field = self._fields.get(self._key)
+        # 값의 첫 글자만 보고도 타입이 틀린 것을 알 수 있으면 바로 중단
+        if field is not None and field.kinds is not None and kind not in field.kinds:
+            self._fail(f"{self._key} 필드는 {'/'.join(sorted(field.kinds))}이어야 하는데 {kind} 값이 왔습니다")
+        if char == '"':
+            self._state, self._string, self._decoded, self._escape = "string", [], [], 0
+        elif char in "{[":
+            self._state, self._raw, self._depth, self._nested_string, self._escape = "nested", [char], 1, False, False
+        else:
+            self._state, self._raw = "scalar", [char]
+
+    def _flush_string(self) -> str:
+        """문자열 값 중 이스케이프가 끝난 부분까지만 디코딩한다."""
+        raw = "".join(self._string)
+        # 이스케이프 중간(\, \u12)에서 끊겼으면 그 앞까지만
+        cut = self._escape_at if self._escape else len(raw)
+        # 서로게이트 쌍(😀)의 앞쪽만 받은 경우도 뒤쪽이 올 때까지 기다린다
+        if cut >= 6 and raw[cut - 6:cut - 3].lower() == "\\ud" and raw[cut - 3].lower() in "89ab":
+            cut -= 6
+        if cut == 0:
+            return ""
+        text = self._load('"' + raw[:cut] + '"')
+        self._string = list(raw[cut:])
+        if self._escape:
+            self._escape_at -= cut
+        self._decoded.append(text)
+        return text
+
+    def _complete(self, value, events):
+        key = self._key
+        field = self._fields.get(key)
+        if field is not None:
+            try:
+                value = field.adapter.validate_python(value)
+            except ValidationError as e:
+                self._fail(f"{key} 필드 검증 실패: {e.errors()[0]['msg']}")
+        self.values[key] = value
+        self._state = "after_value"
+        events.append(self._event("field", key, value))
+
+    def _finish(self, events):
+        try:
+            self.result = self.schema.model_validate(self.values)
+        except ValidationError as e:
+            self._fail(f"스키마 검증 실패: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+        self._state = "end"
+        events.append(StructuredEvent("done", None, self.result, self.result))
+
+    def _event(self, kind, field, value):
+        return StructuredEvent(kind, field, value, self.partial())
+
+    def _expect(self, char, expected):
+        if char != expected:
+            self._fail(f"{expected!r} 대신 {char!r}가 왔습니다")
+
+    def _load(self, raw: str):
+        try:
+            return _decoder.decode(raw)
+        except json.JSONDecodeError as e:
+            self._fail(f"잘못된 JSON 값 {raw[:40]!r}: {e.msg}")
+
+    def _fail(self, message):
+        raise StructuredOutputError(message, self.text, self.position)
+
+
+def _chunk_text(chunk) -> str:
+    """랭체인 메시지 조각/문자열에서 텍스트만 꺼낸다."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return ""
+
+
+def _bind_schema(llm, schema):
+    """OpenAI 계열 채팅 모델이면 response_format(json_schema, strict)으로 스키마를 강제한다.
+
+    Pydantic 클래스를 그대로 넘기면 랭체인이 조각마다 parsed 객체를 다시 만들므로 dict 형식으로 넘긴다.
+    """
+    if not (hasattr(llm, "bind") and "openai" in type(llm).__name__.lower()):
+        return llm
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    function = convert_to_openai_tool(schema, strict=True)["function"]
+    return llm.bind(response_format={
+        "type": "json_schema",
+        "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True},
+    })
+
+
+def stream_structured(llm, schema: type, input, bind_schema: bool = True, allow_extra: bool = False):
+    """llm(또는 체인)을 스트리밍하며 StructuredEvent를 내보낸다. 잘못된 출력이면 스트림을 닫고 예외."""
+    runnable = _bind_schema(llm, schema) if bind_schema else llm
+    parser = StructuredStreamParser(schema, allow_extra=allow_extra)
+    stream = runnable.stream(input)
+    try:
+        for chunk in stream:
+            yield from parser.feed(_chunk_text(chunk))
+        parser.close()
+    finally:
+        # 오류로 빠져나오면 여기서 스트림(HTTP 응답)을 닫아 남은 생성을 중단
+        stream.close()
+
+
+async def astream_structured(llm, schema: type, input, bind_schema: bool = True, allow_extra: bool = False):
+    """stream_structured의 async 버전."""
+    runnable = _bind_schema(llm, schema) if bind_schema else llm
+    parser = StructuredStreamParser(schema, allow_extra=allow_extra)
+    stream = runnable.astream(input)
+    try:
+        async for chunk in stream:
+            for event in parser.feed(_chunk_text(chunk)):
+                yield event
+        parser.close()
+    finally:
+        await stream.aclose()